@@ -0,0 +1,184 @@
+"""
+Benchmarks of the analysis and plotting pipeline on synthetic workloads.
+
+Every benchmark is timed over a few repetitions and, in a separate call, traced with tracemalloc for its peak
+memory, since tracing slows the code down. Results go to a JSON file, and with --baseline the suite compares
+against an earlier results file and reports the benchmarks that got slower:
+
+    python -m benchmarks.suite --jobs 10 1000 10000 --runs 1 100 1000 --output benchmarks/results.json
+    python -m benchmarks.suite --only gantt --jobs 50000 --baseline benchmarks/results.json
+
+Benchmarks:
+    timestamps: parse_timestamp and epoch_seconds on the timestamps of a GitHub job listing
+    job_rows: github_job_row and gitlab_job_row on the job listings of both platforms
+    runs: GitHubWorkflowRun.from_api_response and GitHubWorkflowRunBatch.from_api_response on many runs
+    gantt: plot_job_gantt of one run
+    simulation: simulation_gantt_charts.main on a folder of pipeline JSON files
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import matplotlib
+import numpy as np
+
+from benchmarks.synthetic import github_jobs, github_run, gitlab_jobs, simulation_pipeline
+from experiments.commons import plot_job_gantt
+from experiments.simulation.pipeline import Pipeline
+from experiments.simulation.workflow_scheduling import simulation_gantt_charts
+from experiments.store import github_job_row, gitlab_job_row
+from util.github.models import GitHubWorkflowRun, GitHubWorkflowRunBatch, epoch_seconds, parse_timestamp
+
+BENCHMARKS = ('timestamps', 'job_rows', 'runs', 'gantt', 'simulation')
+# A benchmark is reported as a regression if it takes this much longer than in the baseline
+REGRESSION_THRESHOLD = 1.2
+
+
+def measure(function: Callable[[], object], repeat: int, memory: bool = True) -> dict:
+    """Times repeat calls of function, and traces the peak memory of one more call."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    result = {'repeat': repeat, 'seconds_min': min(times), 'seconds_median': statistics.median(times)}
+    if memory:
+        tracemalloc.start()
+        try:
+            function()
+            result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def bench_timestamps(job_count: int, rng: np.random.Generator):
+    jobs = github_jobs(1, job_count, rng)['jobs']
+    values = [job[field] for job in jobs for field in ('created_at', 'started_at', 'completed_at')]
+    yield 'timestamps.parse_timestamp', job_count, lambda: [parse_timestamp(value) for value in values]
+    yield 'timestamps.epoch_seconds', job_count, lambda: epoch_seconds(values)
+
+
+def bench_job_rows(job_count: int, rng: np.random.Generator):
+    github = github_jobs(1, job_count, rng)['jobs']
+    gitlab = gitlab_jobs(1, job_count, rng)
+    yield 'job_rows.github', job_count, lambda: [github_job_row(job) for job in github]
+    yield 'job_rows.gitlab', job_count, lambda: [gitlab_job_row(job, 1) for job in gitlab]
+
+
+def bench_runs(run_count: int, rng: np.random.Generator):
+    runs = [github_run(1000 + number, rng, number) for number in range(run_count)]
+    yield 'runs.from_api_response', run_count, lambda: [GitHubWorkflowRun.from_api_response(run) for run in runs]
+    yield 'runs.duration_seconds', run_count, lambda: [
+        GitHubWorkflowRun.from_api_response(run).duration_seconds for run in runs]
+    yield 'runs.batch', run_count, lambda: GitHubWorkflowRunBatch.from_api_response(runs).duration_seconds
+
+
+def bench_gantt(job_count: int, rng: np.random.Generator, folder: Path):
+    jobs = Pipeline.from_json(simulation_pipeline(1, job_count, rng)).job_durations()
+    file_path = folder / f"gantt{job_count}.png"
+    yield 'gantt.plot_job_gantt', job_count, lambda: plot_job_gantt(
+        jobs, f"{job_count} jobs", file_path, skip_unchanged=False)
+
+
+def bench_simulation(job_count: int, rng: np.random.Generator, folder: Path, pipelines: int = 2):
+    root = folder / f"simulation{job_count}"
+    for pipeline_id in range(pipelines):
+        directory = root / str(pipeline_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        data = simulation_pipeline(pipeline_id, job_count // pipelines or 1, rng)
+        (directory / f"pipeline{pipeline_id}.json").write_text(json.dumps(data))
+
+    def run():
+        # The script prints every job and skips unchanged charts, so silence it and start from scratch
+        for file in root.glob('*/gantt_manifest.json'):
+            file.unlink()
+        with contextlib.redirect_stdout(io.StringIO()):
+            simulation_gantt_charts.main(root)
+
+    yield 'simulation.main', job_count, run
+
+
+def compare(results: list[dict], baseline: dict) -> list[dict]:
+    """Benchmarks whose minimum time grew by more than REGRESSION_THRESHOLD relative to the baseline."""
+    previous = {(result['name'], result['size']): result for result in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result['name'], result['size']))
+        if before is None or before['seconds_min'] <= 0:
+            continue
+        ratio = result['seconds_min'] / before['seconds_min']
+        if ratio > REGRESSION_THRESHOLD:
+            regressions.append({'name': result['name'], 'size': result['size'], 'ratio': ratio})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--jobs', type=int, nargs='+', default=[10, 1000, 10000], help='Jobs per run')
+    parser.add_argument('--runs', type=int, nargs='+', default=[1, 100, 1000], help='Runs for the run benchmarks')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed repetitions of the fast benchmarks')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_false', dest='memory', help='Skip tracing the peak memory')
+    parser.add_argument('--output', type=Path, default=Path(__file__).parent / 'results.json')
+    parser.add_argument('--baseline', type=Path, help='Earlier results file to compare with')
+    args = parser.parse_args()
+
+    matplotlib.use('Agg')
+    rng = np.random.default_rng(args.seed)
+    results = []
+    with tempfile.TemporaryDirectory() as temporary:
+        folder = Path(temporary)
+        cases = []
+        for job_count in args.jobs:
+            if 'timestamps' in args.only:
+                cases.extend((case, args.repeat) for case in bench_timestamps(job_count, rng))
+            if 'job_rows' in args.only:
+                cases.extend((case, args.repeat) for case in bench_job_rows(job_count, rng))
+        if 'runs' in args.only:
+            for run_count in args.runs:
+                cases.extend((case, args.repeat) for case in bench_runs(run_count, rng))
+        for job_count in args.jobs:
+            # Rendering is slow, a single timed call is enough
+            if 'gantt' in args.only:
+                cases.extend((case, 1) for case in bench_gantt(job_count, rng, folder))
+            if 'simulation' in args.only:
+                cases.extend((case, 1) for case in bench_simulation(job_count, rng, folder))
+
+        for (name, size, function), repeat in cases:
+            result = {'name': name, 'size': size, **measure(function, repeat, args.memory)}
+            results.append(result)
+            memory = f", peak {result['peak_memory_bytes'] / 2 ** 20:8.1f} MiB" if args.memory else ''
+            print(f"{name:28} {size:7}: {result['seconds_min']:9.4f} s{memory}", flush=True)
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'matplotlib': matplotlib.__version__,
+        'seed': args.seed,
+        'results': results,
+    }
+    if args.baseline:
+        report['regressions'] = compare(results, json.loads(args.baseline.read_text()))
+        for regression in report['regressions']:
+            print(f"Regression: {regression['name']} {regression['size']} took {regression['ratio']:.2f}x as long")
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent='\t'))
+    print('Wrote', args.output)
+
+
+if __name__ == '__main__':
+    main()
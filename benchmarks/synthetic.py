@@ -0,0 +1,148 @@
+"""
+Synthetic CI workloads in the formats of the GitHub and GitLab APIs and of the simulation pipeline JSON files.
+
+All generators are deterministic for a given seed. Jobs are spread over stages, take durations from a
+long-tailed distribution and wait for a free runner of a fixed pool, so the data looks like a loaded CI.
+"""
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from experiments.simulation.pipeline import format_timestamp
+
+ORIGIN = datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc)
+STAGES = ('build', 'test', 'lint', 'package', 'deploy')
+
+
+def github_timestamp(value: datetime) -> str:
+    """Formats a timestamp like the GitHub API, e.g. 2026-02-01T12:00:00Z"""
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def job_timeline(job_count: int, runners: int, rng: np.random.Generator) -> tuple[np.ndarray, ...]:
+    """
+    Creation, start and end offsets in seconds and the stage and runner of every job.
+    The jobs of a stage are created when the previous stage finished and start on the earliest free runner.
+    """
+    stages = np.sort(rng.integers(0, len(STAGES), job_count))
+    durations = rng.lognormal(mean=4, sigma=1, size=job_count)
+    created = np.zeros(job_count)
+    started = np.zeros(job_count)
+    runner = np.zeros(job_count, int)
+    free_at = np.zeros(runners)
+    stage_end = 0.0
+    for stage in range(len(STAGES)):
+        jobs = np.flatnonzero(stages == stage)
+        end = stage_end
+        for job in jobs:
+            pick = int(np.argmin(free_at))
+            created[job] = stage_end
+            started[job] = max(free_at[pick], stage_end) + rng.exponential(5)
+            free_at[pick] = started[job] + durations[job]
+            runner[job] = pick
+            end = max(end, free_at[pick])
+        stage_end = end
+    return created, started, started + durations, stages, runner
+
+
+def github_run(run_id: int, rng: np.random.Generator, run_number: int = 1) -> dict:
+    """A workflow run as returned by /actions/runs"""
+    created = ORIGIN + timedelta(minutes=run_number * 30)
+    started = created + timedelta(seconds=float(rng.uniform(1, 30)))
+    return {
+        'id': run_id,
+        'run_number': run_number,
+        'name': 'unfair-test-workflow',
+        'display_title': f"Run {run_number}",
+        'status': 'completed',
+        'conclusion': 'success',
+        'workflow_id': 1,
+        'event': 'workflow_dispatch',
+        'created_at': github_timestamp(created),
+        'updated_at': github_timestamp(started + timedelta(seconds=float(rng.lognormal(6, 0.5)))),
+        'run_started_at': github_timestamp(started),
+        'head_branch': 'main',
+        'head_sha': f"{rng.integers(0, 2 ** 63):040x}"[:40],
+        'run_attempt': 1,
+        'html_url': f"https://github.com/CQ4CD/Experiments/actions/runs/{run_id}",
+    }
+
+
+def github_jobs(run_id: int, job_count: int, rng: np.random.Generator, runners: int = 20) -> dict:
+    """The jobs of a workflow run as returned by /actions/runs/{run_id}/jobs (all pages in one)"""
+    created, started, finished, stages, runner = job_timeline(job_count, runners, rng)
+    jobs = [
+        {
+            'id': run_id * 100_000 + index,
+            'run_id': run_id,
+            'run_attempt': 1,
+            'name': f"{STAGES[stages[index]]} ({index})",
+            'status': 'completed',
+            'conclusion': 'success',
+            'created_at': github_timestamp(ORIGIN + timedelta(seconds=float(created[index]))),
+            'started_at': github_timestamp(ORIGIN + timedelta(seconds=float(started[index]))),
+            'completed_at': github_timestamp(ORIGIN + timedelta(seconds=float(finished[index]))),
+            'runner_name': f"runner-{runner[index]}",
+        }
+        for index in range(job_count)
+    ]
+    return {'total_count': job_count, 'jobs': jobs}
+
+
+def gitlab_jobs(pipeline_id: int, job_count: int, rng: np.random.Generator, runners: int = 20) -> list[dict]:
+    """The jobs of a pipeline as returned by /projects/{id}/pipelines/{pipeline_id}/jobs (all pages in one)"""
+    created, started, finished, stages, runner = job_timeline(job_count, runners, rng)
+    return [
+        {
+            'id': pipeline_id * 100_000 + index,
+            'name': f"{STAGES[stages[index]]}: [{index}]",
+            'stage': STAGES[stages[index]],
+            'status': 'success',
+            'retried': False,
+            'created_at': format_timestamp(ORIGIN + timedelta(seconds=float(created[index]))),
+            'started_at': format_timestamp(ORIGIN + timedelta(seconds=float(started[index]))),
+            'finished_at': format_timestamp(ORIGIN + timedelta(seconds=float(finished[index]))),
+            'queued_duration': float(started[index] - created[index]),
+            'duration': float(finished[index] - started[index]),
+            'runner': {'id': int(runner[index]), 'description': f"runner-{runner[index]}"},
+        }
+        for index in range(job_count)
+    ]
+
+
+def simulation_pipeline(pipeline_id: int, job_count: int, rng: np.random.Generator, runners: int = 20,
+                        needs: int = 2) -> dict:
+    """
+    A pipeline JSON file of the simulation, with stages and up to `needs` needs per job on jobs of earlier stages.
+    """
+    created, started, finished, stages, runner = job_timeline(job_count, runners, rng)
+    names = [f"{STAGES[stages[index]]} {index}-{pipeline_id}" for index in range(job_count)]
+    # Stages are sorted, so the jobs of earlier stages are the ones before the first job of the stage
+    stage_starts = np.searchsorted(stages, stages)
+    jobs = []
+    for index in range(job_count):
+        earlier = int(stage_starts[index])
+        picked = sorted(set(rng.integers(0, earlier, needs).tolist())) if earlier else []
+        jobs.append({
+            'id': names[index],
+            'needs': [names[need] for need in picked],
+            'runner': f"runner-{runner[index]}",
+            'runner_manager': None,
+            'status': 'success',
+            'created_at': format_timestamp(ORIGIN + timedelta(seconds=float(created[index]))),
+            'started_at': format_timestamp(ORIGIN + timedelta(seconds=float(started[index]))),
+            'finished_at': format_timestamp(ORIGIN + timedelta(seconds=float(finished[index]))),
+        })
+    # Like the real files, stages carry no index and are not listed in execution order
+    stage_jobs = [
+        {'name': name, 'jobs': [names[index] for index in np.flatnonzero(stages == stage)]}
+        for stage, name in reversed(list(enumerate(STAGES)))
+    ]
+    return {
+        'id': str(pipeline_id),
+        'created_at': format_timestamp(ORIGIN),
+        'finished_at': format_timestamp(ORIGIN + timedelta(seconds=float(finished.max(initial=0)))),
+        'duration': float(finished.max(initial=0)),
+        'stages': [stage for stage in stage_jobs if stage['jobs']],
+        'jobs': jobs,
+    }
@@ -0,0 +1,242 @@
+"""
+Average Gantt charts across all runs of an experiment.
+
+Jobs are aligned across runs by name, or by matrix key (the values in the trailing parentheses or brackets of
+the name, e.g. `wait (120)` or `wait-jobs: [120]`). Jobs whose key repeats within a run are numbered in
+declaration order, e.g. `0_wait (10)`, `1_wait (10)`. For every key the mean, median, 95th percentile and
+standard deviation of the start offset (after the first start of the run) and of the duration are computed.
+Runs are read from the experiment store one at a time, so only two numbers per job and run are kept:
+
+    python -m experiments.aggregation github --experiment 0 --by name
+
+This writes average_gantt.png (durations) and average_offset_gantt.png (start and end offsets) to the
+experiment folder.
+"""
+import argparse
+import json
+import re
+from dataclasses import dataclass
+from typing import Iterable
+
+import matplotlib
+import numpy as np
+from matplotlib import pyplot as plt
+
+from experiments.commons import get_experiment_folder, get_latest_experiment_number
+from experiments.store import ExperimentStore, get_experiment_store
+
+ALIGNMENTS = ('name', 'matrix')
+MATRIX_KEY = re.compile(r'[(\[]([^()\[\]]*)[)\]]\s*$')
+
+
+def job_key(name: str, by: str = 'name') -> str:
+    """
+    Key that aligns a job across runs.
+
+    Raises:
+        ValueError: On an unknown alignment
+    """
+    if by == 'name':
+        return name
+    if by == 'matrix':
+        match = MATRIX_KEY.search(name or '')
+        return match.group(1) if match else name
+    raise ValueError(f"Unknown alignment {by}")
+
+
+def run_keys(jobs: list[dict], by: str = 'name') -> list[str]:
+    """Keys of the jobs of one run in the given order, repeated keys are numbered, e.g. 0_wait (10)"""
+    keys = [job_key(job['name'], by) for job in jobs]
+    counts = {}
+    for key in keys:
+        counts[key] = counts.get(key, 0) + 1
+    occurrences = {}
+    numbered = []
+    for key in keys:
+        if counts[key] > 1:
+            occurrence = occurrences.get(key, 0)
+            occurrences[key] = occurrence + 1
+            key = f"{occurrence}_{key}"
+        numbered.append(key)
+    return numbered
+
+
+@dataclass
+class Distribution:
+    """Statistics of a (runs x keys) sample matrix per key, runs without the key are NaN."""
+
+    mean: np.ndarray
+    median: np.ndarray
+    p95: np.ndarray
+    std: np.ndarray
+
+    @classmethod
+    def from_samples(cls, samples: np.ndarray) -> 'Distribution':
+        return cls(
+            np.nanmean(samples, axis=0),
+            np.nanmedian(samples, axis=0),
+            np.nanpercentile(samples, 95, axis=0),
+            np.nanstd(samples, axis=0),
+        )
+
+    def to_json(self, index: int) -> dict:
+        return {'mean': float(self.mean[index]), 'median': float(self.median[index]),
+                'p95': float(self.p95[index]), 'std': float(self.std[index])}
+
+
+@dataclass
+class AverageGantt:
+    """Per key statistics of the jobs of many runs, in seconds."""
+
+    keys: list[str]
+    runs: np.ndarray
+    offsets: Distribution
+    durations: Distribution
+    run_count: int
+
+    def order(self) -> np.ndarray:
+        """Keys by median start offset, the first at index 0."""
+        return np.lexsort((np.array(self.keys, dtype=object).astype(str), self.offsets.median))
+
+    def to_json(self) -> dict:
+        return {
+            'runs': self.run_count,
+            'jobs': {
+                key: {'runs': int(self.runs[index]), 'offset': self.offsets.to_json(index),
+                      'duration': self.durations.to_json(index)}
+                for index, key in enumerate(self.keys)
+            },
+        }
+
+
+def iter_store_runs(store: ExperimentStore, run_ids: Iterable[int] | None = None) -> Iterable[list[dict]]:
+    """Yields the job rows of one run at a time."""
+    for run_id in run_ids if run_ids is not None else store.job_run_ids():
+        yield store.load_jobs(run_id).get(run_id, [])
+
+
+def aggregate_runs(runs: Iterable[list[dict]], by: str = 'name') -> AverageGantt:
+    """
+    Aggregates the jobs of many runs.
+
+    Args:
+        runs: The job rows (with name, job_id, started_at and finished_at in seconds) of one run at a time
+        by: Alignment of the jobs, see ALIGNMENTS
+
+    Raises:
+        ValueError: On an unknown alignment
+    """
+    columns = {}
+    run_columns, run_offsets, run_durations = [], [], []
+    for jobs in runs:
+        jobs = sorted((job for job in jobs if job['started_at'] is not None and job['finished_at'] is not None),
+                      key=lambda job: job['job_id'])
+        if not jobs:
+            continue
+        indices = [columns.setdefault(key, len(columns)) for key in run_keys(jobs, by)]
+        started = np.fromiter((job['started_at'] for job in jobs), float, len(jobs))
+        finished = np.fromiter((job['finished_at'] for job in jobs), float, len(jobs))
+        run_columns.append(np.array(indices))
+        run_offsets.append(started - started.min())
+        run_durations.append(finished - started)
+
+    offsets = np.full((len(run_columns), len(columns)), np.nan)
+    durations = np.full((len(run_columns), len(columns)), np.nan)
+    for row, indices in enumerate(run_columns):
+        offsets[row, indices] = run_offsets[row]
+        durations[row, indices] = run_durations[row]
+    if not columns:
+        empty = Distribution(*(np.empty(0) for _ in range(4)))
+        return AverageGantt([], np.empty(0, int), empty, empty, len(run_columns))
+    return AverageGantt(
+        list(columns),
+        (~np.isnan(offsets)).sum(axis=0),
+        Distribution.from_samples(offsets),
+        Distribution.from_samples(durations),
+        len(run_columns),
+    )
+
+
+def _figure(key_count: int, title: str):
+    fig, ax = plt.subplots(figsize=(12, max(4, 0.28 * key_count + 2)), constrained_layout=True)
+    ax.set_title(title)
+    ax.set_ylabel('Job')
+    ax.grid(axis='x', alpha=0.4)
+    ax.set_ylim(-1, key_count)
+    return fig, ax
+
+
+def plot_average_gantt(average: AverageGantt, title: str, file_path=None):
+    """Plots the mean duration of every job with a whisker of one standard deviation and its 95th percentile."""
+    order = average.order()[::-1]
+    positions = np.arange(len(order))
+    fig, ax = _figure(len(order), title)
+    durations = average.durations
+    ax.barh(positions, durations.mean[order], height=0.6, xerr=durations.std[order], color='skyblue',
+            error_kw={'ecolor': 'black', 'capsize': 3, 'elinewidth': 1})
+    ax.scatter(durations.median[order], positions, marker='|', color='black', s=80, label='Median', zorder=3)
+    ax.scatter(durations.p95[order], positions, marker='x', color='tab:red', s=20, label='95th percentile', zorder=3)
+    ax.set_yticks(positions)
+    ax.set_yticklabels([average.keys[key] for key in order], fontsize=7)
+    ax.set_xlabel('Duration (seconds)')
+    ax.legend(loc='lower right')
+    if file_path:
+        plt.savefig(file_path, dpi=160)
+    plt.close(fig)
+
+
+def plot_average_offset_gantt(average: AverageGantt, title: str, file_path=None):
+    """
+    Plots every job from its mean start to its mean end offset, with whiskers of one standard deviation
+    of the start (left) and of the end (right) and the 95th percentile of the end.
+    """
+    order = average.order()[::-1]
+    positions = np.arange(len(order))
+    fig, ax = _figure(len(order), title)
+    starts = average.offsets.mean[order]
+    durations = average.durations.mean[order]
+    ends = starts + durations
+    ax.barh(positions, durations, left=starts, height=0.6, color='skyblue', edgecolor='black', linewidth=0.5)
+    ax.errorbar(starts, positions, xerr=average.offsets.std[order], fmt='none', ecolor='tab:red', capsize=3,
+                elinewidth=1, label='Start spread')
+    # The spread of the end of a job combines the spread of its start and of its duration
+    end_spread = np.sqrt(average.offsets.std[order] ** 2 + average.durations.std[order] ** 2)
+    ax.errorbar(ends, positions, xerr=end_spread, fmt='none', ecolor='tab:green', capsize=3, elinewidth=1,
+                label='End spread')
+    ax.scatter(average.offsets.median[order], positions, marker='|', color='black', s=80, label='Median start',
+               zorder=3)
+    ax.set_yticks(positions)
+    ax.set_yticklabels([average.keys[key] for key in order], fontsize=7)
+    ax.set_xlabel('Time after the first start of the run (HH:MM:SS)')
+    ax.xaxis.set_major_formatter(matplotlib.ticker.FuncFormatter(
+        lambda x, pos: f"{int(x) // 3600:02}:{int(x) % 3600 // 60:02}:{int(x) % 60:02}"))
+    ax.legend(loc='lower right')
+    if file_path:
+        plt.savefig(file_path, dpi=160)
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('platform', choices=('github', 'gitlab'))
+    parser.add_argument('--experiment', type=int, help='Experiment number, defaults to the latest')
+    parser.add_argument('--by', choices=ALIGNMENTS, default='name', help='Alignment of the jobs across runs')
+    args = parser.parse_args()
+
+    experiment_number = args.experiment if args.experiment is not None else get_latest_experiment_number(args.platform)
+    folder = get_experiment_folder(experiment_number, args.platform)
+    store = get_experiment_store(experiment_number, args.platform)
+    average = aggregate_runs(iter_store_runs(store), args.by)
+    if not average.keys:
+        print('No jobs in the experiment store')
+        return
+    print(f"Aggregated {len(average.keys)} jobs of {average.run_count} runs")
+    plot_average_gantt(average, f"Average job durations across {average.run_count} runs",
+                       folder / 'average_gantt.png')
+    plot_average_offset_gantt(average, f"Average job start and end times across {average.run_count} runs",
+                              folder / 'average_offset_gantt.png')
+    (folder / 'average_gantt.json').write_text(json.dumps(average.to_json(), indent='\t'))
+
+
+if __name__ == '__main__':
+    main()
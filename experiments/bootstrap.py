@@ -0,0 +1,223 @@
+"""
+Bootstrap confidence intervals of the makespan and the job start offsets of an experiment, and a sequential
+stopping rule.
+
+After every completed run, the runs so far are resampled with replacement to estimate a confidence interval of
+the mean makespan and of the mean start offset of every job. With a stopping rule, the experiment ends once the
+makespan interval is narrower than a target (relative to the mean), and runs past its default count while the
+interval is still wide, up to a maximum. The run scripts configure the rule with STOP_CI_WIDTH, MIN_RUNS and
+MAX_RUNS. The intervals of a finished experiment can be recomputed from its store:
+
+    python -m experiments.bootstrap github --experiment 3
+"""
+import argparse
+import json
+import warnings
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+from matplotlib import pyplot as plt
+
+from experiments.aggregation import run_keys
+from experiments.commons import get_experiment_folder, get_latest_experiment_number
+from experiments.store import ExperimentStore, get_experiment_store, to_epoch
+
+STATISTICS = {'mean': np.nanmean, 'median': np.nanmedian}
+
+
+@dataclass
+class ConfidenceInterval:
+    estimate: float
+    low: float
+    high: float
+
+    @property
+    def width(self) -> float:
+        return self.high - self.low if not np.isnan(self.low) else float('inf')
+
+    @property
+    def relative_width(self) -> float:
+        """Width relative to the estimate, e.g. 0.1 for an interval of 10 s around a mean of 100 s"""
+        return self.width / abs(self.estimate) if self.estimate else float('inf')
+
+    def to_json(self) -> dict:
+        return {'estimate': self.estimate, 'low': self.low, 'high': self.high}
+
+
+def bootstrap_intervals(samples: np.ndarray, statistic: str = 'mean', confidence: float = 0.95,
+                        resamples: int = 2000, seed: int | None = 0) -> list[ConfidenceInterval]:
+    """
+    Percentile bootstrap confidence intervals of every column of a (runs x keys) sample matrix.
+    All columns are resampled at once by drawing whole runs, runs missing a key are NaN.
+    Columns with fewer than two samples get NaN bounds.
+
+    Args:
+        samples: One row per run
+        statistic: One of STATISTICS
+        confidence: Coverage of the intervals
+        resamples: Number of bootstrap resamples
+        seed: Seed of the resampling, so that the intervals of the same runs do not change between calls
+    """
+    samples = np.asarray(samples, float)
+    reduce = STATISTICS[statistic]
+    counts = (~np.isnan(samples)).sum(axis=0)
+    with warnings.catch_warnings():
+        # Columns without samples are NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        estimates = reduce(samples, axis=0)
+        if len(samples) >= 2:
+            draws = np.random.default_rng(seed).integers(0, len(samples), (resamples, len(samples)))
+            distribution = reduce(samples[draws], axis=1)
+            alpha = (1 - confidence) / 2
+            lows, highs = np.nanquantile(distribution, [alpha, 1 - alpha], axis=0)
+        else:
+            lows = highs = np.full(samples.shape[1], np.nan)
+    return [
+        ConfidenceInterval(float(estimate), float(low), float(high)) if count >= 2
+        else ConfidenceInterval(float(estimate), np.nan, np.nan)
+        for estimate, low, high, count in zip(estimates, lows, highs, counts)
+    ]
+
+
+def bootstrap_interval(samples, statistic: str = 'mean', confidence: float = 0.95, resamples: int = 2000,
+                       seed: int | None = 0) -> ConfidenceInterval:
+    """Percentile bootstrap confidence interval of a one-dimensional sample."""
+    return bootstrap_intervals(np.asarray(samples, float)[:, None], statistic, confidence, resamples, seed)[0]
+
+
+@dataclass
+class StoppingRule:
+    """
+    Stops an experiment once the makespan interval is narrower than target_width relative to its estimate,
+    but not before min_runs and not after max_runs completed runs.
+    """
+
+    target_width: float
+    min_runs: int = 5
+    max_runs: int | None = None
+
+    def should_stop(self, interval: ConfidenceInterval, runs: int) -> bool:
+        if self.max_runs is not None and runs >= self.max_runs:
+            return True
+        return runs >= self.min_runs and interval.relative_width <= self.target_width
+
+
+@dataclass
+class SequentialBenchmark:
+    """
+    Collects the makespan and the job start offsets of every completed run and updates their confidence intervals.
+
+    Args:
+        rule: Optional stopping rule, see done
+        job_offsets: Optional function returning the start offset of every job of a run by key
+    """
+
+    rule: StoppingRule | None = None
+    job_offsets: Callable[[int], dict[str, float]] | None = None
+    confidence: float = 0.95
+    resamples: int = 2000
+    makespans: list[float] = field(default_factory=list)
+    offsets: list[dict[str, float]] = field(default_factory=list)
+    history: list[dict] = field(default_factory=list)
+
+    def run_count(self, default: int) -> int:
+        """Number of runs to dispatch, the maximum of the stopping rule or the default count"""
+        if self.rule is None:
+            return default
+        return self.rule.max_runs if self.rule.max_runs is not None else 3 * default
+
+    def add_run(self, makespan: float, offsets: dict[str, float] | None = None):
+        self.makespans.append(makespan)
+        if offsets is not None:
+            self.offsets.append(offsets)
+        interval = self.makespan_interval()
+        self.history.append({'runs': len(self.makespans), 'makespan': makespan, **interval.to_json()})
+        print(f"Run {len(self.makespans)}: makespan {makespan:.0f} s, mean {interval.estimate:.1f} s, "
+              f"{self.confidence:.0%} CI [{interval.low:.1f}, {interval.high:.1f}] "
+              f"(±{interval.relative_width / 2:.1%})", flush=True)
+
+    def on_completed(self, lifecycle):
+        """Orchestrator callback, adds a completed run from the start and completion time of its lifecycle"""
+        started, completed = to_epoch(lifecycle.started_at), to_epoch(lifecycle.completed_at)
+        if started is None or completed is None:
+            print('Run', lifecycle.run_id, 'has no start or completion time, not counted', flush=True)
+            return
+        offsets = self.job_offsets(lifecycle.run_id) if self.job_offsets is not None else None
+        self.add_run(completed - started, offsets)
+
+    def makespan_interval(self) -> ConfidenceInterval:
+        return bootstrap_interval(self.makespans, confidence=self.confidence, resamples=self.resamples)
+
+    def offset_intervals(self) -> dict[str, ConfidenceInterval]:
+        keys = list(dict.fromkeys(key for offsets in self.offsets for key in offsets))
+        if not keys:
+            return {}
+        samples = np.array([[offsets.get(key, np.nan) for key in keys] for offsets in self.offsets])
+        return dict(zip(keys, bootstrap_intervals(samples, confidence=self.confidence, resamples=self.resamples)))
+
+    def done(self) -> bool:
+        """Whether the stopping rule ends the experiment, never without a rule"""
+        if self.rule is None or not self.makespans:
+            return False
+        return self.rule.should_stop(self.makespan_interval(), len(self.makespans))
+
+    def summary(self) -> dict:
+        return {
+            'runs': len(self.makespans),
+            'confidence': self.confidence,
+            'makespan': self.makespan_interval().to_json() if self.makespans else None,
+            'job_offsets': {key: interval.to_json() for key, interval in self.offset_intervals().items()},
+            'history': self.history,
+        }
+
+    def plot(self, title: str, file_path=None):
+        """Plots the makespan of every run and the confidence interval of the mean after each run."""
+        if not self.history:
+            return
+        fig, ax = plt.subplots()
+        runs = [entry['runs'] for entry in self.history]
+        ax.plot(runs, self.makespans, 'o', label='Run')
+        ax.plot(runs, [entry['estimate'] for entry in self.history], '-', label='Mean')
+        ax.fill_between(runs, [entry['low'] for entry in self.history], [entry['high'] for entry in self.history],
+                        alpha=0.3, label=f"{self.confidence:.0%} CI of the mean")
+        ax.set_xlabel('Run')
+        ax.set_ylabel('Duration (s)')
+        ax.set_title(title)
+        ax.legend()
+        if file_path:
+            plt.savefig(file_path)
+        plt.close(fig)
+
+
+def store_job_offsets(store: ExperimentStore, run_id: int, by: str = 'name') -> dict[str, float]:
+    """Start offsets of the jobs of a run after its first job start, by aligned job key"""
+    jobs = [job for job in store.load_jobs(run_id).get(run_id, []) if job['started_at'] is not None]
+    if not jobs:
+        return {}
+    first = min(job['started_at'] for job in jobs)
+    return {key: job['started_at'] - first for key, job in zip(run_keys(jobs, by), jobs)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('platform', choices=('github', 'gitlab'))
+    parser.add_argument('--experiment', type=int, help='Experiment number, defaults to the latest')
+    parser.add_argument('--confidence', type=float, default=0.95)
+    args = parser.parse_args()
+
+    experiment_number = args.experiment if args.experiment is not None else get_latest_experiment_number(args.platform)
+    folder = get_experiment_folder(experiment_number, args.platform)
+    store = get_experiment_store(experiment_number, args.platform)
+    benchmark = SequentialBenchmark(confidence=args.confidence)
+    lifecycles = [lifecycle for lifecycle in store.load_lifecycles() if lifecycle['completed_at']]
+    for lifecycle in sorted(lifecycles, key=lambda lifecycle: lifecycle['run_number']):
+        started, completed = to_epoch(lifecycle['started_at']), to_epoch(lifecycle['completed_at'])
+        if started is not None and completed is not None:
+            benchmark.add_run(completed - started, store_job_offsets(store, lifecycle['run_id']))
+    (folder / 'statistics.json').write_text(json.dumps(benchmark.summary(), indent='\t'))
+    benchmark.plot('Workflow Durations', folder / 'workflow_durations_ci.png')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,26 @@
+import atexit
+import hashlib
 import json
+import math
 import os
+import threading
 from datetime import datetime
 from pathlib import Path
 
 import dotenv
 import matplotlib
+import numpy as np
 
 matplotlib.use("Agg")
 import matplotlib.dates as mdates
 from matplotlib import pyplot as plt
+from matplotlib.collections import PolyCollection
+
+from util.cache import ResponseCache
+from util.github.client import GitHubClient
+from util.gitlab.client import GitLabClient
+from util.metrics import request_metrics
+from util.replay import install_transport
 
 dotenv.load_dotenv()
 
@@ -24,6 +36,7 @@ gh_headers = {
     "Authorization": f"Bearer {gh_token}",
     "X-GitHub-Api-Version": "2022-11-28"
 }
+gh_client = GitHubClient(gh_token)
 
 
 gitlab_url = os.getenv('GITLAB_URL')
@@ -31,16 +44,78 @@ gitlab_project_id = os.getenv('GITLAB_PROJECT_ID', '9767')
 gitlab_token = os.getenv('GITLAB_TOKEN')
 gitlab_branch = os.getenv('GITLAB_BRANCH', 'main')
 gitlab_headers = {'PRIVATE-TOKEN': gitlab_token}
+gitlab_client = GitLabClient(gitlab_url or '', gitlab_token)
+
+# live: talk to the APIs, record: also save every GET response to API_FIXTURES, replay: answer from API_FIXTURES
+# offline, optionally with simulated latency (seconds), page size and rate limit (requests per hour)
+api_mode = os.getenv('API_MODE', 'live')
+api_fixtures = Path(os.getenv('API_FIXTURES', Path(__file__).parent / 'fixtures'))
+replay_options = {
+    'latency': float(os.getenv('REPLAY_LATENCY', '0')),
+    'jitter': float(os.getenv('REPLAY_JITTER', '0')),
+    'page_size': int(os.getenv('REPLAY_PAGE_SIZE')) if os.getenv('REPLAY_PAGE_SIZE') else None,
+    'rate_limit': int(os.getenv('REPLAY_RATE_LIMIT')) if os.getenv('REPLAY_RATE_LIMIT') else None,
+    'retry_after_every': int(os.getenv('REPLAY_RETRY_AFTER_EVERY')) if os.getenv('REPLAY_RETRY_AFTER_EVERY') else None,
+}
+install_transport(gh_client.session, api_mode, api_fixtures, **replay_options)
+install_transport(gitlab_client.session, api_mode, api_fixtures, **replay_options)
+
+# Request statistics of the API clients are printed when a script exits (API_METRICS=0 to disable),
+# with API_TRACE every request is also appended to this JSON lines file
+if os.getenv('API_TRACE'):
+    request_metrics.open_trace(Path(os.getenv('API_TRACE')))
+
+
+def _print_request_summary():
+    if request_metrics.request_count:
+        print(request_metrics.format_summary())
+
+
+if os.getenv('API_METRICS', '1') != '0':
+    atexit.register(_print_request_summary)
+atexit.register(request_metrics.close)
+
+# If set, run_workflows waits for webhook events on this port instead of polling
+webhook_port = os.getenv('WEBHOOK_PORT')
+webhook_secret = os.getenv('WEBHOOK_SECRET')
+# Seconds to wait for a completion event before polling the run once, in case a delivery got lost
+webhook_timeout = float(os.getenv('WEBHOOK_TIMEOUT', '300'))
+
+# serial: one run at a time, overlapping: DISPATCH_CONCURRENCY runs in flight or one every DISPATCH_INTERVAL seconds
+dispatch_mode = os.getenv('DISPATCH_MODE', 'serial')
+dispatch_concurrency = int(os.getenv('DISPATCH_CONCURRENCY', '1'))
+dispatch_interval = float(os.getenv('DISPATCH_INTERVAL')) if os.getenv('DISPATCH_INTERVAL') else None
+
+# If set, run_workflows stops once the confidence interval of the mean run duration is narrower than this fraction
+# of the mean, after at least MIN_RUNS runs. While it is wider, runs continue up to MAX_RUNS (default: 3x the usual count)
+stop_ci_width = float(os.getenv('STOP_CI_WIDTH')) if os.getenv('STOP_CI_WIDTH') else None
+min_runs = int(os.getenv('MIN_RUNS', '5'))
+max_runs = int(os.getenv('MAX_RUNS')) if os.getenv('MAX_RUNS') else None
+
+# Number of processes rendering Gantt charts, defaults to the number of cores
+render_workers = int(os.getenv('RENDER_WORKERS')) if os.getenv('RENDER_WORKERS') else None
+
+
+_run_id_lock = threading.Lock()
+
+# Maximum height of a Gantt chart, larger charts get thinner rows
+MAX_GANTT_PIXELS = 2 ** 14
+
+# Fingerprints of the rendered Gantt charts of a folder, by file name
+GANTT_MANIFEST = 'gantt_manifest.json'
+# Bump when the chart layout changes, so that cached charts are rendered again
+GANTT_RENDER_VERSION = 1
 
 
 def add_run_id(run_id_file: Path, run_id):
-    if run_id_file.exists():
-        run_ids = json.loads(run_id_file.read_text())
-    else:
-        run_id_file.parent.mkdir(parents=True, exist_ok=True)
-        run_ids = []
-    run_ids.append(run_id)
-    run_id_file.write_text(json.dumps(run_ids, indent='\t'))
+    with _run_id_lock:
+        if run_id_file.exists():
+            run_ids = json.loads(run_id_file.read_text())
+        else:
+            run_id_file.parent.mkdir(parents=True, exist_ok=True)
+            run_ids = []
+        run_ids.append(run_id)
+        run_id_file.write_text(json.dumps(run_ids, indent='\t'))
 
 
 def get_run_id_file(experiment_number: int, platform='github') -> Path:
@@ -51,6 +126,10 @@ def get_experiment_folder(experiment_number: int, platform='github') -> Path:
     return Path(__file__).parent / platform / 'workflow_scheduling' / workflow_name / f"experiment_{experiment_number}"
 
 
+def get_http_cache(experiment_number: int, platform='github') -> ResponseCache:
+    return ResponseCache(get_experiment_folder(experiment_number, platform) / 'http_cache')
+
+
 def get_latest_experiment_number(platform='github') -> int:
     return get_fresh_experiment_number(platform) - 1
 
@@ -71,6 +150,7 @@ class JobDuration:
         runner: str | None = None,
         stage: str | None = None,
         status: str | None = None,
+        created: datetime | None = None,
     ):
         self.label = label
         self.start = start
@@ -79,12 +159,86 @@ class JobDuration:
         self.runner = runner
         self.stage = stage
         self.status = status
-
-
-def plot_job_gantt(jobs, title, file_path=None, sort=True, limit=False):
+        # When the job was created and started waiting for a runner
+        self.created = created
+
+
+def _rectangles(left, bottom, width, height) -> np.ndarray:
+    """Vertices of axis-aligned rectangles, shape (n, 4, 2), for a PolyCollection."""
+    left, bottom = np.broadcast_arrays(np.asarray(left, dtype=float), np.asarray(bottom, dtype=float))
+    right = left + width
+    top = bottom + height
+    return np.stack([
+        np.stack([left, bottom], axis=-1),
+        np.stack([left, top], axis=-1),
+        np.stack([right, top], axis=-1),
+        np.stack([right, bottom], axis=-1),
+    ], axis=1)
+
+
+def gantt_fingerprint(jobs, title, sort=True, limit=False, dpi=None, highlight=None) -> str:
+    """Hash of the job timeline and the rendering parameters of a Gantt chart."""
+    timeline = sorted(jobs, reverse=True, key=lambda x: x.start) if sort else jobs
+    parameters = [GANTT_RENDER_VERSION, title, sort, limit, dpi, sorted(highlight or [])]
+    digest = hashlib.sha256(json.dumps(parameters).encode())
+    for job in timeline:
+        row = [job.label, job.start.timestamp(), job.end.timestamp(), job.runner, job.stage]
+        digest.update(json.dumps(row, default=str).encode())
+    return digest.hexdigest()
+
+
+def gantt_output_file(file_path) -> Path:
+    """The file savefig writes to, which appends .png to paths without extension."""
+    file_path = Path(file_path)
+    return file_path if file_path.suffix else file_path.with_name(f"{file_path.name}.png")
+
+
+def load_gantt_manifest(folder: Path) -> dict[str, str]:
+    manifest_file = Path(folder) / GANTT_MANIFEST
+    if not manifest_file.exists():
+        return {}
+    return json.loads(manifest_file.read_text())
+
+
+def update_gantt_manifest(folder: Path, fingerprints: dict[str, str]):
+    """Adds the fingerprints of freshly rendered charts to the manifest of their folder."""
+    if not fingerprints:
+        return
+    manifest = load_gantt_manifest(folder)
+    manifest.update(fingerprints)
+    manifest_file = Path(folder) / GANTT_MANIFEST
+    tmp_file = manifest_file.with_name(f"{manifest_file.name}.{os.getpid()}.tmp")
+    tmp_file.write_text(json.dumps(manifest, indent='\t', sort_keys=True))
+    os.replace(tmp_file, manifest_file)
+
+
+def is_gantt_unchanged(file_path, fingerprint: str, manifest: dict[str, str] | None = None) -> bool:
+    output_file = gantt_output_file(file_path)
+    if manifest is None:
+        manifest = load_gantt_manifest(output_file.parent)
+    return manifest.get(output_file.name) == fingerprint and output_file.exists()
+
+
+def plot_job_gantt(jobs, title, file_path=None, sort=True, limit=False, dpi=None, skip_unchanged=True,
+                   highlight=None):
+    """
+    Renders the jobs as a Gantt chart, saved to file_path if given.
+
+    Args:
+        dpi: Resolution of the saved chart, defaults to 300 for more than 30 jobs and 200 otherwise
+        skip_unchanged: If the chart at file_path was rendered from the same jobs and parameters,
+            as recorded in the manifest of its folder, it is not rendered again
+        highlight: Labels of jobs to outline, e.g. the critical path
+    """
     if not jobs:
         return
 
+    fingerprint = None
+    if file_path and skip_unchanged:
+        fingerprint = gantt_fingerprint(jobs, title, sort, limit, dpi, highlight)
+        if is_gantt_unchanged(file_path, fingerprint):
+            return
+
     # Sort jobs (latest start first)
     if sort:
         steps_sorted = sorted(jobs, reverse=True, key=lambda x: x.start)
@@ -93,19 +247,20 @@ def plot_job_gantt(jobs, title, file_path=None, sort=True, limit=False):
         steps_sorted.reverse()
 
     step_names = [s.label for s in steps_sorted]
-    start_times = [s.start for s in steps_sorted]
-    end_times = [s.end for s in steps_sorted]
+    job_count = len(steps_sorted)
 
-    # Normalize start times so axis begins at 0
-    t0 = min(start_times)
-    start_offsets = [(s - t0).total_seconds() for s in start_times]
-    durations = [(e - s).total_seconds() for s, e in zip(start_times, end_times)]
+    # Normalize start times so axis begins at 0, in days for matplotlib
+    t0 = min(s.start for s in steps_sorted)
+    start_offsets_days = np.fromiter(((s.start - t0).total_seconds() for s in steps_sorted), float, job_count) / 86400
+    durations_days = np.fromiter(((s.end - s.start).total_seconds() for s in steps_sorted), float, job_count) / 86400
+    end_offsets_days = start_offsets_days + durations_days
 
-    job_count = len(steps_sorted)
     large_plot = job_count > 30
+    output_dpi = dpi or (300 if large_plot else 200)
     if large_plot:
         height_per_job = 0.6
-        fig_height = max(6, job_count * height_per_job)
+        # Beyond ~16k pixels (Agg fails at 64k) rendering time is dominated by the canvas size
+        fig_height = min(max(6, job_count * height_per_job), MAX_GANTT_PIXELS / output_dpi)
         fig_width = 16
         fig_dpi = 200
         use_constrained_layout = True
@@ -120,112 +275,91 @@ def plot_job_gantt(jobs, title, file_path=None, sort=True, limit=False):
         dpi=fig_dpi,
         constrained_layout=use_constrained_layout,
     )
-    yticks = list(range(len(steps_sorted)))
-
-    # Convert seconds → days for matplotlib
-    start_offsets_days = [so / 86400 for so in start_offsets]
-    durations_days = [d / 86400 for d in durations]
+    yticks = np.arange(job_count)
 
-    colors = None
+    colors = np.tile(matplotlib.colors.to_rgba('tab:blue'), (job_count, 1))
     legend_handles = None
     runner_names = [s.runner for s in steps_sorted if getattr(s, "runner", None)]
     if runner_names:
         unique_runners = list(dict.fromkeys(runner_names))
         cmap = plt.get_cmap('tab20')
-        runner_colors = {runner: cmap(i % cmap.N) for i, runner in enumerate(unique_runners)}
-        colors = [runner_colors.get(s.runner, 'tab:blue') for s in steps_sorted]
+        runner_codes = {runner: i for i, runner in enumerate(unique_runners)}
+        codes = np.fromiter((runner_codes.get(getattr(s, "runner", None), -1) for s in steps_sorted), int, job_count)
+        runner_colors = cmap(np.arange(len(unique_runners)) % cmap.N)
+        colors[codes >= 0] = runner_colors[codes[codes >= 0]]
         legend_handles = [
-            matplotlib.patches.Patch(color=runner_colors[runner], label=runner)
-            for runner in unique_runners
+            matplotlib.patches.Patch(color=runner_colors[i], label=runner)
+            for i, runner in enumerate(unique_runners)
         ]
 
     stage_handles = None
     stage_names = [s.stage for s in steps_sorted if getattr(s, "stage", None)]
-    stage_colors = {}
     if stage_names:
         unique_stages = list(dict.fromkeys(stage_names))
+        stage_codes = {stage: i for i, stage in enumerate(unique_stages)}
+        codes = np.fromiter((stage_codes.get(getattr(s, "stage", None), -1) for s in steps_sorted), int, job_count)
+        has_stage = codes >= 0
+
+        # Time range of every stage in a single pass over the jobs
+        stage_start = np.full(len(unique_stages), np.inf)
+        stage_end = np.full(len(unique_stages), -np.inf)
+        np.minimum.at(stage_start, codes[has_stage], start_offsets_days[has_stage])
+        np.maximum.at(stage_end, codes[has_stage], end_offsets_days[has_stage])
+
+        # Stages are colored in the order they start
+        order = np.argsort(stage_start, kind='stable')
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
         stage_cmap = plt.get_cmap('Pastel1')
-        stage_first_offsets = {}
-        for stage in unique_stages:
-            indices = [
-                index
-                for index, step in enumerate(steps_sorted)
-                if getattr(step, "stage", None) == stage
-            ]
-            if indices:
-                stage_first_offsets[stage] = min(start_offsets_days[i] for i in indices)
-            else:
-                stage_first_offsets[stage] = float("inf")
-        unique_stages = sorted(unique_stages, key=lambda stage: stage_first_offsets.get(stage, float("inf")))
-        stage_colors = {stage: stage_cmap(i % stage_cmap.N) for i, stage in enumerate(unique_stages)}
+        stage_colors = stage_cmap(rank % stage_cmap.N)
         stage_handles = [
-            matplotlib.patches.Patch(color=stage_colors[stage], label=stage, alpha=0.4)
-            for stage in unique_stages
+            matplotlib.patches.Patch(color=stage_colors[code], label=unique_stages[code], alpha=0.4)
+            for code in order
         ]
 
-        stage_indices = {stage: [] for stage in unique_stages}
-        stage_time_ranges = {stage: [] for stage in unique_stages}
-        for index, step in enumerate(steps_sorted):
-            if step.stage in stage_indices:
-                stage_indices[step.stage].append(index)
-                start_offset = start_offsets_days[index]
-                end_offset = start_offsets_days[index] + durations_days[index]
-                stage_time_ranges[step.stage].append((start_offset, end_offset))
-
-        for stage, indices in stage_indices.items():
-            if not indices:
-                continue
-            stage_times = stage_time_ranges.get(stage, [])
-            if not stage_times:
-                continue
-            stage_start = min(start for start, _ in stage_times)
-            stage_end = max(end for _, end in stage_times)
-            stage_span = max(stage_end - stage_start, 1 / 86400)
-            margin_days = max(stage_span * 0.01, 1 / 86400)
-            stage_left = max(stage_start - margin_days, 0)
-            stage_width = (stage_end - stage_start) + (2 * margin_days)
-
-            sorted_indices = sorted(indices)
-            runs = []
-            run_start = sorted_indices[0]
-            run_end = sorted_indices[0]
-            for idx in sorted_indices[1:]:
-                if idx == run_end + 1:
-                    run_end = idx
-                else:
-                    runs.append((run_start, run_end))
-                    run_start = idx
-                    run_end = idx
-            runs.append((run_start, run_end))
-
-            for run_start, run_end in runs:
-                run_length = run_end - run_start + 1
-                run_center = (run_start + run_end) / 2
-                ax.barh(
-                    run_center,
-                    stage_width,
-                    left=stage_left,
-                    height=run_length,
-                    align='center',
-                    color=stage_colors.get(stage, '#dddddd'),
-                    alpha=0.25,
-                    zorder=0,
-                )
+        stage_span = np.maximum(stage_end - stage_start, 1 / 86400)
+        margin_days = np.maximum(stage_span * 0.01, 1 / 86400)
+        stage_left = np.maximum(stage_start - margin_days, 0)
+        stage_width = (stage_end - stage_start) + (2 * margin_days)
+
+        # One band per run of consecutive rows of the same stage
+        boundaries = np.flatnonzero(np.diff(codes)) + 1
+        run_starts = np.concatenate(([0], boundaries))
+        run_ends = np.concatenate((boundaries, [job_count]))
+        run_codes = codes[run_starts]
+        banded = run_codes >= 0
+        run_starts, run_ends, run_codes = run_starts[banded], run_ends[banded], run_codes[banded]
+        bands = PolyCollection(
+            _rectangles(stage_left[run_codes], run_starts - 0.5, stage_width[run_codes], run_ends - run_starts),
+            facecolors=stage_colors[run_codes],
+            alpha=0.25,
+            linewidths=0,
+            zorder=0,
+        )
+        ax.add_collection(bands)
 
     # Draw bars
-    ax.barh(
-        yticks,
-        durations_days,
-        left=start_offsets_days,
-        height=0.8,
-        align='center',
-        color=colors,
+    highlighted = np.array([label in highlight for label in step_names]) if highlight else np.zeros(job_count, bool)
+    bars = PolyCollection(
+        _rectangles(start_offsets_days, yticks - 0.4, durations_days, 0.8),
+        facecolors=colors,
+        edgecolors='black',
+        linewidths=np.where(highlighted, 1.5, 0),
         zorder=2,
     )
+    # Like barh, the time axis starts at the earliest bar without margin
+    bars.sticky_edges.x.append(0)
+    ax.add_collection(bars)
+    ax.autoscale_view()
 
-    ax.set_yticks(yticks)
     label_fontsize = 6 if job_count > 120 else 8
-    ax.set_yticklabels(step_names, fontsize=label_fontsize)
+    # Once the rows are lower than the labels, only every n-th job is labeled
+    label_step = max(1, math.ceil(job_count * label_fontsize * 1.5 / 72 / fig_height))
+    ax.set_yticks(yticks[::label_step])
+    ax.set_yticklabels(step_names[::label_step], fontsize=label_fontsize)
+    for label, is_highlighted in zip(ax.get_yticklabels(), highlighted[::label_step]):
+        if is_highlighted:
+            label.set_fontweight('bold')
     ax.set_xlabel("Time (HH:MM:SS)")
     ax.set_ylabel("Step/Job")
     ax.set_title(title)
@@ -295,7 +429,9 @@ def plot_job_gantt(jobs, title, file_path=None, sort=True, limit=False):
         legend_padding = 0.12 + (0.06 * legend_rows)
         plt.tight_layout(rect=(0, legend_padding, 1, 1))
     if file_path:
-        output_dpi = 300 if large_plot else 200
         plt.savefig(file_path, bbox_inches="tight", pad_inches=0.4, dpi=output_dpi)
     plt.close(fig)
     plt.close("all")
+    if fingerprint is not None:
+        output_file = gantt_output_file(file_path)
+        update_gantt_manifest(output_file.parent, {output_file.name: fingerprint})
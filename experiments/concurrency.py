@@ -0,0 +1,213 @@
+"""
+Concurrency of the jobs of a run over time: how many jobs ran and waited at once, when each runner was busy,
+and how long jobs waited for a runner (created -> started).
+
+All profiles come from a sort-based sweep over the interval bounds, so they take O(n log n) for n jobs:
+
+    python -m experiments.concurrency github --experiment 3
+"""
+import argparse
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+import matplotlib
+import numpy as np
+from matplotlib import pyplot as plt
+
+from experiments.commons import JobDuration, get_experiment_folder, get_latest_experiment_number
+from experiments.store import get_experiment_store
+
+
+def sweep_counts(starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Number of open intervals over time.
+
+    Returns:
+        The times at which the count changes and the count from each time until the next.
+        An interval ending when another one starts does not overlap it.
+    """
+    times = np.concatenate([starts, ends])
+    deltas = np.concatenate([np.ones(len(starts), int), -np.ones(len(ends), int)])
+    order = np.lexsort((deltas, times))
+    times = times[order]
+    counts = np.cumsum(deltas[order])
+    # Keep the count after the last event at each time
+    last = np.append(times[1:] != times[:-1], True)
+    return times[last], counts[last]
+
+
+def merge_intervals(starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Merges overlapping intervals into disjoint ones, sorted by start."""
+    if len(starts) == 0:
+        return starts, ends
+    order = np.argsort(starts, kind='stable')
+    starts, ends = starts[order], ends[order]
+    reach = np.maximum.accumulate(ends)
+    first = np.flatnonzero(np.append(True, starts[1:] > reach[:-1]))
+    return starts[first], np.maximum.reduceat(ends, first)
+
+
+@dataclass
+class RunnerUsage:
+    """Busy intervals of one runner, in seconds after the origin of the analysis."""
+
+    runner: str
+    jobs: int
+    busy_starts: np.ndarray
+    busy_ends: np.ndarray
+    utilization: float
+
+    @property
+    def busy(self) -> float:
+        return float((self.busy_ends - self.busy_starts).sum())
+
+    def idle_intervals(self, window: tuple[float, float]) -> tuple[np.ndarray, np.ndarray]:
+        """Gaps between the busy intervals within the window."""
+        idle_starts = np.append(window[0], self.busy_ends)
+        idle_ends = np.append(self.busy_starts, window[1])
+        keep = idle_ends > idle_starts
+        return idle_starts[keep], idle_ends[keep]
+
+
+@dataclass
+class ConcurrencyAnalysis:
+    """Concurrency profiles of a run, times in seconds after the origin (the first creation or start)."""
+
+    origin: datetime
+    window: tuple[float, float]
+    times: np.ndarray
+    running: np.ndarray
+    queue_times: np.ndarray
+    queued: np.ndarray
+    waits: np.ndarray
+    runners: list[RunnerUsage]
+
+    @property
+    def span(self) -> float:
+        """Time from the first start to the last end."""
+        return self.window[1] - self.window[0]
+
+    @property
+    def peak_parallelism(self) -> int:
+        return int(self.running.max()) if len(self.running) else 0
+
+    @property
+    def mean_parallelism(self) -> float:
+        """Time-weighted mean number of running jobs between the first start and the last end."""
+        if self.span <= 0:
+            return 0.0
+        return float((self.running[:-1] * np.diff(self.times)).sum() / self.span)
+
+    def summary(self) -> dict:
+        waits = self.waits[~np.isnan(self.waits)]
+        return {
+            'jobs': len(self.waits),
+            'span': self.span,
+            'peak_parallelism': self.peak_parallelism,
+            'mean_parallelism': self.mean_parallelism,
+            'peak_queued': int(self.queued.max()) if len(self.queued) else 0,
+            'mean_wait': float(waits.mean()) if len(waits) else None,
+            'p95_wait': float(np.percentile(waits, 95)) if len(waits) else None,
+            'max_wait': float(waits.max()) if len(waits) else None,
+            'runners': len(self.runners),
+            'mean_utilization': float(np.mean([usage.utilization for usage in self.runners])) if self.runners else None,
+        }
+
+
+def analyze_concurrency(jobs: list[JobDuration]) -> ConcurrencyAnalysis:
+    """
+    Computes the concurrency profiles of the jobs of a run.
+    Queue waits need the created time of the jobs, runner usage needs their runner.
+    """
+    if not jobs:
+        raise ValueError('No jobs to analyze')
+    job_count = len(jobs)
+    origin = min(min(job.start, job.created or job.start) for job in jobs)
+    starts = np.fromiter(((job.start - origin).total_seconds() for job in jobs), float, job_count)
+    ends = np.fromiter(((job.end - origin).total_seconds() for job in jobs), float, job_count)
+    created = np.fromiter(((job.created - origin).total_seconds() if job.created else np.nan for job in jobs),
+                          float, job_count)
+    window = (float(starts.min()), float(ends.max()))
+
+    times, running = sweep_counts(starts, ends)
+    has_created = ~np.isnan(created)
+    queue_times, queued = sweep_counts(created[has_created], np.maximum(starts, created)[has_created])
+
+    runner_jobs = {}
+    for index, job in enumerate(jobs):
+        if job.runner:
+            runner_jobs.setdefault(job.runner, []).append(index)
+    runners = []
+    for runner, indices in runner_jobs.items():
+        busy_starts, busy_ends = merge_intervals(starts[indices], ends[indices])
+        busy = (busy_ends - busy_starts).sum()
+        utilization = float(busy / (window[1] - window[0])) if window[1] > window[0] else 0.0
+        runners.append(RunnerUsage(runner, len(indices), busy_starts, busy_ends, utilization))
+
+    return ConcurrencyAnalysis(origin, window, times, running, queue_times, queued, starts - created, runners)
+
+
+def plot_concurrency(analysis: ConcurrencyAnalysis, title: str, file_path=None):
+    """Plots the running and queued jobs over time and the busy intervals of every runner."""
+    runner_count = len(analysis.runners)
+    lanes_height = min(0.25 * runner_count, 12)
+    fig, axes = plt.subplots(
+        2 if runner_count else 1, 1, sharex=True, squeeze=False, constrained_layout=True,
+        figsize=(14, 4 + lanes_height), height_ratios=[4, lanes_height] if runner_count else [1],
+    )
+    ax = axes[0, 0]
+    ax.step(analysis.times, analysis.running, where='post', label='Running')
+    if len(analysis.queue_times):
+        ax.step(analysis.queue_times, analysis.queued, where='post', label='Queued')
+    ax.set_ylabel('Jobs')
+    ax.set_title(f"{title}\npeak {analysis.peak_parallelism} running, mean {analysis.mean_parallelism:.1f}")
+    ax.legend(loc='upper right')
+    ax.grid(axis='both', alpha=0.4)
+
+    if runner_count:
+        lanes = axes[1, 0]
+        cmap = plt.get_cmap('tab20')
+        usages = sorted(analysis.runners, key=lambda usage: usage.runner)
+        for lane, usage in enumerate(usages):
+            lanes.broken_barh(list(zip(usage.busy_starts, usage.busy_ends - usage.busy_starts)), (lane - 0.4, 0.8),
+                              color=cmap(lane % cmap.N))
+        lanes.set_yticks(range(runner_count))
+        lanes.set_yticklabels(
+            [f"{usage.runner} ({usage.utilization:.0%})" for usage in usages],
+            fontsize=6 if runner_count > 20 else 8,
+        )
+        lanes.set_ylim(-0.5, runner_count - 0.5)
+        lanes.grid(axis='x', alpha=0.4)
+
+    bottom = axes[-1, 0]
+    bottom.set_xlabel('Time (HH:MM:SS)')
+    bottom.xaxis.set_major_formatter(matplotlib.ticker.FuncFormatter(
+        lambda x, pos: f"{int(x) // 3600:02}:{int(x) % 3600 // 60:02}:{int(x) % 60:02}"))
+    if file_path:
+        plt.savefig(file_path, dpi=160)
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('platform', choices=('github', 'gitlab'))
+    parser.add_argument('--experiment', type=int, help='Experiment number, defaults to the latest')
+    args = parser.parse_args()
+
+    experiment_number = args.experiment if args.experiment is not None else get_latest_experiment_number(args.platform)
+    folder = get_experiment_folder(experiment_number, args.platform)
+    store = get_experiment_store(experiment_number, args.platform)
+    summaries = {}
+    for run_id, jobs in store.load_job_durations().items():
+        if not jobs:
+            continue
+        analysis = analyze_concurrency(jobs)
+        summaries[run_id] = analysis.summary()
+        print(run_id, summaries[run_id])
+        plot_concurrency(analysis, f"Concurrency of run {run_id}", folder / f"concurrency_run{run_id}.png")
+    (folder / 'concurrency.json').write_text(json.dumps(summaries, indent='\t'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""
+Scheduling-order fairness of the runs of an experiment.
+
+For every run, the order in which the jobs started is compared with the orders of shortest job first (SJF),
+longest processing time first (LPT) and declaration order (job ids), using Spearman's rho and Kendall's tau-b.
+The makespan of a run is compared with an LPT schedule of the same jobs on as many runners as the run used
+at most. The metrics are computed on padded (runs x jobs) arrays, Kendall's tau run by run in O(n log n):
+
+    python -m experiments.fairness github --experiment 3
+"""
+import argparse
+import csv
+from dataclasses import dataclass
+
+import numpy as np
+
+from experiments.commons import get_experiment_folder, get_latest_experiment_number
+from experiments.concurrency import sweep_counts
+from experiments.store import get_experiment_store
+
+REFERENCE_ORDERS = ('sjf', 'lpt', 'declaration')
+COLUMNS = ('run_id', 'jobs', 'parallelism', 'makespan', 'lpt_makespan', 'makespan_penalty') + tuple(
+    f"{measure}_{order}" for order in REFERENCE_ORDERS for measure in ('spearman', 'kendall'))
+
+
+@dataclass
+class RunJobs:
+    """Jobs of the runs as (runs x jobs) arrays, padded with NaN."""
+
+    run_ids: list[int]
+    job_ids: np.ndarray
+    started: np.ndarray
+    finished: np.ndarray
+
+    @classmethod
+    def from_rows(cls, jobs_by_run: dict[int, list[dict]]) -> 'RunJobs':
+        """Uses the job rows of the experiment store, jobs that never ran are left out."""
+        runs = {
+            run_id: [job for job in jobs if job['started_at'] is not None and job['finished_at'] is not None]
+            for run_id, jobs in jobs_by_run.items()
+        }
+        runs = {run_id: jobs for run_id, jobs in runs.items() if jobs}
+        width = max((len(jobs) for jobs in runs.values()), default=0)
+        shape = (len(runs), width)
+        job_ids, started, finished = np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+        for row, jobs in enumerate(runs.values()):
+            job_ids[row, :len(jobs)] = [job['job_id'] for job in jobs]
+            started[row, :len(jobs)] = [job['started_at'] for job in jobs]
+            finished[row, :len(jobs)] = [job['finished_at'] for job in jobs]
+        return cls(list(runs), job_ids, started, finished)
+
+    @property
+    def durations(self) -> np.ndarray:
+        return self.finished - self.started
+
+    @property
+    def job_counts(self) -> np.ndarray:
+        return (~np.isnan(self.started)).sum(axis=1)
+
+
+def rank_rows(values: np.ndarray) -> np.ndarray:
+    """Ranks (1-based) of the values of every row, ties get their average rank and NaN stays NaN."""
+    runs, width = values.shape
+    order = np.argsort(values, axis=1, kind='stable')
+    sorted_values = np.take_along_axis(values, order, axis=1)
+    positions = np.broadcast_to(np.arange(width), values.shape)
+    group_start = np.ones(values.shape, bool)
+    group_start[:, 1:] = sorted_values[:, 1:] != sorted_values[:, :-1]
+    group_end = np.ones(values.shape, bool)
+    group_end[:, :-1] = group_start[:, 1:]
+    first = np.maximum.accumulate(np.where(group_start, positions, 0), axis=1)
+    last = np.minimum.accumulate(np.where(group_end, positions, width)[:, ::-1], axis=1)[:, ::-1]
+    ranks = np.empty(values.shape)
+    np.put_along_axis(ranks, order, (first + last) / 2 + 1, axis=1)
+    ranks[np.isnan(values)] = np.nan
+    return ranks
+
+
+def spearman_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Spearman's rho of every row pair, the Pearson correlation of the ranks."""
+    missing = np.isnan(a) | np.isnan(b)
+    ranks_a = rank_rows(np.where(missing, np.nan, a))
+    ranks_b = rank_rows(np.where(missing, np.nan, b))
+    centered_a = ranks_a - np.nanmean(ranks_a, axis=1, keepdims=True)
+    centered_b = ranks_b - np.nanmean(ranks_b, axis=1, keepdims=True)
+    covariance = np.nansum(centered_a * centered_b, axis=1)
+    scale = np.sqrt(np.nansum(centered_a ** 2, axis=1) * np.nansum(centered_b ** 2, axis=1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(scale > 0, covariance / scale, np.nan)
+
+
+def kendall_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Kendall's tau-b of every row pair, pairs with a NaN are left out."""
+    taus = np.full(len(a), np.nan)
+    for row, (values_a, values_b) in enumerate(zip(a, b)):
+        valid = ~(np.isnan(values_a) | np.isnan(values_b))
+        taus[row] = kendall_tau_b(values_a[valid], values_b[valid])
+    return taus
+
+
+def kendall_tau_b(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    Kendall's tau-b with Knight's algorithm in O(n log n) time and O(n) memory: after sorting by a and b,
+    the discordant pairs are the inversions of b, counted while merge sorting it.
+    """
+    n = len(a)
+    order = np.lexsort((b, a))
+    a, b = a[order], b[order]
+    pairs = n * (n - 1) / 2
+    ties_a = _tied_pairs(a[1:] == a[:-1])
+    sorted_b = np.sort(b)
+    ties_b = _tied_pairs(sorted_b[1:] == sorted_b[:-1])
+    ties_both = _tied_pairs((a[1:] == a[:-1]) & (b[1:] == b[:-1]))
+    discordant = _count_inversions(np.unique(b, return_inverse=True)[1])
+    scale = np.sqrt((pairs - ties_a) * (pairs - ties_b))
+    if scale == 0:
+        return np.nan
+    return float((pairs - ties_a - ties_b + ties_both - 2 * discordant) / scale)
+
+
+def _tied_pairs(equal_to_previous: np.ndarray) -> float:
+    """Number of tied pairs of a sorted array, from whether each element equals the one before it."""
+    boundaries = np.flatnonzero(np.concatenate(([True], ~equal_to_previous, [True])))
+    sizes = np.diff(boundaries)
+    return float((sizes * (sizes - 1) / 2).sum())
+
+
+def _count_inversions(ranks: np.ndarray) -> int:
+    """
+    Pairs i < j with ranks[i] > ranks[j], by a bottom-up merge sort whose merges of all blocks of a level
+    are done at once: offsetting every block by its index keeps the left halves globally sorted.
+    """
+    n = len(ranks)
+    if n < 2:
+        return 0
+    size = 1 << (n - 1).bit_length()
+    # Padding ranks higher than any rank goes to the end and adds no inversions
+    values = np.concatenate((ranks, np.full(size - n, n))).astype(np.int64)
+    inversions = 0
+    width = 1
+    while width < size:
+        blocks = values.reshape(-1, 2 * width)
+        block_index = np.arange(len(blocks))[:, None]
+        left = (blocks[:, :width] + block_index * (n + 1)).ravel()
+        right = blocks[:, width:] + block_index * (n + 1)
+        # Left elements of the same block that are not greater than each right element
+        not_greater = np.searchsorted(left, right.ravel(), side='right').reshape(right.shape) - block_index * width
+        inversions += int((width - not_greater).sum())
+        values = np.sort(blocks, axis=1).ravel()
+        width *= 2
+    return inversions
+
+
+def peak_parallelism(jobs: RunJobs) -> np.ndarray:
+    peaks = []
+    for started, finished in zip(jobs.started, jobs.finished):
+        ran = ~np.isnan(started)
+        _, running = sweep_counts(started[ran], finished[ran])
+        peaks.append(running.max() if len(running) else 0)
+    return np.array(peaks, int)
+
+
+def lpt_makespans(durations: np.ndarray, runners: np.ndarray) -> np.ndarray:
+    """
+    Makespan of the longest processing time first list schedule of every row of independent jobs,
+    each row on its own number of identical runners.
+    """
+    runs, width = durations.shape
+    longest_first = -np.sort(-np.nan_to_num(durations, nan=0.0), axis=1)
+    pool = max(int(runners.max(initial=1)), 1)
+    # Runners that a run does not have are never the least loaded
+    loads = np.where(np.arange(pool) < np.maximum(runners, 1)[:, None], 0.0, np.inf)
+    rows = np.arange(runs)
+    for column in range(width):
+        least_loaded = np.argmin(loads, axis=1)
+        loads[rows, least_loaded] += longest_first[:, column]
+    return np.where(np.isinf(loads), 0.0, loads).max(axis=1)
+
+
+def fairness_table(jobs: RunJobs) -> list[dict]:
+    """One row of fairness metrics per run, see COLUMNS."""
+    if not jobs.run_ids:
+        return []
+    references = {
+        'sjf': jobs.durations,
+        'lpt': -jobs.durations,
+        'declaration': jobs.job_ids,
+    }
+    metrics = {}
+    for name, reference in references.items():
+        metrics[f"spearman_{name}"] = spearman_rows(jobs.started, reference)
+        metrics[f"kendall_{name}"] = kendall_rows(jobs.started, reference)
+
+    parallelism = peak_parallelism(jobs)
+    makespans = np.nanmax(jobs.finished, axis=1) - np.nanmin(jobs.started, axis=1)
+    lpt = lpt_makespans(jobs.durations, parallelism)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        penalties = np.where(lpt > 0, makespans / lpt - 1, np.nan)
+
+    table = []
+    for row, run_id in enumerate(jobs.run_ids):
+        table.append({
+            'run_id': run_id,
+            'jobs': int(jobs.job_counts[row]),
+            'parallelism': int(parallelism[row]),
+            'makespan': float(makespans[row]),
+            'lpt_makespan': float(lpt[row]),
+            'makespan_penalty': float(penalties[row]),
+            **{name: float(values[row]) for name, values in metrics.items()},
+        })
+    return table
+
+
+def write_table(table: list[dict], file_path):
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(table)
+
+
+def print_table(table: list[dict]):
+    print(' '.join(f"{column:>20}" for column in COLUMNS))
+    for row in table:
+        print(' '.join(f"{row[column]:>20}" if isinstance(row[column], int) else f"{row[column]:>20.3f}"
+                       for column in COLUMNS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('platform', choices=('github', 'gitlab'))
+    parser.add_argument('--experiment', type=int, help='Experiment number, defaults to the latest')
+    args = parser.parse_args()
+
+    experiment_number = args.experiment if args.experiment is not None else get_latest_experiment_number(args.platform)
+    store = get_experiment_store(experiment_number, args.platform)
+    table = fairness_table(RunJobs.from_rows(store.load_jobs()))
+    print_table(table)
+    file_path = get_experiment_folder(experiment_number, args.platform) / 'fairness.csv'
+    write_table(table, file_path)
+    print('Wrote', file_path)
+
+
+if __name__ == '__main__':
+    main()
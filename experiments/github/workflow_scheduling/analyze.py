@@ -2,21 +2,22 @@ import json
 import time
 
 import matplotlib.pyplot as plt
-import requests
 
-from experiments.commons import (get_latest_experiment_number, gh_runs_url, gh_headers,
-                                 get_run_id_file, get_experiment_folder)
+from experiments.commons import (get_latest_experiment_number, gh_runs_url, gh_client,
+                                 get_run_id_file, get_experiment_folder, get_http_cache)
+from experiments.store import get_experiment_store, github_run_row
 
 experiment_number = get_latest_experiment_number()
 run_id_file = get_run_id_file(experiment_number)
 experiments_folder = get_experiment_folder(experiment_number)
+gh_client.cache = get_http_cache(experiment_number)
+store = get_experiment_store(experiment_number)
 
 
 def get_run_duration(run_id):
-    run = requests.get(f"{gh_runs_url}/{run_id}", headers=gh_headers).json()
+    run = gh_client.get_json(f"{gh_runs_url}/{run_id}")
     print(run['name'], run['id'], run['status'])
-    with open(experiments_folder / f"{run_id}.json", "w") as f:
-        json.dump(run, f, indent='\t')
+    store.save_run(github_run_row(run))
     if run.get("status") == "completed":
         return run.get("run_started_at"), run.get("updated_at")
     else:
@@ -31,7 +32,6 @@ def analyze():
         t1 = time.strptime(start, "%Y-%m-%dT%H:%M:%SZ")
         t2 = time.strptime(end, "%Y-%m-%dT%H:%M:%SZ")
         durations.append(time.mktime(t2) - time.mktime(t1))
-        time.sleep(0.5)
 
     plt.plot(durations)
     plt.xlabel("Run")
@@ -1,32 +1,36 @@
 import json
-from datetime import datetime
 
-import requests
-
-from experiments.commons import get_latest_experiment_number, get_experiment_folder, plot_job_gantt, \
-    get_run_id_file, gh_runs_url, gh_headers, JobDuration
+from experiments.commons import get_latest_experiment_number, get_experiment_folder, \
+    get_run_id_file, gh_client, get_http_cache, owner, repo
+from experiments.rendering import GanttTask, render_gantts
+from experiments.store import get_experiment_store, github_job_row
+from util.github import get_workflow_run_jobs
 
 experiment_number = 0
 experiments_folder = get_experiment_folder(experiment_number)
 run_id_file = get_run_id_file(experiment_number)
+gh_client.cache = get_http_cache(experiment_number)
+store = get_experiment_store(experiment_number)
 
 
 def main():
     run_ids = json.loads(run_id_file.read_text())
     for run_id in run_ids:
-        print('Creating Gantt chart for run', run_id)
-        jobs = requests.get(f"{gh_runs_url}/{run_id}/jobs", headers=gh_headers).json()
-        durations = []
-        for job in jobs['jobs']:
-            name = job['name']
-            started = datetime.fromisoformat(job['started_at'].replace("Z", "+00:00"))
-            finished = datetime.fromisoformat(job['completed_at'].replace("Z", "+00:00"))
-            durations.append(JobDuration(name, started, finished))
-        plot_job_gantt(
-            durations,
+        if not store.has_jobs(run_id):
+            jobs = get_workflow_run_jobs(owner, repo, run_id, client=gh_client)
+            store.save_jobs([github_job_row(job) for job in jobs])
+
+    jobs_by_run = store.load_job_durations()
+    tasks = [
+        GanttTask(
+            jobs_by_run.get(run_id, []),
             title=f"Job durations for run {run_id}",
             file_path=experiments_folder / f"gantt_run{run_id}.png"
         )
+        for run_id in run_ids
+    ]
+    print('Creating Gantt charts for', len(tasks), 'runs')
+    render_gantts(tasks)
 
 
 if __name__ == "__main__":
@@ -1,12 +1,21 @@
 print('Loading run_workflows', flush=True)
 
+import json
 import time
+import uuid
+from datetime import datetime, timezone
 
 import matplotlib.pyplot as plt
-import requests
 
 from experiments.commons import (get_fresh_experiment_number, owner, repo, workflow,
-                                 gh_headers, get_run_id_file, add_run_id, get_experiment_folder)
+                                 gh_client, get_run_id_file, add_run_id, get_experiment_folder,
+                                 dispatch_mode, dispatch_concurrency, dispatch_interval,
+                                 stop_ci_width, min_runs, max_runs, webhook_timeout)
+from experiments.bootstrap import SequentialBenchmark, StoppingRule, store_job_offsets
+from experiments.orchestrator import Orchestrator
+from experiments.store import get_experiment_store, github_job_row
+from experiments.webhooks import start_receiver
+from util.github import get_workflow_run_jobs, get_workflow_runs
 
 experiment_number = get_fresh_experiment_number()
 url_dispatch = f"https://api.github.com/repos/{owner}/{repo}/actions/workflows/{workflow}/dispatches"
@@ -14,55 +23,94 @@ url_runs = f"https://api.github.com/repos/{owner}/{repo}/actions/runs"
 run_id_file = get_run_id_file(experiment_number)
 
 
-def trigger(run_number):
+def trigger(run_number, correlation_id):
     print("Triggering run")
-    response = requests.post(url_dispatch, headers=gh_headers, json={"ref": "main"})
+    response = gh_client.post(url_dispatch, json={"ref": "main", "inputs": {"correlation_id": correlation_id}})
     print(response)
-    print('Triggered run', run_number, response.status_code)
+    print('Triggered run', run_number, correlation_id, response.status_code)
     if not response.ok:
         raise Exception(f"Failed to trigger run! {response.status_code} {response.reason}")
 
 
-def get_latest_run(run_number):
+def find_dispatched_run(run_number, correlation_id, dispatched_at):
     """
     Because of GitHub API design, the POST dispatch does of course not return the run id...
-    We instead need to poll the API to get the latest run.
+    Each dispatch instead carries a unique correlation id, which the workflows put into their run name.
+    The runs are filtered server-side, so only a handful of candidates has to be checked.
     """
-    print(run_number, "Getting latest run")
-    data = requests.get(url_runs, headers=gh_headers).json()
-    for run in data.get("workflow_runs", []):
-        print(run['name'])
-        if run.get("name") == workflow:
-            print(run_number, "Found latest run", run.get("id"))
+    print(run_number, "Looking for run", correlation_id)
+    # Allow for clock skew between this machine and GitHub
+    created_after = datetime.fromtimestamp(dispatched_at - 60, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    runs = get_workflow_runs(owner, repo, workflow, as_dataclass=False, client=gh_client,
+                             event="workflow_dispatch", created=f">={created_after}", per_page=100)
+    for run in runs:
+        if correlation_id in (run.get("display_title") or ""):
+            print(run_number, "Found run", run.get("id"))
             return run
-    print(run_number, "Failed to find latest run")
+    print(run_number, "Run not visible yet")
     return None
 
 
-def wait(run_id, run_number):
-    while True:
-        run = requests.get(f"{url_runs}/{run_id}", headers=gh_headers).json()
+class GitHubPlatform:
+    def dispatch(self, run_number):
+        correlation_id = uuid.uuid4().hex
+        dispatched_at = time.time()
+        trigger(run_number, correlation_id)
+        return run_number, correlation_id, dispatched_at
+
+    def find(self, handle):
+        run = find_dispatched_run(*handle)
+        if run is None:
+            return None
+        add_run_id(run_id_file, run['id'])
+        return run['id']
+
+    def poll(self, run_id):
+        run = gh_client.get_json(f"{url_runs}/{run_id}")
         print("Getting run status!")
-        print(run_number, run['name'], run['id'], run['status'])
+        print(run['name'], run['id'], run['status'])
         if run.get("status") == "completed":
-            return run.get("run_started_at"), run.get("updated_at")
-        time.sleep(10)
+            return 'completed', run
+        if run.get("status") == "in_progress":
+            return 'started', run
+        return 'queued', run
+
+    def timestamps(self, run):
+        return run.get("run_started_at"), run.get("updated_at")
 
 
 def experiment():
+    store = get_experiment_store(experiment_number)
+
+    def job_offsets(run_id):
+        if not store.has_jobs(run_id):
+            store.save_jobs([github_job_row(job) for job in get_workflow_run_jobs(owner, repo, run_id, client=gh_client)])
+        return store_job_offsets(store, run_id)
+
+    rule = StoppingRule(stop_ci_width, min_runs, max_runs) if stop_ci_width else None
+    benchmark = SequentialBenchmark(rule, job_offsets)
+    orchestrator = Orchestrator(
+        GitHubPlatform(),
+        mode=dispatch_mode,
+        concurrency=dispatch_concurrency,
+        arrival_interval=dispatch_interval,
+        find_interval=2,
+        receiver=start_receiver(get_experiment_folder(experiment_number) / 'webhooks'),
+        webhook_timeout=webhook_timeout,
+        store=store,
+        on_completed=benchmark.on_completed,
+        stop_condition=benchmark.done,
+    )
+    lifecycles = orchestrator.run(benchmark.run_count(15))
+
     durations = []
-    for run_number in range(15):
-        trigger(run_number)
-        time.sleep(3)
-        latest = None
-        while latest is None:
-            latest = get_latest_run(run_number)
-            time.sleep(10)
-        add_run_id(run_id_file, latest['id'])
-        start, end = wait(latest.get("id"), run_number)
+    for lifecycle in lifecycles:
+        if lifecycle.started_at is None or lifecycle.completed_at is None:
+            # The dispatch failed or the run never started
+            continue
         # TODO: This seems inaccurate! Poll webpage to get actual durations?
-        t1 = time.strptime(start, "%Y-%m-%dT%H:%M:%SZ")
-        t2 = time.strptime(end, "%Y-%m-%dT%H:%M:%SZ")
+        t1 = time.strptime(lifecycle.started_at, "%Y-%m-%dT%H:%M:%SZ")
+        t2 = time.strptime(lifecycle.completed_at, "%Y-%m-%dT%H:%M:%SZ")
         durations.append(time.mktime(t2) - time.mktime(t1))
 
 
@@ -73,6 +121,9 @@ def experiment():
     workflow_durations = get_experiment_folder(experiment_number) / f"workflow_durations.png"
     plt.savefig(workflow_durations)
 
+    (get_experiment_folder(experiment_number) / 'statistics.json').write_text(json.dumps(benchmark.summary(), indent='\t'))
+    benchmark.plot("Workflow Durations", get_experiment_folder(experiment_number) / "workflow_durations_ci.png")
+
 
 if __name__ == '__main__':
     print('Starting Experiment', flush=True)
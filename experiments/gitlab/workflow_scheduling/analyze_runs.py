@@ -1,11 +1,11 @@
 import json
-from datetime import datetime
 
 import matplotlib.pyplot as plt
-import requests
 
-from experiments.commons import (get_latest_experiment_number, get_run_id_file,
-                                 gitlab_url, gitlab_headers, gitlab_project_id, get_experiment_folder)
+from experiments.commons import (get_latest_experiment_number, get_run_id_file, get_experiment_folder)
+from experiments.fairness import RunJobs, fairness_table, print_table, write_table
+from experiments.gitlab.workflow_scheduling.fetch import fetch_pipelines
+from experiments.store import get_experiment_store
 
 experiment_number = get_latest_experiment_number('gitlab')
 run_id_file = get_run_id_file(experiment_number, 'gitlab')
@@ -14,69 +14,33 @@ run_ids = json.loads(run_id_file.read_text())
 def main():
     output_root = get_experiment_folder(experiment_number, 'gitlab')
     output_root.mkdir(exist_ok=True)
+    store = get_experiment_store(experiment_number, 'gitlab')
 
-    indices_120 = []
-    durations = []
+    fetch_pipelines(run_ids, store, with_pipeline=True)
+    jobs_by_run = store.load_jobs()
+    pipeline_durations = {run['run_id']: run['duration'] for run in store.load_runs()}
 
-    for run_id in run_ids:
-        jobs_url = f"{gitlab_url}/api/v4/projects/{gitlab_project_id}/pipelines/{run_id}/jobs"
-        jobs = requests.get(jobs_url, headers=gitlab_headers).json()
-
-        run_folder = output_root / str(run_id)
-        run_folder.mkdir(exist_ok=True)
-
-        enriched = []
-        for job in jobs:
-            job_id = job["id"]
-            detail = requests.get(f"{gitlab_url}/api/v4/projects/{gitlab_project_id}/jobs/{job_id}", headers=gitlab_headers).json()
-            started = detail.get("started_at")
-            created = detail.get("created_at")
-            finished = detail.get("finished_at")
-            enriched.append({
-                "id": job_id,
-                "name": detail.get("name"),
-                "created_at": created,
-                "started_at": started,
-                "finished_at": finished
-            })
-
-        sorted_jobs = sorted(
-            enriched,
-            key=lambda x: datetime.fromisoformat(x["started_at"].replace("Z", "+00:00")) if x["started_at"] else datetime.max
-        )
-
-        for wait_job in sorted_jobs:
-            print(wait_job)
-
-        idx_120 = None
-        for i, j in enumerate(sorted_jobs):
-            if j["name"] == "wait-jobs: [120]":
-                idx_120 = i
-                break
-        indices_120.append(idx_120)
-
-        pipe_detail = requests.get(f"{gitlab_url}/api/v4/projects/{gitlab_project_id}/pipelines/{run_id}", headers=gitlab_headers).json()
-        durations.append(pipe_detail.get("duration"))
-
-
-    xs, idxs = zip(*[(i, idx) for i, idx in enumerate(indices_120) if idx is not None])
-    _, durs = zip(*[(i, dur) for i, dur in enumerate(durations) if dur is not None])
+    table = fairness_table(RunJobs.from_rows({run_id: jobs_by_run.get(run_id, []) for run_id in run_ids}))
+    print_table(table)
+    write_table(table, output_root / "fairness.csv")
 
+    xs = range(len(table))
     fig, ax1 = plt.subplots()
 
-    color1 = 'tab:blue'
     ax1.set_xlabel("Run index")
-    ax1.set_ylabel("Index of 'wait (120)' job", color=color1)
-    ax1.plot(xs, idxs, 'o-', color=color1)
-    ax1.tick_params(axis='y', labelcolor=color1)
+    ax1.set_ylabel("Rank correlation of the start order")
+    for order, color in (("sjf", "tab:blue"), ("lpt", "tab:green"), ("declaration", "tab:purple")):
+        ax1.plot(xs, [row[f"spearman_{order}"] for row in table], 'o-', color=color, label=order.upper())
+    ax1.set_ylim(-1.05, 1.05)
+    ax1.legend(loc="lower left")
 
     ax2 = ax1.twinx()
     color2 = 'tab:orange'
     ax2.set_ylabel("Run duration (seconds)", color=color2)
-    ax2.plot(xs, durs, 's--', color=color2)
+    ax2.plot(xs, [pipeline_durations.get(row["run_id"]) for row in table], 's--', color=color2)
     ax2.tick_params(axis='y', labelcolor=color2)
 
-    plt.title("Index of 'wait (120)' job vs pipeline duration")
+    plt.title("Start order vs SJF, LPT and declaration order")
     plt.grid(True)
     plt.tight_layout()
 
@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from experiments.commons import gitlab_client, gitlab_project_id
+from experiments.store import ExperimentStore, gitlab_job_row, gitlab_run_row
+from util.gitlab import get_job, get_pipeline, get_pipeline_jobs
+
+# Job fields the analysis needs. The job listing returns them, the detail endpoint is only a fallback.
+REQUIRED_JOB_FIELDS = ('name', 'stage', 'status', 'created_at', 'started_at', 'finished_at')
+
+
+def is_incomplete(job: dict) -> bool:
+    """
+    Whether the listing returned a job without fields the analysis needs. Null timestamps are complete, jobs that
+    did not start or finish, or were canceled or failed before starting, have no such timestamps in the details either.
+    """
+    return any(field not in job for field in REQUIRED_JOB_FIELDS)
+
+
+def fetch_pipeline_job_rows(run_id: int, max_workers: int = 8) -> list[dict]:
+    """
+    Fetches the jobs of a pipeline with one paginated listing, plus details for incomplete jobs.
+    Up to max_workers pages are fetched at once.
+    """
+    rows = []
+    for job in get_pipeline_jobs(gitlab_client, gitlab_project_id, run_id, max_workers=max_workers):
+        if is_incomplete(job):
+            print('Getting job information for job', job['id'])
+            job = get_job(gitlab_client, gitlab_project_id, job['id'])
+        rows.append(gitlab_job_row(job, run_id))
+    return rows
+
+
+def fetch_pipelines(run_ids: list[int], store: ExperimentStore, with_pipeline: bool = False, max_workers: int = 8,
+                    connections: int = 16):
+    """
+    Fetches the jobs (and optionally the pipeline details) of all runs that are not in the store yet.
+    Runs are fetched concurrently, the store is only written from the calling thread. The pages of each job listing
+    are split so that at most `connections` requests, the connection pool size of the client session, are in flight.
+    """
+    stored_runs = {run['run_id'] for run in store.load_runs()}
+    missing_jobs = [run_id for run_id in run_ids if not store.has_jobs(run_id)]
+    missing_pipelines = [run_id for run_id in run_ids if with_pipeline and run_id not in stored_runs]
+    if not missing_jobs and not missing_pipelines:
+        return
+
+    run_workers = min(max_workers, connections, len(missing_jobs) + len(missing_pipelines))
+    page_workers = max(connections // run_workers, 1)
+    with ThreadPoolExecutor(max_workers=run_workers) as executor:
+        pipelines = executor.map(lambda run_id: get_pipeline(gitlab_client, gitlab_project_id, run_id), missing_pipelines)
+        job_rows = executor.map(lambda run_id: fetch_pipeline_job_rows(run_id, page_workers), missing_jobs)
+        for run_id, rows in zip(missing_jobs, job_rows):
+            print('Fetched', len(rows), 'jobs of pipeline', run_id)
+            store.save_jobs(rows)
+        store.save_runs([gitlab_run_row(pipeline) for pipeline in pipelines])
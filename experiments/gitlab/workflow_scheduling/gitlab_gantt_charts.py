@@ -1,11 +1,9 @@
 import json
-from datetime import datetime
 
-import requests
-
-from experiments.commons import (get_latest_experiment_number, get_run_id_file,
-                                 gitlab_url, gitlab_headers, gitlab_project_id, get_experiment_folder, JobDuration,
-                                 plot_job_gantt)
+from experiments.commons import get_latest_experiment_number, get_run_id_file, get_experiment_folder
+from experiments.gitlab.workflow_scheduling.fetch import fetch_pipelines
+from experiments.rendering import GanttTask, render_gantts
+from experiments.store import get_experiment_store
 
 experiment_number = get_latest_experiment_number('gitlab')
 experiments_folder = get_experiment_folder(experiment_number, 'gitlab')
@@ -16,37 +14,19 @@ run_ids = json.loads(run_id_file.read_text())
 def main():
     output_root = get_experiment_folder(experiment_number, 'gitlab')
     output_root.mkdir(exist_ok=True)
-
-    for run_id in run_ids:
-        print()
-        print('Creating Gantt chart for run', run_id)
-        durations = []
-
-        run_file = experiments_folder / f"run{run_id}.json"
-        if run_file.exists():
-            jobs = json.loads(run_file.read_text())
-        else:
-            jobs_url = f"{gitlab_url}/api/v4/projects/{gitlab_project_id}/pipelines/{run_id}/jobs"
-            response = requests.get(jobs_url, headers=gitlab_headers)
-            if not response.ok:
-                raise Exception(response.reason)
-            jobs = response.json()
-            run_file.write_text(json.dumps(jobs, indent='\t'))
-
-        for job in jobs:
-            print('Getting job information for job', job['id'])
-            job_id = job['id']
-            job_file = experiments_folder / f"run{run_id}-{job_id}.json"
-            if job_file.exists():
-                detail = json.loads(job_file.read_text())
-            else:
-                detail = requests.get(f"{gitlab_url}/api/v4/projects/{gitlab_project_id}/jobs/{job_id}", headers=gitlab_headers).json()
-                job_file.write_text(json.dumps(detail, indent='\t'))
-
-            started = datetime.fromisoformat(detail.get('started_at').replace("Z", "+00:00"))
-            finished = datetime.fromisoformat(detail.get('finished_at').replace("Z", "+00:00"))
-            durations.append(JobDuration(detail.get('name'), started, finished))
-        plot_job_gantt(durations,f"Step/job durations for run {run_id}", experiments_folder / f"gantt_run{run_id}")
+    store = get_experiment_store(experiment_number, 'gitlab')
+
+    fetch_pipelines(run_ids, store)
+
+    jobs_by_run = store.load_job_durations()
+    tasks = [
+        GanttTask(jobs_by_run.get(run_id, []), f"Step/job durations for run {run_id}",
+                  experiments_folder / f"gantt_run{run_id}")
+        for run_id in run_ids
+    ]
+    print()
+    print('Creating Gantt charts for', len(tasks), 'runs')
+    render_gantts(tasks)
 
 
 if __name__ == "__main__":
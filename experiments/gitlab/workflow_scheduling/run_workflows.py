@@ -1,45 +1,86 @@
-import time
+import json
 from datetime import datetime
 
 import matplotlib.pyplot as plt
-import requests
 
-from experiments.commons import (get_fresh_experiment_number, gitlab_url, gitlab_project_id, get_run_id_file,
-                                 gitlab_headers, gitlab_branch, add_run_id, get_experiment_folder)
+from experiments.commons import (get_fresh_experiment_number, gitlab_project_id, get_run_id_file,
+                                 gitlab_client, gitlab_branch, add_run_id, get_experiment_folder,
+                                 dispatch_mode, dispatch_concurrency, dispatch_interval,
+                                 stop_ci_width, min_runs, max_runs, webhook_timeout)
+from experiments.bootstrap import SequentialBenchmark, StoppingRule, store_job_offsets
+from experiments.gitlab.workflow_scheduling.fetch import fetch_pipelines
+from experiments.orchestrator import Orchestrator
+from experiments.store import get_experiment_store
+from experiments.webhooks import start_receiver
 
 experiment_number = get_fresh_experiment_number('gitlab')
-api_trigger = f"{gitlab_url}/api/v4/projects/{gitlab_project_id}/pipeline"
-api_pipelines = f"{gitlab_url}/api/v4/projects/{gitlab_project_id}/pipelines"
+api_trigger = f"/projects/{gitlab_project_id}/pipeline"
+api_pipelines = f"/projects/{gitlab_project_id}/pipelines"
 run_id_file = get_run_id_file(experiment_number, 'gitlab')
 
 
 def trigger(run_number):
-    response = requests.post(api_trigger, headers=gitlab_headers, data={"ref": gitlab_branch})
+    response = gitlab_client.post(api_trigger, data={"ref": gitlab_branch})
     print(response.json())
     print("Triggered run", run_number, response.status_code)
     return response.json()['id']
 
 
-def wait(pipeline_id, run_number):
-    while True:
-        r = requests.get(f"{api_pipelines}/{pipeline_id}", headers=gitlab_headers).json()
+class GitLabPlatform:
+    def dispatch(self, run_number):
+        run_id = trigger(run_number)
+        add_run_id(run_id_file, run_id)
+        return run_id
+
+    def find(self, run_id):
+        # The trigger response already contains the pipeline id
+        return run_id
+
+    def poll(self, pipeline_id):
+        r = gitlab_client.get_json(f"{api_pipelines}/{pipeline_id}")
         status = r.get("status")
-        print("Getting pipeline status!", run_number, pipeline_id, status)
+        print("Getting pipeline status!", pipeline_id, status)
         if status in ["success", "failed", "canceled", "skipped"]:
             print(r)
-            return r.get("created_at"), r.get("updated_at")
-        time.sleep(10)
+            return 'completed', r
+        if status == "running":
+            return 'started', r
+        return 'queued', r
+
+    def timestamps(self, r):
+        # End at finished_at like the webhook completion, updated_at only when the pipeline never finished
+        return r.get("created_at"), r.get("finished_at") or r.get("updated_at")
 
 
 def experiment():
+    store = get_experiment_store(experiment_number, 'gitlab')
+
+    def job_offsets(run_id):
+        fetch_pipelines([run_id], store)
+        return store_job_offsets(store, run_id)
+
+    rule = StoppingRule(stop_ci_width, min_runs, max_runs) if stop_ci_width else None
+    benchmark = SequentialBenchmark(rule, job_offsets)
+    orchestrator = Orchestrator(
+        GitLabPlatform(),
+        mode=dispatch_mode,
+        concurrency=dispatch_concurrency,
+        arrival_interval=dispatch_interval,
+        receiver=start_receiver(get_experiment_folder(experiment_number, 'gitlab') / 'webhooks'),
+        webhook_timeout=webhook_timeout,
+        store=store,
+        on_completed=benchmark.on_completed,
+        stop_condition=benchmark.done,
+    )
+    lifecycles = orchestrator.run(benchmark.run_count(10))
+
     durations = []
-    for run_number in range(10):
-        run_id = trigger(run_number)
-        time.sleep(3)
-        add_run_id(run_id_file, run_id)
-        start, end = wait(run_id, run_number)
-        start_dt = datetime.fromisoformat(start)
-        end_dt = datetime.fromisoformat(end)
+    for lifecycle in lifecycles:
+        if lifecycle.started_at is None or lifecycle.completed_at is None:
+            # The dispatch failed or the pipeline was canceled or skipped before it finished
+            continue
+        start_dt = datetime.fromisoformat(lifecycle.started_at)
+        end_dt = datetime.fromisoformat(lifecycle.completed_at)
         durations.append((end_dt - start_dt).total_seconds())
     plt.plot(durations)
     plt.xlabel("Run")
@@ -48,6 +89,10 @@ def experiment():
     workflow_durations = get_experiment_folder(experiment_number, 'gitlab') / f"workflow_durations.png"
     plt.savefig(workflow_durations)
 
+    folder = get_experiment_folder(experiment_number, 'gitlab')
+    (folder / 'statistics.json').write_text(json.dumps(benchmark.summary(), indent='\t'))
+    benchmark.plot("Pipeline Durations", folder / "workflow_durations_ci.png")
+
 
 if __name__ == "__main__":
     experiment()
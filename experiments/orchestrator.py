@@ -0,0 +1,171 @@
+import asyncio
+import time
+from dataclasses import dataclass, asdict
+from typing import Protocol
+
+from experiments.store import ExperimentStore
+from experiments.webhooks import WebhookReceiver
+
+PHASES = ('queued', 'started', 'completed')
+
+
+@dataclass
+class RunLifecycle:
+    """Wall clock times (epoch seconds) at which the orchestrator observed each phase of a run."""
+
+    run_number: int
+    run_id: int | None = None
+    dispatched: float | None = None
+    found: float | None = None
+    queued: float | None = None
+    started: float | None = None
+    completed: float | None = None
+    status: str | None = None
+    # Start and completion time as reported by the platform
+    started_at: str | None = None
+    completed_at: str | None = None
+
+
+class Platform(Protocol):
+    """Blocking platform operations, called from worker threads by the orchestrator."""
+
+    def dispatch(self, run_number: int):
+        """Triggers a run and returns a handle to find it."""
+
+    def find(self, handle) -> int | None:
+        """Returns the run id of a dispatched run, or None if it is not visible yet."""
+
+    def poll(self, run_id: int) -> tuple[str, dict]:
+        """Returns the phase (one of PHASES) and the run."""
+
+    def timestamps(self, run: dict) -> tuple[str | None, str | None]:
+        """Returns the start and completion time of a completed run."""
+
+
+class Orchestrator:
+    """
+    Dispatches runs and tracks their lifecycle, with many runs in flight at once.
+
+    Modes:
+        serial: The next run is dispatched once the previous one completed.
+        overlapping: Up to `concurrency` runs are in flight at once. If `arrival_interval` is set,
+            runs are dispatched at that fixed interval (seconds) instead of as soon as a slot is free,
+            regardless of how many runs are still in flight, so `concurrency` does not apply.
+
+    If `stop_condition` is set, it is checked before every dispatch after the first, and no more runs are
+    dispatched once it returns True. Runs in flight still complete.
+    With a webhook `receiver`, runs complete with their completion event. If none arrived within
+    `webhook_timeout` seconds, the run is polled, so a lost delivery cannot stall the experiment.
+    `on_completed` is called with the lifecycle of every completed run in a worker thread, so it may block
+    (e.g. to fetch the jobs of the run). Calls do not overlap.
+    """
+
+    def __init__(self, platform: Platform, mode: str = 'serial', concurrency: int = 1,
+                 arrival_interval: float | None = None, poll_interval: float = 10,
+                 find_interval: float | None = None,
+                 receiver: WebhookReceiver | None = None, webhook_timeout: float = 300,
+                 store: ExperimentStore | None = None,
+                 on_completed=None, stop_condition=None):
+        if mode not in ('serial', 'overlapping'):
+            raise ValueError(f"Unknown dispatch mode {mode}")
+        self.platform = platform
+        self.mode = mode
+        self.concurrency = 1 if mode == 'serial' else concurrency
+        self.arrival_interval = arrival_interval if mode == 'overlapping' else None
+        self.poll_interval = poll_interval
+        self.find_interval = poll_interval if find_interval is None else find_interval
+        self.receiver = receiver
+        self.webhook_timeout = webhook_timeout
+        self.store = store
+        self.on_completed = on_completed
+        self.stop_condition = stop_condition
+        self.lifecycles: list[RunLifecycle] = []
+
+    def run(self, count: int) -> list[RunLifecycle]:
+        return asyncio.run(self.run_async(count))
+
+    async def run_async(self, count: int) -> list[RunLifecycle]:
+        # Arrivals at a fixed interval do not wait for free slots
+        slots = None if self.arrival_interval else asyncio.Semaphore(self.concurrency)
+        self._callback_lock = asyncio.Lock()
+        tasks = []
+        for run_number in range(count):
+            if slots is not None:
+                await slots.acquire()
+            if run_number > 0 and self.stop_condition is not None and self.stop_condition():
+                if slots is not None:
+                    slots.release()
+                print('Stopping after', run_number, 'runs', flush=True)
+                break
+            tasks.append(asyncio.create_task(self._run(run_number, slots)))
+            if self.arrival_interval and run_number < count - 1:
+                await asyncio.sleep(self.arrival_interval)
+        await asyncio.gather(*tasks)
+        return self.lifecycles
+
+    async def _run(self, run_number: int, slots: asyncio.Semaphore | None):
+        lifecycle = RunLifecycle(run_number)
+        self.lifecycles.append(lifecycle)
+        try:
+            handle = await asyncio.to_thread(self.platform.dispatch, run_number)
+            lifecycle.dispatched = time.time()
+            self._record(lifecycle)
+
+            while lifecycle.run_id is None:
+                lifecycle.run_id = await asyncio.to_thread(self.platform.find, handle)
+                if lifecycle.run_id is None:
+                    await asyncio.sleep(self.find_interval)
+            lifecycle.found = time.time()
+            print(run_number, 'Found run', lifecycle.run_id, flush=True)
+            self._record(lifecycle)
+
+            if self.receiver is not None:
+                await self._wait_for_event(lifecycle)
+            else:
+                await self._poll(lifecycle)
+            print(run_number, 'Run', lifecycle.run_id, 'completed', lifecycle.status, flush=True)
+            self._record(lifecycle)
+            if self.on_completed is not None:
+                async with self._callback_lock:
+                    await asyncio.to_thread(self.on_completed, lifecycle)
+        finally:
+            if slots is not None:
+                slots.release()
+
+    async def _wait_for_event(self, lifecycle: RunLifecycle):
+        while True:
+            try:
+                event = await asyncio.to_thread(self.receiver.wait_for_completion, lifecycle.run_id,
+                                                self.webhook_timeout)
+                break
+            except TimeoutError:
+                if await self._poll_once(lifecycle):
+                    print(lifecycle.run_number, 'No completion event for run', lifecycle.run_id,
+                          'but polling found it completed', flush=True)
+                    return
+        lifecycle.queued, lifecycle.started = self.receiver.phase_times(event)
+        lifecycle.completed = event.received_at
+        lifecycle.status = event.status
+        lifecycle.started_at, lifecycle.completed_at = event.started_at, event.completed_at
+
+    async def _poll(self, lifecycle: RunLifecycle):
+        while not await self._poll_once(lifecycle):
+            await asyncio.sleep(self.poll_interval)
+
+    async def _poll_once(self, lifecycle: RunLifecycle) -> bool:
+        """Polls the run and records the phases observed, returns whether it completed"""
+        phase, run = await asyncio.to_thread(self.platform.poll, lifecycle.run_id)
+        now = time.time()
+        # Phases may be skipped between two polls, they are then attributed to the same poll
+        for observed in PHASES[:PHASES.index(phase) + 1]:
+            if getattr(lifecycle, observed) is None:
+                setattr(lifecycle, observed, now)
+        lifecycle.status = run.get('conclusion') or run.get('status')
+        if phase == 'completed':
+            lifecycle.started_at, lifecycle.completed_at = self.platform.timestamps(run)
+            return True
+        return False
+
+    def _record(self, lifecycle: RunLifecycle):
+        if self.store is not None:
+            self.store.save_lifecycle(asdict(lifecycle))
@@ -0,0 +1,89 @@
+"""
+Renders Gantt charts of many runs in a pool of worker processes.
+
+Rendering with Agg is CPU-bound and the charts of different runs are independent,
+so the charts are fanned out over one process per core (or RENDER_WORKERS processes).
+Charts whose jobs and parameters did not change since they were rendered are skipped.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import matplotlib
+
+from experiments.commons import (JobDuration, plot_job_gantt, render_workers, gantt_fingerprint,
+                                 gantt_output_file, load_gantt_manifest, update_gantt_manifest)
+
+
+@dataclass
+class GanttTask:
+    """Arguments of one plot_job_gantt call."""
+
+    jobs: list[JobDuration]
+    title: str
+    file_path: Path
+    sort: bool = True
+    limit: bool = False
+    dpi: int | None = None
+    highlight: set[str] | None = None
+
+    def fingerprint(self) -> str:
+        return gantt_fingerprint(self.jobs, self.title, self.sort, self.limit, self.dpi, self.highlight)
+
+
+def render_gantts(tasks: list[GanttTask], workers: int | None = None, skip_unchanged: bool = True) -> list[Path]:
+    """
+    Renders the charts of all tasks, in parallel if more than one worker is used.
+
+    Args:
+        tasks: The charts to render
+        workers: Number of worker processes, defaults to RENDER_WORKERS or the number of cores.
+            With a single worker, the charts are rendered in this process.
+        skip_unchanged: Skip charts whose fingerprint matches the manifest of their folder
+
+    Returns:
+        The file paths of the charts that were rendered, in the order of the tasks
+    """
+    pending = []
+    manifests = {}
+    for task in tasks:
+        if not task.jobs:
+            continue
+        output_file = gantt_output_file(task.file_path)
+        fingerprint = task.fingerprint()
+        if skip_unchanged:
+            if output_file.parent not in manifests:
+                manifests[output_file.parent] = load_gantt_manifest(output_file.parent)
+            if manifests[output_file.parent].get(output_file.name) == fingerprint and output_file.exists():
+                continue
+        pending.append((task, output_file, fingerprint))
+    print('Rendering', len(pending), 'of', len(tasks), 'Gantt charts', flush=True)
+
+    # Workers only render, the manifests are written by this process so that workers never race on them
+    workers = min(workers or render_workers or os.cpu_count() or 1, len(pending))
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers > 1 else None
+    fingerprints = {}
+    try:
+        tasks_to_render = [task for task, _, _ in pending]
+        rendered = executor.map(_render_gantt, tasks_to_render) if executor else map(_render_gantt, tasks_to_render)
+        for (_, output_file, fingerprint), _ in zip(pending, rendered):
+            fingerprints.setdefault(output_file.parent, {})[output_file.name] = fingerprint
+    finally:
+        if executor:
+            executor.shutdown()
+        for folder, folder_fingerprints in fingerprints.items():
+            update_gantt_manifest(folder, folder_fingerprints)
+    return [task.file_path for task, _, _ in pending]
+
+
+def _render_gantt(task: GanttTask) -> Path:
+    plot_job_gantt(task.jobs, task.title, task.file_path, sort=task.sort, limit=task.limit, dpi=task.dpi,
+                   skip_unchanged=False, highlight=task.highlight)
+    return task.file_path
+
+
+def _init_worker():
+    # Workers never have a display, whatever backend the parent process selected
+    os.environ['MPLBACKEND'] = 'Agg'
+    matplotlib.use('Agg', force=True)
@@ -0,0 +1,137 @@
+"""
+Critical path and slack of the jobs of a pipeline, using their observed durations.
+
+The critical path is the chain of dependent jobs with the largest total duration. No runner pool can finish
+the pipeline faster, so the gap between the observed makespan and the critical path shows how much time was
+lost to queueing. Speeding up a job only shortens the pipeline if the job is on the critical path, the slack
+of the other jobs tells how much later they could have run without delaying the pipeline:
+
+    python -m experiments.simulation.critical_path pipeline.json
+"""
+import argparse
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+
+from experiments.simulation.pipeline import Pipeline, build_graph
+
+
+@dataclass
+class CriticalPathAnalysis:
+    """Schedule of the jobs without runner limits, in seconds after the pipeline start."""
+
+    names: list[str]
+    durations: np.ndarray
+    earliest_start: np.ndarray
+    latest_start: np.ndarray
+    critical_path: list[int]
+    lower_bound: float
+    makespan: float
+
+    @property
+    def slack(self) -> np.ndarray:
+        """How much later each job could start without delaying the pipeline."""
+        return self.latest_start - self.earliest_start
+
+    @property
+    def gap(self) -> float:
+        """Time the observed makespan exceeds the critical path."""
+        return self.makespan - self.lower_bound
+
+    @property
+    def critical_jobs(self) -> list[str]:
+        return [self.names[job] for job in self.critical_path]
+
+
+def analyze_critical_path(pipeline: Pipeline, mode: str = 'auto') -> CriticalPathAnalysis:
+    """
+    Computes the critical path and the slack of every job in time linear in the number of jobs and dependencies.
+
+    Args:
+        pipeline: The pipeline
+        mode: Dependency mode of build_graph, by default the needs or the stage order if no job declares needs
+
+    Raises:
+        ValueError: If the job dependencies contain a cycle, or if the critical path is longer than the observed
+            makespan, i.e. the dependencies contradict the observed timeline
+    """
+    graph = build_graph(pipeline, mode)
+    order = graph.topological_order()
+    durations = graph.durations
+
+    # Forward pass: earliest start of every node
+    earliest_start = np.zeros(graph.node_count)
+    for node in order:
+        finish = earliest_start[node] + durations[node]
+        for successor in graph.successors[node]:
+            if finish > earliest_start[successor]:
+                earliest_start[successor] = finish
+    earliest_finish = earliest_start + durations
+    lower_bound = float(earliest_finish.max()) if graph.node_count else 0.0
+
+    # Backward pass: latest start of every node that does not delay the end of the pipeline
+    latest_finish = np.full(graph.node_count, lower_bound)
+    for node in reversed(order):
+        start = latest_finish[node] - durations[node]
+        for predecessor in graph.predecessors[node]:
+            if start < latest_finish[predecessor]:
+                latest_finish[predecessor] = start
+    latest_start = latest_finish - durations
+
+    # Follow the predecessors that finish exactly when a critical node can start at the earliest
+    path = []
+    if graph.node_count:
+        node = int(np.argmax(earliest_finish))
+        while node is not None:
+            path.append(node)
+            node = next((predecessor for predecessor in graph.predecessors[node]
+                         if np.isclose(earliest_finish[predecessor], earliest_start[node])), None)
+        path.reverse()
+
+    # Observed durations cannot add up to more than the observed makespan along a chain the jobs waited for
+    if lower_bound > pipeline.makespan + 1e-6:
+        raise ValueError(f"Critical path of pipeline {pipeline.id} ({lower_bound:.0f} s) is longer than its "
+                         f"observed makespan ({pipeline.makespan:.0f} s)")
+
+    jobs = graph.job_count
+    return CriticalPathAnalysis(
+        [job.name for job in pipeline.jobs],
+        durations[:jobs],
+        earliest_start[:jobs],
+        latest_start[:jobs],
+        # Stage barriers and jobs that never ran take no time
+        [node for node in path if graph.is_job(node) and durations[node] > 0],
+        lower_bound,
+        pipeline.makespan,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pipelines', type=Path, nargs='+', help='Pipeline JSON files')
+    parser.add_argument('--mode', choices=('auto', 'needs', 'stage', 'observed'), default='auto')
+    parser.add_argument('--top', type=int, default=10, help='Number of jobs with the least slack to list')
+    args = parser.parse_args()
+
+    for file in args.pipelines:
+        pipeline = Pipeline.load(file)
+        analysis = analyze_critical_path(pipeline, args.mode)
+        print(f"Pipeline {pipeline.id}: makespan {timedelta(seconds=round(analysis.makespan))}, "
+              f"critical path {timedelta(seconds=round(analysis.lower_bound))}, gap {analysis.gap:.0f} s")
+        print('Critical path:')
+        for job in analysis.critical_path:
+            print(f"  {timedelta(seconds=round(analysis.earliest_start[job]))} "
+                  f"{analysis.durations[job]:8.1f} s  {analysis.names[job]}")
+        print('Least slack off the critical path:')
+        critical = set(analysis.critical_path)
+        slack = analysis.slack
+        candidates = [job for job in np.argsort(slack, kind='stable') if job not in critical
+                      and analysis.durations[job] > 0]
+        for job in candidates[:args.top]:
+            print(f"  {slack[job]:8.1f} s  {analysis.names[job]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""
+Pipeline JSON files (stages, jobs with needs, runners and timestamps) and the dependency graph of their jobs.
+"""
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from experiments.commons import JobDuration
+
+# Jobs that never ran take no time and need no runner
+NOT_RUN_STATUSES = ('skipped', 'manual', 'created', 'canceled')
+
+
+def parse_timestamp(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def format_timestamp(value: datetime) -> str:
+    """Formats a UTC timestamp like the pipeline JSON files, e.g. 2026-02-10T19:11:05.481Z"""
+    return value.strftime('%Y-%m-%dT%H:%M:%S.') + f"{value.microsecond // 1000:03}Z"
+
+
+@dataclass(slots=True)
+class PipelineJob:
+    name: str
+    stage: str | None
+    needs: list[str]
+    runner: str | None
+    status: str | None
+    created_at: datetime | None
+    started_at: datetime | None
+    finished_at: datetime | None
+
+    @property
+    def ran(self) -> bool:
+        return self.started_at is not None and self.finished_at is not None and self.status not in NOT_RUN_STATUSES
+
+    @property
+    def duration(self) -> float:
+        """Observed duration in seconds, 0 for jobs that never ran."""
+        return (self.finished_at - self.started_at).total_seconds() if self.ran else 0.0
+
+
+def stage_order(stages: list[dict], jobs: list[PipelineJob]) -> list[str]:
+    """
+    Names of the stages in execution order.
+
+    The pipeline JSON files list the stages in no particular order. Stages written with an index are sorted by it,
+    otherwise by the earliest creation of their jobs, since GitLab creates the jobs of a pipeline stage by stage.
+    Stages without timestamps go last in file order.
+    """
+    if stages and all('index' in stage for stage in stages):
+        return [stage.get('name') for stage in sorted(stages, key=lambda stage: stage['index'])]
+    first_seen = {}
+    for job in jobs:
+        seen = job.created_at or job.started_at
+        if seen is not None and job.stage is not None:
+            first_seen[job.stage] = min(first_seen.get(job.stage, seen), seen)
+    names = [stage.get('name') for stage in stages]
+    return sorted(names, key=lambda name: first_seen[name].timestamp() if name in first_seen else np.inf)
+
+
+@dataclass
+class Pipeline:
+    id: str
+    stages: list[str]
+    jobs: list[PipelineJob]
+    data: dict = field(repr=False)
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'Pipeline':
+        job_stages = {job: stage.get('name') for stage in data.get('stages', []) for job in stage.get('jobs', [])}
+        jobs = [
+            PipelineJob(
+                job['id'],
+                job_stages.get(job['id']),
+                list(job.get('needs') or []),
+                job.get('runner'),
+                job.get('status'),
+                parse_timestamp(job.get('created_at')),
+                parse_timestamp(job.get('started_at')),
+                parse_timestamp(job.get('finished_at')),
+            )
+            for job in data['jobs']
+        ]
+        return cls(str(data['id']), stage_order(data.get('stages', []), jobs), jobs, data)
+
+    @classmethod
+    def load(cls, path: Path) -> 'Pipeline':
+        return cls.from_json(json.loads(Path(path).read_text()))
+
+    @property
+    def created_at(self) -> datetime:
+        """Creation of the earliest job, the origin of simulated timelines."""
+        return min(job.created_at or job.started_at for job in self.jobs if job.created_at or job.started_at)
+
+    @property
+    def durations(self) -> np.ndarray:
+        return np.array([job.duration for job in self.jobs])
+
+    @property
+    def makespan(self) -> float:
+        """Observed time from the first job start to the last job end, in seconds."""
+        ran = [job for job in self.jobs if job.ran]
+        if not ran:
+            return 0.0
+        return (max(job.finished_at for job in ran) - min(job.started_at for job in ran)).total_seconds()
+
+    def job_durations(self) -> list[JobDuration]:
+        return [
+            JobDuration(job.name, job.started_at, job.finished_at, runner=job.runner, stage=job.stage,
+                        status=job.status, created=job.created_at)
+            for job in self.jobs if job.ran
+        ]
+
+    def with_timeline(self, created: np.ndarray, started: np.ndarray, finished: np.ndarray,
+                      runners: list[str | None]) -> dict:
+        """
+        Returns the pipeline JSON with the given job timeline, in seconds after the pipeline creation.
+        Jobs with a NaN start keep no timestamps. Stages get their index, since the new creation times
+        need not follow the stage order.
+        """
+        origin = self.created_at
+        jobs = []
+        for job, raw, created_at, started_at, finished_at, runner in zip(
+                self.jobs, self.data['jobs'], created, started, finished, runners):
+            raw = dict(raw)
+            raw['created_at'] = format_timestamp(origin + timedelta(seconds=float(created_at)))
+            if np.isnan(started_at):
+                raw['started_at'] = raw['finished_at'] = None
+            else:
+                raw['started_at'] = format_timestamp(origin + timedelta(seconds=float(started_at)))
+                raw['finished_at'] = format_timestamp(origin + timedelta(seconds=float(finished_at)))
+                raw['runner'] = runner
+                raw['runner_manager'] = None
+            jobs.append(raw)
+        order = {name: index for index, name in enumerate(self.stages)}
+        stages = [{**stage, 'index': order[stage.get('name')]} for stage in self.data.get('stages', [])]
+        return {**self.data, 'stages': stages, 'jobs': jobs}
+
+
+@dataclass
+class JobGraph:
+    """
+    Dependency graph of the jobs of a pipeline.
+
+    Nodes 0..job_count-1 are the jobs in declaration order. Stage order is modeled with one
+    virtual barrier node per stage boundary, which depends on the jobs of the previous stage and on the
+    barrier before it, and which the jobs of the next stage depend on. This keeps the graph linear in the number of
+    jobs instead of connecting every job to every job of the earlier stages.
+    """
+
+    job_count: int
+    durations: np.ndarray
+    successors: list[list[int]]
+    predecessors: list[list[int]]
+
+    @property
+    def node_count(self) -> int:
+        return len(self.successors)
+
+    def is_job(self, node: int) -> bool:
+        return node < self.job_count
+
+    def topological_order(self) -> list[int]:
+        """
+        Raises:
+            ValueError: If the graph has a cycle
+        """
+        indegree = [len(predecessors) for predecessors in self.predecessors]
+        order = [node for node, degree in enumerate(indegree) if degree == 0]
+        for node in order:
+            for successor in self.successors[node]:
+                indegree[successor] -= 1
+                if indegree[successor] == 0:
+                    order.append(successor)
+        if len(order) != self.node_count:
+            raise ValueError('The job dependencies contain a cycle')
+        return order
+
+
+def build_graph(pipeline: Pipeline, mode: str = 'auto', durations: np.ndarray | None = None) -> JobGraph:
+    """
+    Builds the dependency graph of a pipeline.
+
+    Args:
+        pipeline: The pipeline
+        mode: 'needs' (jobs only wait for their needs), 'stage' (jobs wait for all jobs of earlier stages),
+            'observed' (like stage, but a job that was observed to start before the earlier stages finished waits
+            only for the stages that had finished by then) or 'auto' (needs if any job declares needs, stages
+            otherwise). The pipeline JSON files do not tell `needs: []` and needs on other stages apart from
+            no needs at all, and GitLab starts such jobs early. Observed mode fits the dependencies to the
+            observed timeline, so it suits analyzing a pipeline rather than predicting other schedules
+        durations: Job durations in seconds, defaults to the observed durations
+
+    Raises:
+        ValueError: On an unknown mode or a need that is not a job of the pipeline
+    """
+    if mode == 'auto':
+        mode = 'needs' if any(job.needs for job in pipeline.jobs) else 'stage'
+    if mode not in ('needs', 'stage', 'observed'):
+        raise ValueError(f"Unknown dependency mode {mode}")
+
+    job_count = len(pipeline.jobs)
+    successors = [[] for _ in range(job_count)]
+    predecessors = [[] for _ in range(job_count)]
+
+    def connect(source: int, target: int):
+        successors[source].append(target)
+        predecessors[target].append(source)
+
+    if mode == 'needs':
+        index = {job.name: node for node, job in enumerate(pipeline.jobs)}
+        for node, job in enumerate(pipeline.jobs):
+            for need in job.needs:
+                if need not in index:
+                    raise ValueError(f"Job {job.name} needs unknown job {need}")
+                connect(index[need], node)
+        barrier_count = 0
+    else:
+        stage_index = {stage: i for i, stage in enumerate(pipeline.stages)}
+        stage_jobs = [[] for _ in pipeline.stages] or [[]]
+        for node, job in enumerate(pipeline.jobs):
+            # Jobs without a known stage run in the first stage
+            stage_jobs[stage_index.get(job.stage, 0)].append(node)
+        stage_jobs = [jobs for jobs in stage_jobs if jobs]
+        barrier_count = max(len(stage_jobs) - 1, 0)
+        successors.extend([] for _ in range(barrier_count))
+        predecessors.extend([] for _ in range(barrier_count))
+        if mode == 'observed':
+            # Observed time at which every job before each barrier had finished
+            stage_ends = [
+                max((pipeline.jobs[node].finished_at.timestamp() for node in jobs if pipeline.jobs[node].ran),
+                    default=-np.inf)
+                for jobs in stage_jobs[:-1]
+            ]
+            barrier_times = np.maximum.accumulate(stage_ends) if stage_ends else np.zeros(0)
+        for i in range(1, len(stage_jobs)):
+            barrier = job_count + i - 1
+            if i > 1:
+                connect(barrier - 1, barrier)
+            for node in stage_jobs[i - 1]:
+                connect(node, barrier)
+            for node in stage_jobs[i]:
+                job = pipeline.jobs[node]
+                # The last barrier the job was observed to wait for, jobs that never ran wait for their stage
+                passed = i - 1
+                if mode == 'observed' and job.ran:
+                    passed = min(passed, int(np.searchsorted(barrier_times, job.started_at.timestamp(), 'right')) - 1)
+                if passed >= 0:
+                    connect(job_count + passed, node)
+
+    if durations is None:
+        durations = pipeline.durations
+    return JobGraph(job_count, np.concatenate([durations, np.zeros(barrier_count)]), successors, predecessors)
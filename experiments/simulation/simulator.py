@@ -0,0 +1,222 @@
+"""
+Discrete-event simulation of pipelines on a pool of identical runners.
+
+Replays the observed job durations of a pipeline JSON under different dispatch policies, dependency modes
+and runner counts, to predict the makespan before changing the real CI:
+
+    python -m experiments.simulation.simulator pipeline.json --runners 4 8 16 --policy fifo sjf lpt --mode stage needs observed
+
+Simulated pipelines are written in the pipeline JSON format, so the existing Gantt scripts can plot them.
+"""
+import argparse
+import heapq
+import json
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from experiments.simulation.pipeline import Pipeline, JobGraph, build_graph
+
+# Priority of a ready job from its node index, the time it became ready and its duration, lowest first
+Policy = Callable[[int, float, float], tuple]
+
+POLICIES: dict[str, Policy] = {
+    # In the order the jobs became ready, like GitHub and GitLab appear to dispatch
+    'fifo': lambda node, ready_at, duration: (ready_at, node),
+    # Shortest job first
+    'sjf': lambda node, ready_at, duration: (duration, node),
+    # Longest processing time first
+    'lpt': lambda node, ready_at, duration: (-duration, node),
+}
+MODES = ('stage', 'needs', 'observed')
+
+
+@dataclass
+class SimulationResult:
+    """Simulated timeline of the jobs of a pipeline, in seconds after the pipeline creation."""
+
+    policy: str
+    mode: str
+    runners: int
+    created: np.ndarray
+    started: np.ndarray
+    finished: np.ndarray
+    runner: np.ndarray
+    durations: np.ndarray
+
+    @property
+    def makespan(self) -> float:
+        if np.isnan(self.started).all():
+            return 0.0
+        return float(np.nanmax(self.finished) - np.nanmin(self.started))
+
+    @property
+    def waits(self) -> np.ndarray:
+        """Time between a job becoming ready and its start, NaN for jobs that never ran."""
+        return self.started - self.created
+
+    @property
+    def utilization(self) -> float:
+        makespan = self.makespan
+        return float(self.durations.sum() / (self.runners * makespan)) if makespan > 0 else 0.0
+
+    def summary(self) -> dict:
+        waits = self.waits
+        ran = ~np.isnan(waits)
+        return {
+            'mode': self.mode,
+            'policy': self.policy,
+            'runners': self.runners,
+            'makespan': self.makespan,
+            'mean_wait': float(waits[ran].mean()) if ran.any() else 0.0,
+            'max_wait': float(waits[ran].max()) if ran.any() else 0.0,
+            'utilization': self.utilization,
+        }
+
+
+def simulate(pipeline: Pipeline, runners: int = 4, policy: str | Policy = 'fifo', mode: str = 'stage',
+             durations: np.ndarray | None = None, pickup_delay: float = 0.0,
+             graph: JobGraph | None = None) -> SimulationResult:
+    """
+    Simulates a pipeline on a pool of identical runners.
+
+    Args:
+        pipeline: The pipeline to replay
+        runners: Number of runners, each runs one job at a time
+        policy: Name of one of the POLICIES or a function returning the priority of a ready job
+        mode: Dependency mode of build_graph, 'stage', 'needs' or 'observed'
+        durations: Job durations in seconds, defaults to the observed durations
+        pickup_delay: Time a runner needs to start a job
+        graph: A graph built for the pipeline before, so that sweeps build it once per mode
+
+    Raises:
+        ValueError: If the job dependencies contain a cycle
+    """
+    if graph is None:
+        graph = build_graph(pipeline, mode, durations)
+    priority = POLICIES[policy] if isinstance(policy, str) else policy
+    job_count = graph.job_count
+    node_durations = graph.durations
+    successors = graph.successors
+    runs = [job.ran for job in pipeline.jobs]
+
+    remaining = [len(predecessors) for predecessors in graph.predecessors]
+    created = np.zeros(job_count)
+    started = np.full(job_count, np.nan)
+    finished = np.full(job_count, np.nan)
+    assigned = np.full(job_count, -1)
+    ready = []
+    running = []
+    idle = list(range(runners))
+    completed = 0
+
+    def release(nodes: list[int], now: float):
+        """Queues the jobs whose dependencies completed, nodes that need no runner complete at once."""
+        nonlocal completed
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            if node < job_count:
+                created[node] = now
+                if runs[node]:
+                    heapq.heappush(ready, (priority(node, now, node_durations[node]), node))
+                    continue
+            completed += 1
+            for successor in successors[node]:
+                remaining[successor] -= 1
+                if remaining[successor] == 0:
+                    stack.append(successor)
+
+    now = 0.0
+    release([node for node, count in enumerate(remaining) if count == 0], now)
+    while True:
+        while idle and ready:
+            _, node = heapq.heappop(ready)
+            runner = heapq.heappop(idle)
+            started[node] = now + pickup_delay
+            finished[node] = started[node] + node_durations[node]
+            assigned[node] = runner
+            heapq.heappush(running, (finished[node], node, runner))
+        if not running:
+            break
+        # Complete every job that finishes at this time before dispatching again
+        now = running[0][0]
+        done = []
+        while running and running[0][0] == now:
+            _, node, runner = heapq.heappop(running)
+            heapq.heappush(idle, runner)
+            done.append(node)
+        completed += len(done)
+        released = []
+        for node in done:
+            for successor in successors[node]:
+                remaining[successor] -= 1
+                if remaining[successor] == 0:
+                    released.append(successor)
+        release(released, now)
+
+    if completed != graph.node_count:
+        raise ValueError('The job dependencies contain a cycle')
+    name = policy if isinstance(policy, str) else getattr(policy, '__name__', 'custom')
+    return SimulationResult(name, mode, runners, created, started, finished, assigned, node_durations[:job_count])
+
+
+def sweep(pipeline: Pipeline, runner_counts, policies=tuple(POLICIES), modes=MODES,
+          pickup_delay: float = 0.0) -> list[SimulationResult]:
+    """Simulates every combination of dependency mode, policy and runner count."""
+    results = []
+    for mode in modes:
+        graph = build_graph(pipeline, mode)
+        for policy in policies:
+            for runners in runner_counts:
+                results.append(simulate(pipeline, runners, policy, mode, pickup_delay=pickup_delay, graph=graph))
+    return results
+
+
+def write_simulated_pipeline(pipeline: Pipeline, result: SimulationResult, folder: Path) -> Path:
+    """Writes the simulated pipeline to <folder>/<id>-<mode>-<policy>-<runners>/pipeline<id>.json"""
+    runners = [f"simulated-runner-{runner}" if runner >= 0 else None for runner in result.runner]
+    data = pipeline.with_timeline(result.created, result.started, result.finished, runners)
+    data['simulation'] = result.summary()
+    file = Path(folder) / f"{pipeline.id}-{result.mode}-{result.policy}-{result.runners}" / f"pipeline{pipeline.id}.json"
+    file.parent.mkdir(parents=True, exist_ok=True)
+    file.write_text(json.dumps(data, indent='\t'))
+    return file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pipelines', type=Path, nargs='+', help='Pipeline JSON files')
+    parser.add_argument('--runners', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--policy', nargs='+', choices=list(POLICIES), default=list(POLICIES))
+    parser.add_argument('--mode', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--pickup-delay', type=float, default=0.0, help='Seconds a runner needs to start a job')
+    parser.add_argument('--output', type=Path, help='Folder for sweep.json')
+    parser.add_argument('--pipelines', action='store_true', dest='write_pipelines',
+                        help='Also write every simulated pipeline to the output folder')
+    args = parser.parse_args()
+
+    rows = []
+    for file in args.pipelines:
+        pipeline = Pipeline.load(file)
+        print(f"Pipeline {pipeline.id}: {len(pipeline.jobs)} jobs, observed makespan "
+              f"{timedelta(seconds=round(pipeline.makespan))}")
+        for result in sweep(pipeline, args.runners, args.policy, args.mode, args.pickup_delay):
+            summary = result.summary()
+            rows.append({'pipeline': pipeline.id, **summary})
+            print(f"  {result.mode:8} {result.policy:5} {result.runners:4} runners: "
+                  f"makespan {timedelta(seconds=round(summary['makespan']))}, "
+                  f"mean wait {summary['mean_wait']:8.1f} s, utilization {summary['utilization']:.0%}")
+            if args.output and args.write_pipelines:
+                write_simulated_pipeline(pipeline, result, args.output)
+
+    if args.output:
+        args.output.mkdir(parents=True, exist_ok=True)
+        (args.output / 'sweep.json').write_text(json.dumps(rows, indent='\t'))
+
+
+if __name__ == '__main__':
+    main()
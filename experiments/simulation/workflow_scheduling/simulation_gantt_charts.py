@@ -2,18 +2,25 @@ import json
 from datetime import datetime
 from pathlib import Path
 
-from experiments.commons import (JobDuration, plot_job_gantt)
+from experiments.commons import JobDuration
+from experiments.concurrency import analyze_concurrency, plot_concurrency
+from experiments.rendering import GanttTask, render_gantts
+from experiments.simulation.critical_path import analyze_critical_path
+from experiments.simulation.pipeline import Pipeline
+from experiments.timeline import write_timeline
 
-def main():
-    project_root = Path(__file__).parent.parent.parent.parent
-    output_root = project_root.parent / 'ci-simulation' / 'out'
-    output_root = Path(__file__).parent
+def main(output_root: Path | None = None):
+    """Renders the charts of every folder of pipeline JSON files in output_root, by default the folder of this script"""
+    if output_root is None:
+        output_root = Path(__file__).parent
     print(output_root)
     print()
     output_root.mkdir(exist_ok=True)
     total_durations = {}
+    tasks = []
     for directory in [ x for x in output_root.iterdir() if x.is_dir() ]:
         all_jobs = []
+        critical_jobs = set()
         for file in directory.iterdir():
             print(file)
             if not (file.name.startswith('pipeline') and file.name.endswith('.json')):
@@ -24,6 +31,14 @@ def main():
             print('Creating Gantt chart for run', file)
 
             pipeline_id = pipeline['id']
+            try:
+                analysis = analyze_critical_path(Pipeline.from_json(pipeline), 'observed')
+            except ValueError as e:
+                # Render the chart without highlighting a critical path
+                print('No critical path:', e)
+            else:
+                print('Critical path', analysis.lower_bound, 's, gap to makespan', analysis.gap, 's')
+                critical_jobs.update(name.replace(pipeline_id, '') for name in analysis.critical_jobs)
             durations = []
             jobs = pipeline['jobs']
             stages = pipeline.get('stages', [])
@@ -42,6 +57,7 @@ def main():
                 print(job.get('status'))
                 started = datetime.fromisoformat(job.get('started_at').replace("Z", "+00:00"))
                 finished = datetime.fromisoformat(job.get('finished_at').replace("Z", "+00:00"))
+                created = datetime.fromisoformat(job['created_at'].replace("Z", "+00:00")) if job.get('created_at') else None
                 runner = job.get('runner')
                 stage_name = job_stage_map.get(job.get('id'))
                 if stage_name is not None:
@@ -53,7 +69,8 @@ def main():
                         finished,
                         runner=runner,
                         stage=stage_name,
-                        status=job.get('status')
+                        status=job.get('status'),
+                        created=created
                     )
                 )
                 all_jobs.append(
@@ -63,13 +80,19 @@ def main():
                         finished,
                         runner=runner,
                         stage=stage_name,
-                        status=job.get('status')
+                        status=job.get('status'),
+                        created=created
                     )
                 )
             #plot_job_gantt(durations,f"Step/job durations for run {run_id}", directory / f"gantt_run{run_id}", sort=False)
         if not all_jobs:
             continue
-        plot_job_gantt(all_jobs,f"Step/job durations for all jobs", directory / f"gantt_run_all_jobs", sort=True)
+        tasks.append(GanttTask(all_jobs, f"Step/job durations for all jobs", directory / f"gantt_run_all_jobs", sort=True,
+                               highlight=critical_jobs))
+        write_timeline(all_jobs, f"Step/job durations for all jobs", directory / f"gantt_run_all_jobs.html")
+        concurrency = analyze_concurrency(all_jobs)
+        print('Concurrency', concurrency.summary())
+        plot_concurrency(concurrency, f"Concurrency of all jobs", directory / f"concurrency_all_jobs.png")
         jobs_sorted = sorted(all_jobs, reverse=False, key=lambda x: x.start)
         first = jobs_sorted[0]
         jobs_sorted = sorted(all_jobs, reverse=True, key=lambda x: x.end)
@@ -77,6 +100,8 @@ def main():
         duration = last.end - first.start
         total_durations[directory.name] = duration
 
+    render_gantts(tasks)
+
     total_durations = dict(sorted(total_durations.items()))
     print("---------------------------------")
     print()
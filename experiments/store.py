@@ -0,0 +1,280 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from experiments.commons import JobDuration, get_experiment_folder
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    name TEXT,
+    status TEXT,
+    created_at REAL,
+    started_at REAL,
+    finished_at REAL,
+    duration REAL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL,
+    run_attempt INTEGER NOT NULL DEFAULT 1,
+    retried INTEGER NOT NULL DEFAULT 0,
+    name TEXT,
+    stage TEXT,
+    runner TEXT,
+    status TEXT,
+    created_at REAL,
+    queued_at REAL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_run ON jobs (run_id, run_attempt);
+CREATE TABLE IF NOT EXISTS lifecycles (
+    run_number INTEGER PRIMARY KEY,
+    run_id INTEGER,
+    dispatched REAL,
+    found REAL,
+    queued REAL,
+    started REAL,
+    completed REAL,
+    status TEXT,
+    started_at TEXT,
+    completed_at TEXT
+);
+"""
+
+RUN_COLUMNS = ('run_id', 'name', 'status', 'created_at', 'started_at', 'finished_at', 'duration')
+JOB_COLUMNS = ('job_id', 'run_id', 'run_attempt', 'retried', 'name', 'stage', 'runner', 'status',
+               'created_at', 'queued_at', 'started_at', 'finished_at')
+LIFECYCLE_COLUMNS = ('run_number', 'run_id', 'dispatched', 'found', 'queued', 'started', 'completed',
+                     'status', 'started_at', 'completed_at')
+
+
+class ExperimentStore:
+    """
+    SQLite store holding the normalized runs and jobs of one experiment.
+    Timestamps are stored as UTC epoch seconds.
+    The store may be shared between threads, e.g. by orchestrator callbacks, its queries are serialized.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+        self._lock = threading.RLock()
+
+    def save_run(self, run: dict):
+        self.save_runs([run])
+
+    def save_runs(self, runs: list[dict]):
+        with self._lock, self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO runs ({', '.join(RUN_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(RUN_COLUMNS))})",
+                [tuple(run.get(column) for column in RUN_COLUMNS) for run in runs]
+            )
+
+    def save_jobs(self, jobs: list[dict]):
+        with self._lock, self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(JOB_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(JOB_COLUMNS))})",
+                [tuple(job.get(column) for column in JOB_COLUMNS) for job in jobs]
+            )
+
+    def save_lifecycle(self, lifecycle: dict):
+        with self._lock, self.connection:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO lifecycles ({', '.join(LIFECYCLE_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(LIFECYCLE_COLUMNS))})",
+                tuple(lifecycle.get(column) for column in LIFECYCLE_COLUMNS)
+            )
+
+    def load_lifecycles(self) -> list[dict]:
+        with self._lock:
+            return [dict(row) for row in self.connection.execute("SELECT * FROM lifecycles ORDER BY run_number")]
+
+    def has_jobs(self, run_id: int) -> bool:
+        with self._lock:
+            row = self.connection.execute("SELECT 1 FROM jobs WHERE run_id = ? LIMIT 1", (run_id,)).fetchone()
+        return row is not None
+
+    def load_runs(self) -> list[dict]:
+        with self._lock:
+            return [dict(row) for row in self.connection.execute("SELECT * FROM runs ORDER BY run_id")]
+
+    def job_run_ids(self) -> list[int]:
+        """Ids of the runs with stored jobs, to load their jobs one run at a time."""
+        with self._lock:
+            return [row['run_id'] for row in
+                    self.connection.execute("SELECT DISTINCT run_id FROM jobs ORDER BY run_id")]
+
+    def load_jobs(self, run_id: int | None = None, all_attempts: bool = False) -> dict[int, list[dict]]:
+        """
+        Loads the job rows of one or all runs with a single query.
+
+        Args:
+            run_id: The run to load, None for all runs
+            all_attempts: If False, only the jobs of the latest run attempt that were not retried are loaded
+
+        Returns:
+            A dictionary mapping run ids to their job rows, ordered by job id
+        """
+        conditions = []
+        params = ()
+        if run_id is not None:
+            conditions.append("run_id = ?")
+            params = (run_id,)
+        if not all_attempts:
+            conditions.append("NOT retried")
+            conditions.append("run_attempt = (SELECT MAX(run_attempt) FROM jobs AS attempts "
+                              "WHERE attempts.run_id = jobs.run_id)")
+        query = "SELECT * FROM jobs"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        jobs = {}
+        with self._lock:
+            for row in self.connection.execute(query + " ORDER BY run_id, job_id", params):
+                jobs.setdefault(row['run_id'], []).append(dict(row))
+        return jobs
+
+    def load_job_durations(self, run_id: int | None = None, all_attempts: bool = False) -> dict[int, list[JobDuration]]:
+        """Loads the jobs of one or all runs as JobDurations, skipping jobs that never ran."""
+        return {
+            run: [to_job_duration(job) for job in jobs if job['started_at'] is not None and job['finished_at'] is not None]
+            for run, jobs in self.load_jobs(run_id, all_attempts).items()
+        }
+
+    def close(self):
+        self.connection.close()
+
+
+def get_experiment_store(experiment_number: int, platform='github') -> ExperimentStore:
+    """
+    Opens the store of an experiment. When the store is created, the per-run/per-job JSON files
+    written by earlier versions of the scripts are imported.
+    """
+    folder = get_experiment_folder(experiment_number, platform)
+    path = folder / 'experiment.sqlite'
+    is_new = not path.exists()
+    store = ExperimentStore(path)
+    if is_new and folder.exists():
+        if platform == 'gitlab':
+            import_gitlab_json(store, folder)
+        else:
+            import_github_json(store, folder)
+    return store
+
+
+def to_epoch(timestamp: str | None) -> float | None:
+    if not timestamp:
+        return None
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+
+
+def from_epoch(seconds: float) -> datetime:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+def to_job_duration(job: dict) -> JobDuration:
+    return JobDuration(
+        job['name'],
+        from_epoch(job['started_at']),
+        from_epoch(job['finished_at']),
+        runner=job['runner'],
+        stage=job['stage'],
+        status=job['status'],
+        created=from_epoch(job['created_at']) if job['created_at'] is not None else None,
+    )
+
+
+def github_run_row(run: dict) -> dict:
+    started = to_epoch(run.get('run_started_at'))
+    finished = to_epoch(run.get('updated_at')) if run.get('status') == 'completed' else None
+    return {
+        'run_id': run['id'],
+        'name': run.get('name'),
+        'status': run.get('conclusion') or run.get('status'),
+        'created_at': to_epoch(run.get('created_at')),
+        'started_at': started,
+        'finished_at': finished,
+        'duration': finished - started if started is not None and finished is not None else None,
+    }
+
+
+def github_job_row(job: dict) -> dict:
+    return {
+        'job_id': job['id'],
+        'run_id': job['run_id'],
+        'run_attempt': job.get('run_attempt', 1),
+        'retried': 0,
+        'name': job.get('name'),
+        'stage': None,
+        'runner': job.get('runner_name'),
+        'status': job.get('conclusion') or job.get('status'),
+        'created_at': to_epoch(job.get('created_at')),
+        # GitHub jobs are queued as soon as they are created
+        'queued_at': to_epoch(job.get('created_at')),
+        'started_at': to_epoch(job.get('started_at')),
+        'finished_at': to_epoch(job.get('completed_at')),
+    }
+
+
+def gitlab_run_row(pipeline: dict) -> dict:
+    return {
+        'run_id': pipeline['id'],
+        'name': pipeline.get('name'),
+        'status': pipeline.get('status'),
+        'created_at': to_epoch(pipeline.get('created_at')),
+        'started_at': to_epoch(pipeline.get('started_at')),
+        'finished_at': to_epoch(pipeline.get('finished_at')),
+        'duration': pipeline.get('duration'),
+    }
+
+
+def gitlab_job_row(job: dict, run_id: int) -> dict:
+    started = to_epoch(job.get('started_at'))
+    queued_duration = job.get('queued_duration')
+    runner = job.get('runner') or {}
+    return {
+        'job_id': job['id'],
+        'run_id': run_id,
+        'run_attempt': 1,
+        'retried': int(bool(job.get('retried'))),
+        'name': job.get('name'),
+        'stage': job.get('stage'),
+        'runner': runner.get('description'),
+        'status': job.get('status'),
+        'created_at': to_epoch(job.get('created_at')),
+        'queued_at': started - queued_duration if started is not None and queued_duration is not None else None,
+        'started_at': started,
+        'finished_at': to_epoch(job.get('finished_at')),
+    }
+
+
+def import_github_json(store: ExperimentStore, folder: Path):
+    """Imports the <run_id>.json files written by earlier versions of analyze.py."""
+    runs = []
+    for file in folder.glob('*.json'):
+        if file.stem.isdigit():
+            runs.append(github_run_row(json.loads(file.read_text())))
+    store.save_runs(runs)
+
+
+def import_gitlab_json(store: ExperimentStore, folder: Path):
+    """Imports the run<id>.json/run<id>-<job_id>.json files written by earlier versions of the GitLab scripts."""
+    jobs = []
+    for file in folder.glob('run*.json'):
+        name = file.stem[len('run'):]
+        if '-' in name:
+            run_id, job_id = name.split('-', 1)
+            if run_id.isdigit() and job_id.isdigit():
+                jobs.append(gitlab_job_row(json.loads(file.read_text()), int(run_id)))
+        elif name.isdigit():
+            # The pipeline job listing, job details take precedence since they are saved last
+            jobs = [gitlab_job_row(job, int(name)) for job in json.loads(file.read_text())] + jobs
+    store.save_jobs(jobs)
@@ -0,0 +1,251 @@
+"""
+Self-contained HTML/SVG timeline of job durations, an alternative to the PNG Gantt charts for large pipelines.
+
+The jobs are embedded as compact columnar JSON and drawn by a small script, which only creates SVG elements
+for what is visible. Rows are grouped by stage (or runner). When zoomed out so far that the rows would be
+thinner than a few pixels, each group is drawn as a single lane showing when any of its jobs ran. Zooming in
+expands the lanes to the individual jobs.
+"""
+import html
+import json
+from pathlib import Path
+
+import numpy as np
+from matplotlib import colors, pyplot as plt
+
+from experiments.commons import JobDuration
+
+UNGROUPED = '(none)'
+
+
+def write_timeline(jobs: list[JobDuration], title: str, file_path, group_by: str = 'stage', sort: bool = True) -> Path | None:
+    """
+    Writes the jobs as an interactive timeline to a single HTML file.
+
+    Args:
+        jobs: The jobs to show
+        title: Title of the page
+        file_path: The HTML file to write
+        group_by: 'stage' or 'runner'. If no job has a stage, the jobs are grouped by runner.
+        sort: Order the jobs of each group by start time instead of keeping their order
+
+    Returns:
+        The path of the written file, None if there are no jobs
+    """
+    if not jobs:
+        return None
+    if group_by == 'stage' and not any(getattr(job, 'stage', None) for job in jobs):
+        group_by = 'runner'
+
+    job_count = len(jobs)
+    t0 = min(job.start for job in jobs)
+    starts = np.fromiter(((job.start - t0).total_seconds() for job in jobs), float, job_count)
+    durations = np.fromiter(((job.end - job.start).total_seconds() for job in jobs), float, job_count)
+
+    # Groups are numbered in the order they start, the rows of a group are contiguous
+    group_names = [getattr(job, group_by, None) or UNGROUPED for job in jobs]
+    first_start = {}
+    for name, start in zip(group_names, starts):
+        first_start[name] = min(first_start.get(name, np.inf), start)
+    groups = sorted(first_start, key=first_start.get)
+    group_codes = {name: code for code, name in enumerate(groups)}
+    codes = np.fromiter((group_codes[name] for name in group_names), int, job_count)
+    rows = np.lexsort((starts, codes)) if sort else np.argsort(codes, kind='stable')
+    group_ends = np.cumsum(np.bincount(codes, minlength=len(groups)))
+
+    cmap = plt.get_cmap('tab20')
+    data = {
+        'span': int(np.ceil((starts + durations).max() * 1000)),
+        'groupBy': group_by,
+        'groups': groups,
+        'colors': [colors.to_hex(cmap(code % cmap.N)) for code in range(len(groups))],
+        'groupStart': [0] + group_ends[:-1].tolist(),
+        'groupEnd': group_ends.tolist(),
+        # Milliseconds keep the file small
+        'start': np.rint(starts[rows] * 1000).astype(int).tolist(),
+        'duration': np.rint(durations[rows] * 1000).astype(int).tolist(),
+        'group': codes[rows].tolist(),
+        'label': [jobs[row].label for row in rows],
+    }
+
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    # '</' would end the script element
+    data_json = json.dumps(data, separators=(',', ':')).replace('</', '<\\/')
+    file_path.write_text(TEMPLATE.replace('__TITLE__', html.escape(title)).replace('__DATA__', data_json))
+    return file_path
+
+
+TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+body { margin: 0; font: 12px sans-serif; }
+header { padding: 6px 10px; }
+h1 { font-size: 16px; margin: 0 0 4px; }
+.help { color: #666; }
+.legend span { display: inline-block; margin-right: 12px; }
+.legend i { display: inline-block; width: 10px; height: 10px; margin-right: 4px; }
+#timeline { display: block; width: 100vw; height: calc(100vh - 80px); cursor: grab; user-select: none; }
+#timeline text { font-size: 11px; }
+</style>
+</head>
+<body>
+<header>
+<h1>__TITLE__</h1>
+<div class="help">Wheel: zoom, Shift+wheel: zoom time, Alt+wheel: zoom jobs, drag: pan, click a lane: expand it, double click: reset</div>
+<div class="legend" id="legend"></div>
+</header>
+<svg id="timeline"></svg>
+<script>
+const data = __DATA__;
+const LEFT = 240, RIGHT = 12, TOP = 4, BOTTOM = 24, MIN_ROW = 4, LABEL_ROW = 10;
+const STEPS = [1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400, 43200, 86400].map(s => s * 1000);
+const svg = document.getElementById('timeline');
+const n = data.start.length;
+// Rows of each group by start time, to merge their intervals into the busy times of a lane
+const byStart = data.groups.map((_, g) => {
+  const rows = [];
+  for (let r = data.groupStart[g]; r < data.groupEnd[g]; r++) rows.push(r);
+  return rows.sort((a, b) => data.start[a] - data.start[b]);
+});
+let view;
+
+function escape(value) {
+  return String(value).replace(/[&<>"]/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})[c]);
+}
+
+function formatTime(ms) {
+  const s = Math.floor(ms / 1000);
+  return [Math.floor(s / 3600), Math.floor(s % 3600 / 60), s % 60].map(v => String(v).padStart(2, '0')).join(':');
+}
+
+function geometry() {
+  const width = Math.max(svg.clientWidth - LEFT - RIGHT, 1), height = Math.max(svg.clientHeight - TOP - BOTTOM, 1);
+  return {width, height, scale: width / (view.t1 - view.t0), rowHeight: height / (view.r1 - view.r0)};
+}
+
+function draw() {
+  const {width, height, scale, rowHeight} = geometry();
+  const x = t => LEFT + (t - view.t0) * scale;
+  const y = r => TOP + (r - view.r0) * rowHeight;
+  const grid = [], bars = [], labels = [];
+
+  const step = STEPS.find(s => s * scale >= 80) || STEPS[STEPS.length - 1];
+  for (let t = Math.ceil(view.t0 / step) * step; t <= view.t1; t += step) {
+    grid.push(`<line x1="${x(t)}" x2="${x(t)}" y1="${TOP}" y2="${TOP + height}" stroke="#ddd"/>`);
+    labels.push(`<text x="${x(t)}" y="${TOP + height + 16}" text-anchor="middle">${formatTime(t)}</text>`);
+  }
+
+  const first = Math.max(0, Math.floor(view.r0)), last = Math.min(n, Math.ceil(view.r1));
+  if (rowHeight >= MIN_ROW) {
+    for (let r = first; r < last; r++) {
+      const start = data.start[r], duration = data.duration[r], g = data.group[r];
+      if (rowHeight >= LABEL_ROW) {
+        labels.push(`<text x="${LEFT - 4}" y="${y(r + 0.5)}" text-anchor="end" dominant-baseline="middle">${escape(data.label[r])}</text>`);
+      }
+      if (start + duration < view.t0 || start > view.t1) continue;
+      bars.push(`<rect x="${x(start)}" y="${y(r + 0.1)}" width="${Math.max(duration * scale, 1)}" height="${rowHeight * 0.8}" fill="${data.colors[g]}">`
+        + `<title>${escape(data.label[r])} (${escape(data.groups[g])})\\n${formatTime(start)} + ${(duration / 1000).toFixed(1)} s</title></rect>`);
+    }
+  } else {
+    for (let g = 0; g < data.groups.length; g++) {
+      const r0 = Math.max(first, data.groupStart[g]), r1 = Math.min(last, data.groupEnd[g]);
+      if (r0 >= r1) continue;
+      const top = y(r0), laneHeight = (r1 - r0) * rowHeight;
+      const busy = (a, b) => `<rect x="${a}" y="${top + laneHeight * 0.1}" width="${Math.max(b - a, 1)}" height="${laneHeight * 0.8}" fill="${data.colors[g]}" pointer-events="none"/>`;
+      bars.push(`<rect class="lane" data-group="${g}" x="${LEFT}" y="${top}" width="${width}" height="${laneHeight}" fill="${data.colors[g]}" fill-opacity="0.12">`
+        + `<title>${escape(data.groups[g])}: ${r1 - r0} jobs</title></rect>`);
+      // Busy times of the visible jobs of the group, merged at pixel resolution
+      let a = null, b = null;
+      for (const r of byStart[g]) {
+        if (r < r0 || r >= r1) continue;
+        const start = x(data.start[r]), end = x(data.start[r] + data.duration[r]);
+        if (a !== null && start <= b + 1) {
+          b = Math.max(b, end);
+          continue;
+        }
+        if (a !== null) bars.push(busy(a, b));
+        a = start;
+        b = end;
+      }
+      if (a !== null) bars.push(busy(a, b));
+      if (laneHeight >= LABEL_ROW) {
+        labels.push(`<text x="${LEFT - 4}" y="${top + laneHeight / 2}" text-anchor="end" dominant-baseline="middle">${escape(data.groups[g])} (${r1 - r0} jobs)</text>`);
+      }
+    }
+  }
+
+  svg.innerHTML = `<defs><clipPath id="plot"><rect x="${LEFT}" y="${TOP}" width="${width}" height="${height}"/></clipPath></defs>`
+    + `<g clip-path="url(#plot)">${grid.join('')}${bars.join('')}</g>${labels.join('')}`;
+}
+
+function clamp() {
+  const rows = Math.min(Math.max(view.r1 - view.r0, 1), n);
+  view.r0 = Math.min(Math.max(view.r0, 0), n - rows);
+  view.r1 = view.r0 + rows;
+  const span = Math.min(Math.max(view.t1 - view.t0, 10), data.span * 1.5 + 1000);
+  view.t1 = view.t0 + span;
+}
+
+function reset() {
+  view = {t0: 0, t1: data.span * 1.02 + 1, r0: 0, r1: n};
+  draw();
+}
+
+svg.addEventListener('wheel', event => {
+  event.preventDefault();
+  const {scale, rowHeight} = geometry();
+  const bounds = svg.getBoundingClientRect();
+  const factor = Math.exp((event.deltaY || event.deltaX) * 0.002);
+  if (!event.altKey) {
+    const t = view.t0 + (event.clientX - bounds.left - LEFT) / scale;
+    view.t0 = t - (t - view.t0) * factor;
+    view.t1 = t + (view.t1 - t) * factor;
+  }
+  if (!event.shiftKey) {
+    const r = view.r0 + (event.clientY - bounds.top - TOP) / rowHeight;
+    view.r0 = r - (r - view.r0) * factor;
+    view.r1 = r + (view.r1 - r) * factor;
+  }
+  clamp();
+  draw();
+}, {passive: false});
+
+let drag = null;
+svg.addEventListener('mousedown', event => {
+  drag = {x: event.clientX, y: event.clientY, view: {...view}, moved: false};
+  svg.style.cursor = 'grabbing';
+});
+window.addEventListener('mousemove', event => {
+  if (!drag) return;
+  const dx = event.clientX - drag.x, dy = event.clientY - drag.y;
+  drag.moved = drag.moved || Math.abs(dx) + Math.abs(dy) > 3;
+  const {scale, rowHeight} = geometry();
+  view = {t0: drag.view.t0 - dx / scale, t1: drag.view.t1 - dx / scale, r0: drag.view.r0 - dy / rowHeight, r1: drag.view.r1 - dy / rowHeight};
+  clamp();
+  draw();
+});
+window.addEventListener('mouseup', event => {
+  if (drag && !drag.moved && event.target.dataset && event.target.dataset.group !== undefined) {
+    const g = Number(event.target.dataset.group);
+    view.r0 = data.groupStart[g];
+    view.r1 = data.groupEnd[g];
+    clamp();
+    draw();
+  }
+  drag = null;
+  svg.style.cursor = 'grab';
+});
+svg.addEventListener('dblclick', reset);
+window.addEventListener('resize', draw);
+
+document.getElementById('legend').innerHTML = `${data.groupBy}: ` + data.groups.map(
+  (name, g) => `<span><i style="background:${data.colors[g]}"></i>${escape(name)}</span>`).join('');
+reset();
+</script>
+</body>
+</html>
+"""
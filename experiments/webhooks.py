@@ -0,0 +1,304 @@
+"""
+Local receiver for GitHub (workflow_run/workflow_job) and GitLab (pipeline/job) webhook events.
+
+Instead of polling a run until it completed, the experiment scripts can wait for the completion
+event, which carries the completion time itself. Received payloads can be recorded to a folder
+and replayed against a receiver, so the receiver can be exercised without GitHub or GitLab:
+
+    python -m experiments.webhooks serve --port 8000 --record payloads/
+    python -m experiments.webhooks replay payloads/ http://localhost:8000/
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from experiments.commons import webhook_port, webhook_secret
+from experiments.store import to_epoch
+
+GITHUB_EVENT_HEADER = 'X-GitHub-Event'
+GITLAB_EVENT_HEADER = 'X-Gitlab-Event'
+GITLAB_FINAL_STATUSES = ('success', 'failed', 'canceled', 'skipped')
+# Job statuses of GitHub (workflow_job) and GitLab (Job Hook) events once a runner picked the job up
+JOB_STARTED_STATUSES = ('in_progress', 'completed', 'running', 'success', 'failed', 'canceled')
+
+
+@dataclass
+class CompletionEvent:
+    """Completion of a run (GitHub workflow run or GitLab pipeline) as reported by a webhook."""
+
+    platform: str
+    run_id: int
+    status: str
+    started_at: str | None
+    completed_at: str | None
+    received_at: float
+    payload: dict = field(repr=False)
+
+
+@dataclass
+class JobEvent:
+    """State change of a job of a run as reported by a webhook."""
+
+    platform: str
+    run_id: int
+    job_id: int
+    name: str
+    status: str
+    started_at: str | None
+    completed_at: str | None
+    received_at: float
+
+
+class WebhookReceiver:
+    """
+    Small HTTP server that records webhook events and lets callers wait for run completions.
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on, 0 picks a free port
+        secret: Webhook secret. GitHub signatures (X-Hub-Signature-256) and GitLab tokens
+            (X-Gitlab-Token) are verified if set.
+        record_folder: If set, every received payload is written to this folder for replay
+    """
+
+    def __init__(self, host: str = '0.0.0.0', port: int = 8000, secret: str | None = None,
+                 record_folder: Path | None = None):
+        self.secret = secret
+        self.record_folder = Path(record_folder) if record_folder else None
+        self.completions: dict[int, CompletionEvent] = {}
+        self.job_events: dict[int, list[JobEvent]] = {}
+        self._condition = threading.Condition()
+        self._recorded = 0
+        self._server = ThreadingHTTPServer((host, port), _handler_for(self))
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{'localhost' if host == '0.0.0.0' else host}:{port}/"
+
+    def start(self) -> 'WebhookReceiver':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        print('Listening for webhook events on', self.url, flush=True)
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'WebhookReceiver':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def wait_for_completion(self, run_id: int, timeout: float | None = None) -> CompletionEvent:
+        """
+        Blocks until the completion event of a run was received.
+
+        Raises:
+            TimeoutError: If no completion event arrived within the timeout
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: run_id in self.completions, timeout):
+                raise TimeoutError(f"No completion event for run {run_id} within {timeout} seconds")
+            return self.completions[run_id]
+
+    def phase_times(self, completion: CompletionEvent) -> tuple[float | None, float | None]:
+        """
+        Wall clock times at which a run was queued and started, from the first job events received for it.
+        Without job events they fall back to the creation and start time of the run in the completion payload.
+        """
+        with self._condition:
+            job_events = list(self.job_events.get(completion.run_id, []))
+        queued = min((event.received_at for event in job_events), default=None)
+        started = min((event.received_at for event in job_events
+                       if event.started_at or event.status in JOB_STARTED_STATUSES), default=None)
+        if completion.platform == 'github':
+            created_at = completion.payload['workflow_run'].get('created_at')
+        else:
+            created_at = _gitlab_timestamp(completion.payload['object_attributes'].get('created_at'))
+        return queued or to_epoch(created_at), started or to_epoch(completion.started_at)
+
+    def handle(self, headers: CaseInsensitiveDict, body: bytes):
+        """
+        Processes one webhook delivery.
+
+        Raises:
+            PermissionError: If the delivery does not carry a valid signature or token
+            ValueError: If the body is not JSON or lacks fields of its event
+        """
+        received_at = time.time()
+        self._verify(headers, body)
+        payload = json.loads(body)
+        self._record(headers, payload)
+
+        try:
+            if GITHUB_EVENT_HEADER in headers:
+                completion, job_event = _parse_github(headers[GITHUB_EVENT_HEADER], payload, received_at)
+            elif GITLAB_EVENT_HEADER in headers:
+                completion, job_event = _parse_gitlab(headers[GITLAB_EVENT_HEADER], payload, received_at)
+            else:
+                return
+        except (KeyError, TypeError, AttributeError) as error:
+            raise ValueError(f"Malformed webhook payload: {error!r}") from error
+
+        with self._condition:
+            if job_event is not None:
+                self.job_events.setdefault(job_event.run_id, []).append(job_event)
+            if completion is not None:
+                self.completions[completion.run_id] = completion
+                self._condition.notify_all()
+
+    def _verify(self, headers: dict, body: bytes):
+        if not self.secret:
+            return
+        if GITHUB_EVENT_HEADER in headers:
+            if not hmac.compare_digest(github_signature(self.secret, body), headers.get('X-Hub-Signature-256', '')):
+                raise PermissionError('Invalid GitHub webhook signature')
+        elif not hmac.compare_digest(self.secret, headers.get('X-Gitlab-Token', '')):
+            raise PermissionError('Invalid GitLab webhook token')
+
+    def _record(self, headers: dict, payload: dict):
+        if self.record_folder is None:
+            return
+        with self._condition:
+            self._recorded += 1
+            number = self._recorded
+        event_headers = {name: headers[name] for name in (GITHUB_EVENT_HEADER, GITLAB_EVENT_HEADER)
+                         if name in headers}
+        self.record_folder.mkdir(parents=True, exist_ok=True)
+        file = self.record_folder / f"{number:05}-{int(time.time() * 1000)}.json"
+        file.write_text(json.dumps({'headers': event_headers, 'payload': payload}, indent='\t'))
+
+
+def github_signature(secret: str, body: bytes) -> str:
+    """X-Hub-Signature-256 header of a GitHub delivery, the HMAC of the body with the webhook secret"""
+    return 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def _handler_for(receiver: WebhookReceiver):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            try:
+                receiver.handle(CaseInsensitiveDict(self.headers.items()), body)
+            except PermissionError as error:
+                self.send_error(401, str(error))
+                return
+            except ValueError as error:
+                self.send_error(400, str(error))
+                return
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def _parse_github(event: str, payload: dict, received_at: float):
+    if event == 'workflow_run' and payload.get('action') == 'completed':
+        run = payload['workflow_run']
+        completion = CompletionEvent('github', run['id'], run.get('conclusion') or run['status'],
+                                     run.get('run_started_at'), run.get('updated_at'), received_at, payload)
+        return completion, None
+    if event == 'workflow_job':
+        job = payload['workflow_job']
+        job_event = JobEvent('github', job['run_id'], job['id'], job.get('name'), job['status'],
+                             job.get('started_at'), job.get('completed_at'), received_at)
+        return None, job_event
+    return None, None
+
+
+def _parse_gitlab(event: str, payload: dict, received_at: float):
+    if event == 'Pipeline Hook':
+        pipeline = payload['object_attributes']
+        if pipeline.get('status') not in GITLAB_FINAL_STATUSES:
+            return None, None
+        completion = CompletionEvent('gitlab', pipeline['id'], pipeline['status'],
+                                     _gitlab_timestamp(pipeline.get('created_at')),
+                                     _gitlab_timestamp(pipeline.get('finished_at')), received_at, payload)
+        return completion, None
+    if event == 'Job Hook':
+        job_event = JobEvent('gitlab', payload['pipeline_id'], payload['build_id'], payload.get('build_name'),
+                             payload['build_status'], _gitlab_timestamp(payload.get('build_started_at')),
+                             _gitlab_timestamp(payload.get('build_finished_at')), received_at)
+        return None, job_event
+    return None, None
+
+
+def _gitlab_timestamp(value: str | None) -> str | None:
+    """Webhooks use '2025-12-11 20:36:24 UTC' instead of the ISO 8601 format of the REST API."""
+    if not value:
+        return None
+    if value.endswith(' UTC'):
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S UTC').strftime('%Y-%m-%dT%H:%M:%S+00:00')
+    return value
+
+
+def start_receiver(record_folder: Path | None = None) -> WebhookReceiver | None:
+    """Starts a receiver if webhook mode is enabled with the WEBHOOK_PORT environment variable."""
+    if not webhook_port:
+        return None
+    return WebhookReceiver(port=int(webhook_port), secret=webhook_secret, record_folder=record_folder).start()
+
+
+def replay_payloads(folder: Path, url: str, delay: float = 0.0, secret: str | None = None):
+    """
+    Posts recorded payloads to a receiver, in the order they were recorded.
+    With a secret, deliveries are signed (GitHub) or carry the token (GitLab) like the real ones.
+    """
+    for file in sorted(Path(folder).glob('*.json')):
+        recorded = json.loads(file.read_text())
+        body = json.dumps(recorded['payload']).encode()
+        headers = {**recorded['headers'], 'Content-Type': 'application/json'}
+        if secret and GITHUB_EVENT_HEADER in headers:
+            headers['X-Hub-Signature-256'] = github_signature(secret, body)
+        elif secret:
+            headers['X-Gitlab-Token'] = secret
+        response = requests.post(url, data=body, headers=headers)
+        print('Replayed', file.name, response.status_code)
+        time.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help='Receive and record webhook events')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--secret')
+    serve.add_argument('--record', type=Path)
+    replay = commands.add_parser('replay', help='Replay recorded webhook events')
+    replay.add_argument('folder', type=Path)
+    replay.add_argument('url')
+    replay.add_argument('--delay', type=float, default=0.0)
+    replay.add_argument('--secret', default=webhook_secret,
+                        help='Webhook secret of the receiver, defaults to WEBHOOK_SECRET')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        receiver = WebhookReceiver(port=args.port, secret=args.secret, record_folder=args.record).start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            receiver.stop()
+    else:
+        replay_payloads(args.folder, args.url, args.delay, args.secret)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from experiments.fairness import RunJobs, fairness_table, kendall_rows, kendall_tau_b
+
+
+def pairwise_tau_b(a: np.ndarray, b: np.ndarray) -> float:
+    signs_a = np.sign(a[:, None] - a[None, :])
+    signs_b = np.sign(b[:, None] - b[None, :])
+    scale = np.sqrt((signs_a ** 2).sum() * (signs_b ** 2).sum())
+    return (signs_a * signs_b).sum() / scale if scale else np.nan
+
+
+@pytest.mark.parametrize('n', [0, 1, 2, 3, 7, 64, 100, 257])
+def test_kendall_matches_pairwise_definition_with_ties(n):
+    rng = np.random.default_rng(n)
+    for a, b in ((rng.integers(0, 4, n), rng.integers(0, 6, n)), (rng.random(n), rng.random(n))):
+        a, b = a.astype(float), b.astype(float)
+        np.testing.assert_allclose(kendall_tau_b(a, b), pairwise_tau_b(a, b), atol=1e-12)
+
+
+def test_kendall_rows_leave_out_missing_values():
+    rng = np.random.default_rng(0)
+    a, b = rng.random((2, 40)), rng.random((2, 40))
+    a[0, 10:] = np.nan
+    b[1, 3] = np.nan
+    expected = [pairwise_tau_b(a[0, :10], b[0, :10]), pairwise_tau_b(np.delete(a[1], 3), np.delete(b[1], 3))]
+    np.testing.assert_allclose(kendall_rows(a, b), expected)
+
+
+def test_fairness_table_of_no_runs_is_empty():
+    assert fairness_table(RunJobs.from_rows({})) == []
+    assert fairness_table(RunJobs.from_rows({1: [{'job_id': 1, 'started_at': None, 'finished_at': None}]})) == []
@@ -0,0 +1,34 @@
+from dataclasses import asdict
+
+import numpy as np
+
+import util.github.models as models
+from benchmarks.synthetic import github_run
+from util.github.models import GitHubWorkflowRun
+
+BASELINE_KEYS = {
+    'id', 'run_number', 'name', 'status', 'conclusion', 'workflow_id', 'workflow_name', 'event', 'created_at',
+    'updated_at', 'run_started_at', 'head_branch', 'head_sha', 'run_attempt', 'html_url', 'duration_seconds',
+}
+
+
+def test_construction_parses_no_timestamps(monkeypatch):
+    parsed = []
+    parse_timestamp = models.parse_timestamp
+    monkeypatch.setattr(models, 'parse_timestamp', lambda value: parsed.append(value) or parse_timestamp(value))
+    data = github_run(1, np.random.default_rng(0), 1)
+    run = GitHubWorkflowRun.from_api_response(data)
+    assert parsed == []
+
+    expected = (parse_timestamp(data['updated_at']) - parse_timestamp(data['run_started_at'])).total_seconds()
+    assert run.duration_seconds == expected
+    assert run.duration_seconds == expected
+    assert sorted(parsed) == sorted([data['updated_at'], data['run_started_at']])
+
+
+def test_asdict_matches_baseline_keys():
+    run = GitHubWorkflowRun.from_api_response(github_run(1, np.random.default_rng(0), 1))
+    assert set(asdict(run)) == BASELINE_KEYS
+    assert asdict(run)['duration_seconds'] == run.duration_seconds
+    assert GitHubWorkflowRun.from_api_response({**github_run(2, np.random.default_rng(0), 2),
+                                                'status': 'in_progress'}).duration_seconds is None
@@ -0,0 +1,86 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import github_jobs, github_run
+from util.github.api import get_workflow_run_jobs, get_workflow_runs, iter_workflow_runs
+from util.github.client import GitHubClient
+from util.replay import install_transport
+
+RUN_COUNT = 250
+RUNS_PATH = '/repos/o/r/actions/workflows/1/runs'
+JOBS_PATH = '/repos/o/r/actions/runs/7/jobs'
+ITEMS = {
+    RUNS_PATH: ('workflow_runs', [github_run(number, np.random.default_rng(number), number)
+                                  for number in range(RUN_COUNT)]),
+    JOBS_PATH: ('jobs', github_jobs(7, RUN_COUNT, np.random.default_rng(0))['jobs']),
+}
+
+
+class GitHubHandler(BaseHTTPRequestHandler):
+    """Paginates like GitHub: per_page is clamped to 100, bodies carry total_count and a Link header."""
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        params = dict(parse_qsl(parts.query))
+        if parts.path not in ITEMS:
+            self.send_error(404)
+            return
+        items_key, items = ITEMS[parts.path]
+        per_page = min(int(params.get('per_page', 30)), 100)
+        page = int(params.get('page', 1))
+        body = json.dumps({'total_count': RUN_COUNT, items_key: items[(page - 1) * per_page:page * per_page]})
+        last = -(-RUN_COUNT // per_page)
+        links = {'next': page + 1} if page < last else {}
+        links['last'] = last
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Link', ', '.join(
+            f'<http://{self.headers["Host"]}{parts.path}?{urlencode({**params, "page": number})}>; rel="{rel}"'
+            for rel, number in links.items()))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), GitHubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def client(base_url: str, mode: str, folder, **replay_options) -> GitHubClient:
+    github = GitHubClient(None, base_url, rate_limiter=None, metrics=None)
+    install_transport(github.session, mode, folder, **replay_options)
+    return github
+
+
+def test_live_pagination_with_clamped_per_page(base_url):
+    github = GitHubClient(None, base_url, rate_limiter=None, metrics=None)
+    assert len(get_workflow_runs('o', 'r', 1, fetch_all=True, client=github, per_page=500)) == RUN_COUNT
+    assert len(list(iter_workflow_runs('o', 'r', 1, client=github, per_page=500))) == RUN_COUNT
+    assert len(get_workflow_run_jobs('o', 'r', 7, client=github, per_page=500)) == RUN_COUNT
+
+
+@pytest.mark.parametrize('page_size', [None, 10, 7])
+def test_record_and_replay_with_other_page_size(base_url, tmp_path, page_size):
+    recording = client(base_url, 'record', tmp_path)
+    assert len(get_workflow_runs('o', 'r', 1, fetch_all=True, client=recording)) == RUN_COUNT
+    assert len(get_workflow_run_jobs('o', 'r', 7, client=recording)) == RUN_COUNT
+
+    replay = client(base_url, 'replay', tmp_path, page_size=page_size)
+    runs = get_workflow_runs('o', 'r', 1, fetch_all=True, client=replay)
+    assert [run.id for run in runs] == list(range(RUN_COUNT))
+    assert len(list(iter_workflow_runs('o', 'r', 1, client=replay))) == RUN_COUNT
+    jobs = replay.get_all(JOBS_PATH, {'filter': 'all'}, items_key='jobs')
+    assert [job['id'] for job in jobs] == [job['id'] for job in ITEMS[JOBS_PATH][1]]
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import simulation_pipeline
+from experiments.simulation.pipeline import Pipeline
+from experiments.simulation.simulator import simulate
+
+PIPELINES = sorted((Path(__file__).parent.parent / 'experiments' / 'simulation' / 'workflow_scheduling').glob(
+    '*/pipeline*.json'))
+
+
+@pytest.mark.parametrize('file', PIPELINES, ids=lambda file: file.stem)
+def test_observed_simulation_is_not_slower_than_observed(file):
+    pipeline = Pipeline.load(file)
+    result = simulate(pipeline, runners=len(pipeline.jobs), mode='observed')
+    assert result.makespan <= pipeline.makespan + 1e-6
+
+
+def test_stages_follow_job_creation():
+    pipeline = Pipeline.load(next(file for file in PIPELINES if file.parent.name == '2317609653'))
+    assert pipeline.stages[:3] == ['sync', 'preflight', 'prepare']
+
+
+def test_simulated_pipeline_keeps_stage_order():
+    pipeline = Pipeline.from_json(simulation_pipeline(1, 50, np.random.default_rng(0)))
+    result = simulate(pipeline, runners=2, policy='lpt', mode='stage')
+    runners = [f"runner-{runner}" for runner in result.runner]
+    simulated = Pipeline.from_json(pipeline.with_timeline(result.created, result.started, result.finished, runners))
+    assert simulated.stages == pipeline.stages == ['build', 'test', 'lint', 'package', 'deploy']
+
+
+@pytest.mark.parametrize('file', PIPELINES, ids=lambda file: file.stem)
+def test_stage_mode_keeps_strict_barriers(file):
+    pipeline = Pipeline.load(file)
+    strict = simulate(pipeline, runners=len(pipeline.jobs), mode='stage')
+    observed = simulate(pipeline, runners=len(pipeline.jobs), mode='observed')
+    assert strict.makespan >= observed.makespan - 1e-6
+    longest = {}
+    for job in pipeline.jobs:
+        longest[job.stage] = max(longest.get(job.stage, 0.0), job.duration)
+    assert strict.makespan == pytest.approx(sum(longest.values()))
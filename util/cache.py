@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Response headers that are kept with a cached body, e.g. for pagination
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Link',
+                  'X-Total', 'X-Total-Pages', 'X-Next-Page', 'X-Page', 'X-Per-Page')
+
+
+class CacheEntry:
+    def __init__(self, url: str, headers: dict, body: bytes, immutable: bool):
+        self.url = url
+        self.headers = headers
+        self.body = body
+        self.immutable = immutable
+
+    @property
+    def validators(self) -> dict:
+        """Returns the conditional request headers to revalidate this entry."""
+        validators = {}
+        if self.headers.get('ETag'):
+            validators['If-None-Match'] = self.headers['ETag']
+        if self.headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = self.headers['Last-Modified']
+        return validators
+
+    def to_response(self) -> requests.Response:
+        """Builds a response object so callers cannot tell a cache hit from a network response."""
+        response = requests.Response()
+        response.status_code = 200
+        response.url = self.url
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.body
+        response.encoding = 'utf-8'
+        response.from_cache = True
+        return response
+
+
+class ResponseCache:
+    """
+    Persistent cache for GET responses, keyed by URL and query parameters.
+
+    Entries are revalidated with If-None-Match/If-Modified-Since. Entries marked as immutable
+    (e.g. completed workflow runs) are served without any network round-trip.
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = Path(folder)
+
+    def key(self, url: str, params: dict | None = None) -> str:
+        query = json.dumps(sorted((params or {}).items()), default=str)
+        return hashlib.sha256(f"{url}?{query}".encode()).hexdigest()
+
+    def load(self, url: str, params: dict | None = None) -> CacheEntry | None:
+        key = self.key(url, params)
+        meta_file = self.folder / f"{key}.json"
+        body_file = self.folder / f"{key}.body"
+        if not meta_file.exists() or not body_file.exists():
+            return None
+        meta = json.loads(meta_file.read_text())
+        return CacheEntry(meta['url'], meta['headers'], body_file.read_bytes(), meta['immutable'])
+
+    def store(self, url: str, params: dict | None, response: requests.Response, immutable: bool = False):
+        headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+        if not immutable and not ('ETag' in headers or 'Last-Modified' in headers):
+            return
+        self.folder.mkdir(parents=True, exist_ok=True)
+        key = self.key(url, params)
+        meta = {'url': url, 'headers': headers, 'immutable': immutable}
+        # Body first, so a meta file always points to a complete body
+        _write_atomic(self.folder / f"{key}.body", response.content)
+        _write_atomic(self.folder / f"{key}.json", json.dumps(meta, indent='\t').encode())
+
+
+def _write_atomic(file: Path, content: bytes):
+    tmp_file = file.with_name(f"{file.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    tmp_file.write_bytes(content)
+    os.replace(tmp_file, file)
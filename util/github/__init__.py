@@ -1,3 +1,6 @@
-from .api import get_workflows, get_workflow_runs, get_commit, get_rate_limit
+from .api import (get_workflows, get_workflow_runs, iter_workflow_runs, get_workflow_run_jobs, get_commit,
+                  get_rate_limit, get_default_client, set_default_client)
+from .client import GitHubClient
 
-__all__ = ['get_workflows', 'get_workflow_runs', 'get_commit', 'get_rate_limit']
\ No newline at end of file
+__all__ = ['get_workflows', 'get_workflow_runs', 'iter_workflow_runs', 'get_workflow_run_jobs', 'get_commit',
+           'get_rate_limit', 'get_default_client', 'set_default_client', 'GitHubClient']
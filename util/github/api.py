@@ -1,43 +1,58 @@
+import itertools
+import math
 import os
-import requests
+from typing import Callable, Iterator
+
 import dotenv
-from datetime import datetime
 
+from util.github.client import GitHubClient
 from util.github.models import GitHubWorkflow, GitHubWorkflowRun, GitHubCommit 
 
 dotenv.load_dotenv()
 
-gh_token = os.getenv("GH_TOKEN")
-if not gh_token:
-    raise ValueError("GitHub token (GH_TOKEN) not found in environment variables.")
+_default_client: GitHubClient | None = None
+
+
+def get_default_client() -> GitHubClient:
+    """
+    Returns the client shared by all API functions that are not given an explicit client.
+    The client is created on first use from the GH_TOKEN environment variable.
+    """
+    global _default_client
+    if _default_client is None:
+        gh_token = os.getenv("GH_TOKEN")
+        if not gh_token:
+            raise ValueError("GitHub token (GH_TOKEN) not found in environment variables.")
+        _default_client = GitHubClient(gh_token)
+    return _default_client
+
+
+def set_default_client(client: GitHubClient):
+    """Replaces the shared client, e.g. with one configured by an experiment script."""
+    global _default_client
+    _default_client = client
 
-headers = {
-    "Accept": "application/vnd.github+json",
-    "Authorization": f"Bearer {gh_token}",
-    "X-GitHub-Api-Version": "2022-11-28"
-}
 
-def get_workflows(owner: str, repository: str) -> list[GitHubWorkflow]:
+def get_workflows(owner: str, repository: str, client: GitHubClient | None = None) -> list[GitHubWorkflow]:
     """
     Calls all workflows of a GitHub repository.
     
     Args:
         owner: GitHub Owner (User or Organization)
         repository: The name of the repository
+        client: The client to use, defaults to the shared client
         
     Returns:
         A list of workflow dictionaries with all workflow information
     """
-    url = f"https://api.github.com/repos/{owner}/{repository}/actions/workflows"
-
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    
-    data = response.json()
+    client = client or get_default_client()
+    data = client.get_json(f"/repos/{owner}/{repository}/actions/workflows")
     return [GitHubWorkflow.from_api_response(w) for w in data.get('workflows', [])]
 
 def get_workflow_runs(owner: str, repository: str, workflow_id: int | str, 
-                     as_dataclass: bool = True, fetch_all: bool = False, **params) -> list[GitHubWorkflowRun] | list[dict]:
+                     as_dataclass: bool = True, fetch_all: bool = False,
+                     client: GitHubClient | None = None, max_workers: int = 8,
+                     **params) -> list[GitHubWorkflowRun] | list[dict]:
     """
     Retrieves runs of a specific workflow.
     
@@ -46,7 +61,9 @@ def get_workflow_runs(owner: str, repository: str, workflow_id: int | str,
         repository: The name of the repository
         workflow_id: The ID or filename of the workflow (e.g., 123456 or "ci.yml")
         as_dataclass: If True, returns GitHubWorkflowRun objects, otherwise raw dicts
-        fetch_all: If True, fetches all pages (can be slow for repos with many runs)
+        fetch_all: If True, fetches all pages. Pages after the first are fetched concurrently.
+        client: The client to use, defaults to the shared client
+        max_workers: Maximum number of pages fetched at once when fetch_all=True
         **params: Optional query parameters such as:
             - per_page: Number of results per page (max 100, default 30)
             - page: Page number (ignored if fetch_all=True)
@@ -62,49 +79,114 @@ def get_workflow_runs(owner: str, repository: str, workflow_id: int | str,
     Returns:
         A list of GitHubWorkflowRun objects or workflow run dictionaries
     """
-    url = f"https://api.github.com/repos/{owner}/{repository}/actions/workflows/{workflow_id}/runs"
+    client = client or get_default_client()
+    url = f"/repos/{owner}/{repository}/actions/workflows/{workflow_id}/runs"
     
     if not fetch_all:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        
-        data = response.json()
+        data = client.get_json(url, params)
         runs = data.get('workflow_runs', [])
         
         if as_dataclass:
             return [GitHubWorkflowRun.from_api_response(run) for run in runs]
         return runs
     
-    # Fetch all pages
-    all_runs = []
-    page = 1
+    # Fetch the first page to learn total_count, then the remaining pages concurrently
     params['per_page'] = params.get('per_page', 100)  # Max per page
+    params['page'] = 1
+    data = client.get_json(url, params)
+    pages = [data]
+
+    # GitHub clamps per_page to 100, so the pages are sized by the first one and not by the requested per_page
+    total_count = data.get('total_count', 0)
+    page_size = len(data.get('workflow_runs', []))
+    page_count = math.ceil(total_count / page_size) if page_size else 1
+    if page_count > 1:
+        pages = itertools.chain(pages, client.iter_json_pages(url, range(2, page_count + 1), params, max_workers))
+
+    # Convert page by page, so the raw dicts of a page can be dropped once it was parsed
+    all_runs = []
+    runs = []
+    for page in pages:
+        runs = page.get('workflow_runs', [])
+        if as_dataclass:
+            runs = [GitHubWorkflowRun.from_api_response(run) for run in runs]
+        all_runs.extend(runs)
+    # Short pages leave runs for further pages, fetch them one by one until total_count or an empty page
+    while runs and len(all_runs) < total_count:
+        page_count += 1
+        runs = client.get_json(url, {**params, 'page': page_count}).get('workflow_runs', [])
+        if as_dataclass:
+            runs = [GitHubWorkflowRun.from_api_response(run) for run in runs]
+        all_runs.extend(runs)
+    return all_runs
+
+
+def iter_workflow_runs(owner: str, repository: str, workflow_id: int | str,
+                       stop_when: Callable[[GitHubWorkflowRun], bool] | None = None,
+                       client: GitHubClient | None = None, **params) -> Iterator[GitHubWorkflowRun]:
+    """
+    Lazily iterates over the runs of a workflow, newest first, fetching one page at a time.
     
-    while True:
-        params['page'] = page
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
+    Args:
+        owner: The GitHub owner (user or organization)
+        repository: The name of the repository
+        workflow_id: The ID or filename of the workflow (e.g., 123456 or "ci.yml")
+        stop_when: Optional predicate, iteration ends at the first run it returns True for,
+            e.g. ``lambda run: run.created_at < "2025-12-01T00:00:00Z"``
+        client: The client to use, defaults to the shared client
+        **params: Optional query parameters, see get_workflow_runs
         
-        data = response.json()
+    Yields:
+        GitHubWorkflowRun objects
+    """
+    client = client or get_default_client()
+    url = f"/repos/{owner}/{repository}/actions/workflows/{workflow_id}/runs"
+    per_page = params.pop('per_page', 100)
+    page = params.pop('page', 1)
+    # Counted instead of derived from per_page, since the server may serve fewer runs per page than requested
+    fetched = 0
+    
+    while True:
+        data = client.get_json(url, {**params, 'per_page': per_page, 'page': page})
         runs = data.get('workflow_runs', [])
+        for raw_run in runs:
+            run = GitHubWorkflowRun.from_api_response(raw_run)
+            if stop_when is not None and stop_when(run):
+                return
+            yield run
         
-        if not runs:
-            break
-        
-        all_runs.extend(runs)
+        fetched += len(runs)
+        if not runs or fetched >= data.get('total_count', 0):
+            return
         page += 1
-        
-        # GitHub API returns total_count
-        total_count = data.get('total_count', 0)
-        if len(all_runs) >= total_count:
-            break
+
+
+def get_workflow_run_jobs(owner: str, repository: str, run_id: int, client: GitHubClient | None = None,
+                          max_workers: int = 8, **params) -> list[dict]:
+    """
+    Retrieves all jobs of a workflow run, fetching the pages concurrently.
     
-    if as_dataclass:
-        return [GitHubWorkflowRun.from_api_response(run) for run in all_runs]
-    return all_runs
+    Args:
+        owner: The GitHub owner (user or organization)
+        repository: The name of the repository
+        run_id: The ID of the workflow run
+        client: The client to use, defaults to the shared client
+        max_workers: Maximum number of pages fetched at once
+        **params: Optional query parameters such as:
+            - per_page: Number of results per page (max 100, default 100)
+            - filter: "latest" or "all" (default), "all" includes the jobs of every run attempt
+        
+    Returns:
+        A list of job dictionaries
+    """
+    client = client or get_default_client()
+    params.setdefault('filter', 'all')
+    return client.get_all(f"/repos/{owner}/{repository}/actions/runs/{run_id}/jobs", params,
+                          items_key='jobs', max_workers=max_workers)
 
 
-def get_commit(owner: str, repository: str, sha: str, as_dataclass: bool = True) -> GitHubCommit | dict:
+def get_commit(owner: str, repository: str, sha: str, as_dataclass: bool = True,
+               client: GitHubClient | None = None) -> GitHubCommit | dict:
     """
     Retrieves detailed information about a commit.
     
@@ -113,26 +195,26 @@ def get_commit(owner: str, repository: str, sha: str, as_dataclass: bool = True)
         repository: The name of the repository
         sha: The SHA hash of the commit
         as_dataclass: If True, returns GitHubCommit object, otherwise raw dict
+        client: The client to use, defaults to the shared client
         
     Returns:
         A GitHubCommit object or dictionary with commit information
     """
-    url = f"https://api.github.com/repos/{owner}/{repository}/commits/{sha}"
-    
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    
-    data = response.json()
+    client = client or get_default_client()
+    data = client.get_json(f"/repos/{owner}/{repository}/commits/{sha}")
     
     if as_dataclass:
         return GitHubCommit.from_api_response(data)
     return data
 
 
-def get_rate_limit() -> dict:
+def get_rate_limit(client: GitHubClient | None = None) -> dict:
     """
     Retrieves the current API rate limit status.
     
+    Args:
+        client: The client to use, defaults to the shared client
+    
     Returns:
         A dictionary with rate limit information including:
         - core.limit: Maximum requests per hour
@@ -140,9 +222,5 @@ def get_rate_limit() -> dict:
         - core.reset: Unix timestamp when limit resets
         - core.used: Number of requests used
     """
-    url = "https://api.github.com/rate_limit"
-    
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    
-    return response.json()
\ No newline at end of file
+    client = client or get_default_client()
+    return client.get_json("/rate_limit")
@@ -0,0 +1,44 @@
+import re
+
+import requests
+
+from util.http import ApiClient
+from util.metrics import RequestMetrics, request_metrics
+from util.rate_limit import RateLimiter
+
+GITHUB_API_URL = "https://api.github.com"
+
+# Shared by all GitHub clients, since the budget is per token and not per client
+github_rate_limiter = RateLimiter()
+
+
+class GitHubClient(ApiClient):
+    """Shared client for the GitHub REST API."""
+
+    def __init__(self, token: str | None, base_url: str = GITHUB_API_URL,
+                 rate_limiter: RateLimiter | None = github_rate_limiter,
+                 metrics: RequestMetrics | None = request_metrics, **kwargs):
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28"
+        }
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        super().__init__(base_url, headers, rate_limiter=rate_limiter, metrics=metrics, **kwargs)
+
+    def is_immutable(self, response: requests.Response) -> bool:
+        """Completed runs, their jobs and commits addressed by SHA never change."""
+        if re.search(r"/commits/[0-9a-f]{40}$", response.url.split('?')[0]):
+            return True
+        if '/actions/runs/' not in response.url:
+            return False
+        try:
+            data = response.json()
+        except ValueError:
+            return False
+        if not isinstance(data, dict):
+            return False
+        if 'jobs' in data:
+            jobs = data['jobs']
+            return bool(jobs) and all(job.get('status') == 'completed' for job in jobs)
+        return data.get('status') == 'completed'
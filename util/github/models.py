@@ -2,7 +2,25 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 
-@dataclass
+import numpy as np
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parses an ISO 8601 timestamp as returned by the GitHub API."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def epoch_seconds(values: list[Optional[str]]) -> np.ndarray:
+    """Parses ISO 8601 UTC timestamps into an array of epoch seconds, NaN for missing values."""
+    parsed = np.array([value[:19] if value else 'NaT' for value in values], dtype='datetime64[s]')
+    result = parsed.astype('int64').astype('float64')
+    result[np.isnat(parsed)] = np.nan
+    return result
+
+
+@dataclass(slots=True)
 class GitHubWorkflow:
     """Represents a GitHub workflow."""
     
@@ -34,7 +52,7 @@ class GitHubWorkflow:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class GitHubCommitFile:
     """Represents a file changed in a commit."""
     
@@ -60,7 +78,7 @@ class GitHubCommitFile:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class GitHubCommit:
     """Represents a GitHub commit with relevant fields."""
     
@@ -121,8 +139,51 @@ class GitHubCommit:
         return self.message.split('\n')[0] if self.message else ''
 
 
-@dataclass
-class GitHubWorkflowRun:
+# Default of fields that are derived from the other fields on first access
+_NOT_COMPUTED = object()
+
+
+class _DerivedCache:
+    """Base class holding a slot for lazily derived values, which is not a dataclass field (asdict, repr and eq)."""
+    
+    __slots__ = ('_cache',)
+    
+    def _derived(self, name: str, compute):
+        """Computes a derived value on first access and caches it on the instance."""
+        try:
+            cache = self._cache
+        except AttributeError:
+            cache = self._cache = {}
+        if name not in cache:
+            cache[name] = compute()
+        return cache[name]
+
+
+class _LazyField:
+    """
+    Wraps the slot of a dataclass field whose default is _NOT_COMPUTED, so the value is computed on first access
+    (also by asdict, repr and eq) and then kept in the slot.
+    """
+    
+    def __init__(self, slot, compute):
+        self.slot = slot
+        self.compute = compute
+    
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = self.slot.__get__(instance, owner)
+        if value is _NOT_COMPUTED:
+            value = self.compute(instance)
+            self.slot.__set__(instance, value)
+        return value
+    
+    def __set__(self, instance, value):
+        self.slot.__set__(instance, value)
+
+
+@dataclass(slots=True)
+class GitHubWorkflowRun(_DerivedCache):
     """Represents a GitHub workflow run with relevant fields."""
     
     id: int
@@ -141,13 +202,13 @@ class GitHubWorkflowRun:
     run_attempt: int
     html_url: str
     
-    # Additional computed fields
-    duration_seconds: Optional[float] = None
+    # Additional computed fields, derived from the timestamps on first access
+    duration_seconds: Optional[float] = _NOT_COMPUTED
     
     @classmethod
     def from_api_response(cls, data: dict) -> 'GitHubWorkflowRun':
-        """Creates a GitHubWorkflowRun object from the API response."""
-        run = cls(
+        """Creates a GitHubWorkflowRun object from the API response, without parsing its timestamps."""
+        return cls(
             id=data['id'],
             run_number=data['run_number'],
             name=data.get('name', ''),
@@ -164,14 +225,27 @@ class GitHubWorkflowRun:
             run_attempt=data.get('run_attempt', 1),
             html_url=data['html_url']
         )
-        
-        # Calculate duration if completed
-        if run.status == 'completed' and run.run_started_at:
-            started = datetime.fromisoformat(run.run_started_at.replace('Z', '+00:00'))
-            updated = datetime.fromisoformat(run.updated_at.replace('Z', '+00:00'))
-            run.duration_seconds = (updated - started).total_seconds()
-        
-        return run
+    
+    def _duration_seconds(self) -> Optional[float]:
+        """Duration of a completed run in seconds."""
+        if self.status == 'completed' and self.run_started_at:
+            return (self.updated_at_datetime - self.run_started_at_datetime).total_seconds()
+        return None
+    
+    @property
+    def created_at_datetime(self) -> datetime:
+        """Returns created_at as a timezone aware datetime."""
+        return self._derived('created_at', lambda: parse_timestamp(self.created_at))
+    
+    @property
+    def updated_at_datetime(self) -> datetime:
+        """Returns updated_at as a timezone aware datetime."""
+        return self._derived('updated_at', lambda: parse_timestamp(self.updated_at))
+    
+    @property
+    def run_started_at_datetime(self) -> Optional[datetime]:
+        """Returns run_started_at as a timezone aware datetime, if the run started."""
+        return self._derived('run_started_at', lambda: parse_timestamp(self.run_started_at))
     
     @property
     def short_sha(self) -> str:
@@ -182,3 +256,78 @@ class GitHubWorkflowRun:
     def is_successful(self) -> bool:
         """Checks if the run was successful."""
         return self.status == 'completed' and self.conclusion == 'success'
+
+
+GitHubWorkflowRun.duration_seconds = _LazyField(GitHubWorkflowRun.duration_seconds,
+                                                GitHubWorkflowRun._duration_seconds)
+
+
+@dataclass(slots=True)
+class GitHubWorkflowRunBatch:
+    """
+    Columnar representation of many workflow runs.
+    
+    Statuses and conclusions are stored as codes into STATUSES and CONCLUSIONS (-1 for None),
+    timestamps as epoch seconds (NaN if missing), so batches can be filtered with NumPy masks.
+    """
+    
+    STATUSES = ('completed', 'action_required', 'cancelled', 'failure', 'neutral', 'skipped', 'stale',
+                'success', 'timed_out', 'in_progress', 'queued', 'requested', 'waiting', 'pending')
+    CONCLUSIONS = ('success', 'failure', 'neutral', 'cancelled', 'skipped', 'timed_out',
+                   'action_required', 'stale', 'startup_failure')
+    
+    id: np.ndarray
+    run_number: np.ndarray
+    workflow_id: np.ndarray
+    run_attempt: np.ndarray
+    status: np.ndarray
+    conclusion: np.ndarray
+    created_at: np.ndarray
+    updated_at: np.ndarray
+    run_started_at: np.ndarray
+    
+    @classmethod
+    def from_api_response(cls, runs: list[dict]) -> 'GitHubWorkflowRunBatch':
+        """Creates a batch from a list (e.g. one page) of workflow run dicts."""
+        return cls(
+            id=np.array([run['id'] for run in runs], dtype=np.int64),
+            run_number=np.array([run['run_number'] for run in runs], dtype=np.int64),
+            workflow_id=np.array([run['workflow_id'] for run in runs], dtype=np.int64),
+            run_attempt=np.array([run.get('run_attempt', 1) for run in runs], dtype=np.int32),
+            status=_codes([run['status'] for run in runs], cls.STATUSES),
+            conclusion=_codes([run.get('conclusion') for run in runs], cls.CONCLUSIONS),
+            created_at=epoch_seconds([run['created_at'] for run in runs]),
+            updated_at=epoch_seconds([run['updated_at'] for run in runs]),
+            run_started_at=epoch_seconds([run.get('run_started_at') for run in runs]),
+        )
+    
+    @classmethod
+    def concat(cls, batches: list['GitHubWorkflowRunBatch']) -> 'GitHubWorkflowRunBatch':
+        """Concatenates batches, e.g. of all pages of a run history."""
+        return cls(**{name: np.concatenate([getattr(b, name) for b in batches]) for name in cls.__slots__})
+    
+    def __len__(self) -> int:
+        return len(self.id)
+    
+    def filter(self, mask: np.ndarray) -> 'GitHubWorkflowRunBatch':
+        """Returns the runs selected by a boolean mask or index array."""
+        return GitHubWorkflowRunBatch(**{name: getattr(self, name)[mask] for name in self.__slots__})
+    
+    def status_is(self, status: str) -> np.ndarray:
+        """Returns a mask of the runs with the given status."""
+        return self.status == self.STATUSES.index(status)
+    
+    def conclusion_is(self, conclusion: str) -> np.ndarray:
+        """Returns a mask of the runs with the given conclusion."""
+        return self.conclusion == self.CONCLUSIONS.index(conclusion)
+    
+    @property
+    def duration_seconds(self) -> np.ndarray:
+        """Returns the durations of completed runs in seconds, NaN for all other runs."""
+        return np.where(self.status_is('completed'), self.updated_at - self.run_started_at, np.nan)
+
+
+def _codes(values: list[Optional[str]], names: tuple) -> np.ndarray:
+    """Maps names to their index in names, -1 for None or unknown names."""
+    index = {name: code for code, name in enumerate(names)}
+    return np.array([index.get(value, -1) for value in values], dtype=np.int8)
@@ -0,0 +1,4 @@
+from .api import get_pipeline, get_pipeline_jobs, get_job
+from .client import GitLabClient
+
+__all__ = ['get_pipeline', 'get_pipeline_jobs', 'get_job', 'GitLabClient']
@@ -0,0 +1,53 @@
+from util.gitlab.client import GitLabClient
+
+
+def get_pipeline(client: GitLabClient, project_id: int | str, pipeline_id: int) -> dict:
+    """
+    Retrieves a single pipeline.
+
+    Args:
+        client: The GitLab client
+        project_id: The ID of the project
+        pipeline_id: The ID of the pipeline
+
+    Returns:
+        The pipeline dictionary
+    """
+    return client.get_json(f"/projects/{project_id}/pipelines/{pipeline_id}")
+
+
+def get_pipeline_jobs(client: GitLabClient, project_id: int | str, pipeline_id: int,
+                      max_workers: int = 8, **params) -> list[dict]:
+    """
+    Retrieves all jobs of a pipeline, including retried jobs, fetching the pages concurrently.
+
+    Args:
+        client: The GitLab client
+        project_id: The ID of the project
+        pipeline_id: The ID of the pipeline
+        max_workers: Maximum number of pages fetched at once
+        **params: Optional query parameters such as:
+            - per_page: Number of results per page (max 100, default 100)
+            - scope: Filters by job status
+            - include_retried: Boolean, includes retried jobs (default True)
+
+    Returns:
+        A list of job dictionaries
+    """
+    params.setdefault('include_retried', True)
+    return client.get_all(f"/projects/{project_id}/pipelines/{pipeline_id}/jobs", params, max_workers=max_workers)
+
+
+def get_job(client: GitLabClient, project_id: int | str, job_id: int) -> dict:
+    """
+    Retrieves a single job.
+
+    Args:
+        client: The GitLab client
+        project_id: The ID of the project
+        job_id: The ID of the job
+
+    Returns:
+        The job dictionary
+    """
+    return client.get_json(f"/projects/{project_id}/jobs/{job_id}")
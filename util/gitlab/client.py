@@ -0,0 +1,19 @@
+from util.http import ApiClient
+from util.metrics import RequestMetrics, request_metrics
+from util.rate_limit import RateLimiter
+
+# Shared by all GitLab clients, since the budget is per user and not per client
+gitlab_rate_limiter = RateLimiter()
+
+
+class GitLabClient(ApiClient):
+    """Shared client for the GitLab REST API (v4)."""
+
+    def __init__(self, gitlab_url: str, token: str | None,
+                 rate_limiter: RateLimiter | None = gitlab_rate_limiter,
+                 metrics: RequestMetrics | None = request_metrics, **kwargs):
+        headers = {}
+        if token:
+            headers['PRIVATE-TOKEN'] = token
+        super().__init__(f"{gitlab_url.rstrip('/')}/api/v4", headers, rate_limiter=rate_limiter, metrics=metrics,
+                         **kwargs)
@@ -0,0 +1,276 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from util.cache import ResponseCache
+from util.metrics import RequestEvent, RequestMetrics, rate_remaining, retry_count
+from util.rate_limit import RateLimiter
+
+
+class RetryPolicy(Retry):
+    """
+    Retry policy for idempotent API calls.
+
+    Besides the usual 5xx responses this also retries 403/429 responses that carry a
+    Retry-After header, which is how GitHub and GitLab signal secondary rate limits.
+    """
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if status_code in (403, 429) and has_retry_after and self._is_method_retryable(method):
+            return self.total is not None and self.total > 0
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def create_session(headers: dict | None = None, pool_size: int = 16, retries: int = 5,
+                   backoff_factor: float = 0.5, backoff_jitter: float = 0.5) -> requests.Session:
+    """
+    Creates a requests session with a keep-alive connection pool and retries.
+
+    Args:
+        headers: Default headers sent with every request
+        pool_size: Number of connections kept alive per host
+        retries: Maximum number of retries per request
+        backoff_factor: Base of the exponential backoff between retries (seconds)
+        backoff_jitter: Maximum random jitter added to each backoff (seconds)
+
+    Returns:
+        A configured requests.Session
+    """
+    retry = RetryPolicy(
+        total=retries,
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_jitter,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({'GET', 'HEAD', 'OPTIONS'}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+class ApiClient:
+    """
+    Thin wrapper around a pooled session that resolves paths against a base URL.
+
+    Clients are safe to share between modules and threads, so scripts should create
+    one and pass it around instead of calling requests.get directly.
+    If a cache is set, GET responses are stored and revalidated with conditional requests.
+    If a rate limiter is set, every request that reaches the network waits for its budget.
+    If metrics are set, every request and the time spent decoding its JSON body are recorded.
+    """
+
+    def __init__(self, base_url: str, headers: dict | None = None,
+                 session: requests.Session | None = None, cache: ResponseCache | None = None,
+                 rate_limiter: RateLimiter | None = None, metrics: RequestMetrics | None = None,
+                 **session_options):
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.session = session or create_session(headers, **session_options)
+        if session is not None and headers:
+            self.session.headers.update(headers)
+
+    def url(self, path: str) -> str:
+        """Resolves a path against the base URL, absolute URLs are passed through."""
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def get(self, path: str, params: dict | None = None) -> requests.Response:
+        """
+        Performs a GET request and raises for error responses.
+
+        Args:
+            path: Path relative to the base URL or an absolute URL
+            params: Optional query parameters
+
+        Returns:
+            The response, possibly served from the cache
+        """
+        url = self.url(path)
+        start = time.perf_counter()
+        entry = self.cache.load(url, params) if self.cache else None
+        if entry is not None and entry.immutable:
+            response = entry.to_response()
+            self._record(response, start, cache='hit', transferred=0)
+            return response
+
+        response = self._send('GET', url, params=params, headers=entry.validators if entry else None)
+        if response.status_code == 304 and entry is not None:
+            self._record(response, start, cache='revalidated')
+            return entry.to_response()
+        self._record(response, start, cache='miss' if self.cache else None)
+        response.raise_for_status()
+        if self.cache:
+            self.cache.store(url, params, response, immutable=self.is_immutable(response))
+        return response
+
+    def is_immutable(self, response: requests.Response) -> bool:
+        """Whether a response can be served from the cache without revalidation."""
+        return False
+
+    def get_json(self, path: str, params: dict | None = None):
+        """Performs a GET request and returns the decoded JSON body."""
+        return self.json(self.get(path, params))
+
+    def json(self, response: requests.Response):
+        """Decodes the JSON body of a response, timed if metrics are set."""
+        if self.metrics is None:
+            return response.json()
+        start = time.perf_counter()
+        data = response.json()
+        self.metrics.record_parse(response.request.method if response.request else 'GET', response.url,
+                                  time.perf_counter() - start)
+        return data
+
+    def get_json_pages(self, path: str, pages: Iterable[int], params: dict | None = None,
+                       max_workers: int = 8) -> list:
+        """
+        Fetches several pages of a paginated endpoint concurrently.
+
+        Args:
+            path: Path relative to the base URL or an absolute URL
+            pages: The page numbers to fetch
+            params: Query parameters shared by all pages
+            max_workers: Maximum number of requests in flight at once
+
+        Returns:
+            The decoded JSON bodies in the order of the given pages
+        """
+        return list(self.iter_json_pages(path, pages, params, max_workers))
+
+    def iter_json_pages(self, path: str, pages: Iterable[int], params: dict | None = None,
+                        max_workers: int = 8) -> Iterator:
+        """Like get_json_pages, but yields each page as soon as it and all pages before it arrived."""
+        params = dict(params or {})
+
+        def fetch(page: int):
+            return self.get_json(path, {**params, 'page': page})
+
+        pages = list(pages)
+        if max_workers <= 1 or len(pages) <= 1:
+            for page in pages:
+                yield fetch(page)
+            return
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pages))) as executor:
+            yield from executor.map(fetch, pages)
+
+    def iter_all_pages(self, path: str, params: dict | None = None, items_key: str | None = None,
+                       max_workers: int = 8) -> Iterator[list]:
+        """
+        Iterates over all pages of a paginated endpoint.
+
+        If the first response tells the number of pages (a rel="last" link, GitLab's X-Total-Pages header or
+        GitHub's total_count divided by the length of the first page), the remaining pages are fetched concurrently. Otherwise the rel="next" links
+        of the Link header are followed, which also covers keyset pagination.
+
+        Args:
+            path: Path relative to the base URL or an absolute URL
+            params: Query parameters, per_page defaults to 100
+            items_key: Key of the item list in the response body, None if the body is the list
+            max_workers: Maximum number of requests in flight at once
+
+        Yields:
+            The items of each page, in page order
+        """
+        params = {'per_page': 100, **(params or {})}
+
+        def items(data) -> list:
+            return data.get(items_key, []) if items_key else data
+
+        response = self.get(path, params)
+        data = self.json(response)
+        yield items(data)
+        if not items(data):
+            return
+
+        page_count = _page_count(response, data, len(items(data)))
+        if page_count is not None:
+            first_page = int(params.get('page', 1))
+            for data in self.iter_json_pages(path, range(first_page + 1, page_count + 1), params, max_workers):
+                yield items(data)
+            return
+
+        while 'next' in response.links:
+            response = self.get(response.links['next']['url'])
+            yield items(self.json(response))
+
+    def get_all(self, path: str, params: dict | None = None, items_key: str | None = None,
+                max_workers: int = 8) -> list:
+        """Returns the items of all pages of a paginated endpoint, see iter_all_pages."""
+        return [item for page in self.iter_all_pages(path, params, items_key, max_workers) for item in page]
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        """Performs a POST request. POSTs are not retried since they are not idempotent."""
+        start = time.perf_counter()
+        response = self._send('POST', self.url(path), **kwargs)
+        self._record(response, start)
+        return response
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Sends a request, the time waited for the rate limiter is kept in response.throttle_wait"""
+        if self.rate_limiter is None:
+            response = self.session.request(method, url, **kwargs)
+            response.throttle_wait = 0.0
+            return response
+        waited = self.rate_limiter.acquire()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception:
+            self.rate_limiter.release()
+            raise
+        self.rate_limiter.update(response.headers, response.status_code)
+        response.throttle_wait = waited
+        return response
+
+    def _record(self, response: requests.Response, start: float, cache: str | None = None,
+                transferred: int | None = None):
+        if self.metrics is None:
+            return
+        throttle_wait = getattr(response, 'throttle_wait', 0.0)
+        self.metrics.record(RequestEvent(
+            method=response.request.method if response.request else 'GET',
+            url=response.url,
+            status=response.status_code,
+            latency=time.perf_counter() - start - throttle_wait,
+            bytes=len(response.content) if transferred is None else transferred,
+            cache=cache,
+            retries=retry_count(response),
+            throttle_wait=throttle_wait,
+            rate_remaining=rate_remaining(response.headers),
+        ))
+
+    def close(self):
+        self.session.close()
+
+
+def _page_count(response: requests.Response, data, page_size: int) -> int | None:
+    """
+    Number of pages of a paginated endpoint from its first response, None if it does not tell.
+    page_size is the length of the first page, since servers clamp the requested per_page (GitHub to 100).
+    """
+    last = response.links.get('last')
+    if last:
+        page = dict(parse_qsl(urlsplit(last['url']).query)).get('page')
+        if page:
+            return int(page)
+    total_pages = response.headers.get('X-Total-Pages')
+    if total_pages:
+        return int(total_pages)
+    if isinstance(data, dict) and 'total_count' in data and page_size:
+        return math.ceil(data['total_count'] / page_size)
+    return None
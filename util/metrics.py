@@ -0,0 +1,186 @@
+import bisect
+import json
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+
+# Upper bounds (seconds) of the latency histogram buckets, the last bucket takes everything slower
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_ID_SEGMENT = re.compile(r'^(\d+|[0-9a-f]{40})$')
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """Groups URLs by endpoint, e.g. GET api.github.com/repos/o/r/actions/runs/{id}/jobs"""
+    parts = urlsplit(url)
+    path = '/'.join('{id}' if _ID_SEGMENT.match(segment) else segment for segment in parts.path.split('/'))
+    return f"{method} {parts.netloc}{path}"
+
+
+@dataclass(slots=True)
+class RequestEvent:
+    """
+    One request of an ApiClient.
+
+    cache is None without a cache, 'hit' for responses served from the cache without a request,
+    'revalidated' for 304 responses and 'miss' for responses that had to be transferred.
+    latency includes retries and their backoff but not the throttle wait of the rate limiter.
+    """
+
+    method: str
+    url: str
+    status: int | None
+    latency: float
+    bytes: int
+    cache: str | None = None
+    retries: int = 0
+    throttle_wait: float = 0.0
+    rate_remaining: float | None = None
+    time: float = field(default_factory=time.time)
+
+
+@dataclass
+class EndpointStats:
+    requests: int = 0
+    errors: int = 0
+    bytes: int = 0
+    retries: int = 0
+    cache_hits: int = 0
+    revalidated: int = 0
+    throttle_wait: float = 0.0
+    parse_time: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+    histogram: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+
+    def summary(self) -> dict:
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        buckets = [f"<={bound}" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}"]
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'retries': self.retries,
+            'cache_hits': self.cache_hits,
+            'revalidated': self.revalidated,
+            'latency_total': float(latencies.sum()),
+            'latency_p50': float(np.percentile(latencies, 50)),
+            'latency_p95': float(np.percentile(latencies, 95)),
+            'latency_max': float(latencies.max()),
+            'latency_histogram': dict(zip(buckets, self.histogram)),
+            'throttle_wait': self.throttle_wait,
+            'parse_time': self.parse_time,
+        }
+
+
+class RequestMetrics:
+    """
+    Per-endpoint statistics of the requests of one or more ApiClients, and an optional JSON lines trace.
+
+    The summary tells whether a slow harvest spent its time on the network (latency), in the rate limiter
+    (throttle_wait), on retries or on decoding JSON (parse_time).
+    """
+
+    def __init__(self, trace_file: Path | None = None):
+        self.endpoints: dict[str, EndpointStats] = {}
+        self.rate_remaining: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._trace = None
+        if trace_file is not None:
+            self.open_trace(trace_file)
+
+    def open_trace(self, trace_file: Path):
+        """Appends every event to trace_file as one JSON object per line."""
+        trace_file = Path(trace_file)
+        trace_file.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if self._trace is not None:
+                self._trace.close()
+            self._trace = open(trace_file, 'a', buffering=1)
+
+    def record(self, event: RequestEvent):
+        name = endpoint_name(event.method, event.url)
+        with self._lock:
+            stats = self.endpoints.setdefault(name, EndpointStats())
+            stats.requests += 1
+            stats.errors += event.status is None or event.status >= 400
+            stats.bytes += event.bytes
+            stats.retries += event.retries
+            stats.cache_hits += event.cache == 'hit'
+            stats.revalidated += event.cache == 'revalidated'
+            stats.throttle_wait += event.throttle_wait
+            stats.latencies.append(event.latency)
+            stats.histogram[bisect.bisect_left(LATENCY_BUCKETS, event.latency)] += 1
+            if event.rate_remaining is not None:
+                self.rate_remaining[urlsplit(event.url).netloc] = event.rate_remaining
+            if self._trace is not None:
+                self._trace.write(json.dumps({'event': 'request', 'endpoint': name, **asdict(event)}) + '\n')
+
+    def record_parse(self, method: str, url: str, seconds: float):
+        name = endpoint_name(method, url)
+        with self._lock:
+            self.endpoints.setdefault(name, EndpointStats()).parse_time += seconds
+            if self._trace is not None:
+                self._trace.write(json.dumps({'event': 'parse', 'endpoint': name, 'url': url, 'seconds': seconds,
+                                              'time': time.time()}) + '\n')
+
+    @property
+    def request_count(self) -> int:
+        return sum(stats.requests for stats in self.endpoints.values())
+
+    def summary(self) -> dict:
+        with self._lock:
+            endpoints = {name: stats.summary() for name, stats in self.endpoints.items()}
+            latencies = np.concatenate([stats.latencies for stats in self.endpoints.values()] + [np.zeros(0)])
+        totals = {
+            key: sum(endpoint[key] for endpoint in endpoints.values())
+            for key in ('requests', 'errors', 'bytes', 'retries', 'cache_hits', 'revalidated', 'latency_total',
+                        'throttle_wait', 'parse_time')
+        }
+        totals['latency_p50'] = float(np.percentile(latencies, 50)) if len(latencies) else 0.0
+        totals['latency_p95'] = float(np.percentile(latencies, 95)) if len(latencies) else 0.0
+        return {'totals': totals, 'rate_remaining': dict(self.rate_remaining), 'endpoints': endpoints}
+
+    def format_summary(self) -> str:
+        summary = self.summary()
+        lines = [f"{'Endpoint':70} {'Requests':>8} {'Cached':>6} {'Retries':>7} {'MiB':>8} "
+                 f"{'p50 s':>7} {'p95 s':>7} {'Latency s':>9} {'Throttle s':>10} {'Parse s':>8}"]
+        rows = sorted(summary['endpoints'].items(), key=lambda item: -item[1]['latency_total'])
+        for name, stats in rows + [('Total', None)]:
+            stats = stats or summary['totals']
+            lines.append(
+                f"{name[-70:]:70} {stats['requests']:8} {stats['cache_hits'] + stats['revalidated']:6} "
+                f"{stats['retries']:7} {stats['bytes'] / 2 ** 20:8.2f} {stats['latency_p50']:7.3f} "
+                f"{stats['latency_p95']:7.3f} {stats['latency_total']:9.1f} {stats['throttle_wait']:10.1f} "
+                f"{stats['parse_time']:8.2f}")
+        for host, remaining in summary['rate_remaining'].items():
+            lines.append(f"Rate limit budget left on {host}: {remaining:.0f}")
+        return '\n'.join(lines)
+
+    def close(self):
+        with self._lock:
+            if self._trace is not None:
+                self._trace.close()
+                self._trace = None
+
+
+def retry_count(response) -> int:
+    """Number of retries urllib3 needed for a response, 0 if unknown."""
+    retries = getattr(getattr(response, 'raw', None), 'retries', None)
+    return len(retries.history) if retries is not None else 0
+
+
+def rate_remaining(headers) -> float | None:
+    """Remaining rate limit budget from the GitHub (X-RateLimit-Remaining) or GitLab (RateLimit-Remaining) header."""
+    value = headers.get('X-RateLimit-Remaining', headers.get('RateLimit-Remaining'))
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+# Shared by the GitHub and GitLab clients, so one summary covers a whole script
+request_metrics = RequestMetrics()
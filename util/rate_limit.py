@@ -0,0 +1,126 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from requests.structures import CaseInsensitiveDict
+
+
+class RateLimiter:
+    """
+    Token bucket driven by the rate limit headers of the API responses.
+
+    While more than the reserve of the hourly budget is left, requests are sent at full speed.
+    The reserve is paced evenly until the reset time, so the budget is never exhausted early.
+    Retry-After (secondary rate limits) blocks all requests until the given time has passed.
+    One limiter should be shared by every client that talks to the same API.
+    """
+
+    def __init__(self, reserve_fraction: float = 0.1, clock=time.monotonic, sleep=time.sleep):
+        self.reserve_fraction = reserve_fraction
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = None  # None while the budget is unknown
+        self._rate = 0.0
+        self._last_refill = clock()
+        self._reset_at = None
+        self._blocked_until = 0.0
+        self._in_flight = 0
+        self.waited_seconds = 0.0
+
+    def acquire(self) -> float:
+        """
+        Blocks until a request may be sent.
+
+        Returns:
+            The time waited in seconds
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                delay = self._delay()
+                if delay <= 0:
+                    if self._tokens is not None:
+                        self._tokens = max(self._tokens - 1, 0.0)
+                    self._in_flight += 1
+                    self.waited_seconds += waited
+                    return waited
+            self._sleep(delay)
+            waited += delay
+
+    def release(self):
+        """Marks an acquired request as finished without rate limit information, e.g. on a cache hit."""
+        with self._lock:
+            self._in_flight = max(self._in_flight - 1, 0)
+
+    def update(self, headers: dict, status_code: int = 200):
+        """
+        Updates the budget from the headers of a response to an acquired request.
+        Understands the GitHub (X-RateLimit-*) and the GitLab (RateLimit-*) header names.
+        """
+        headers = CaseInsensitiveDict(headers)
+        now = self._clock()
+        with self._lock:
+            self._in_flight = max(self._in_flight - 1, 0)
+
+            retry_after = _retry_after_seconds(headers.get('Retry-After'))
+            if retry_after is not None:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+
+            if headers.get('X-RateLimit-Resource', 'core') != 'core':
+                return
+            remaining = _header(headers, 'RateLimit-Remaining')
+            reset = _header(headers, 'RateLimit-Reset')
+            if remaining is None or reset is None:
+                return
+            limit = _header(headers, 'RateLimit-Limit') or remaining
+            seconds_to_reset = max(reset - time.time(), 1.0)
+
+            # Requests that are still in flight were already counted by the server or will be soon
+            budget = max(remaining - self._in_flight, 0)
+            reserve = min(budget, limit * self.reserve_fraction)
+            self._tokens = budget - reserve
+            self._rate = reserve / seconds_to_reset
+            self._last_refill = now
+            self._reset_at = now + seconds_to_reset
+            if status_code in (403, 429) and remaining == 0:
+                self._blocked_until = max(self._blocked_until, self._reset_at)
+
+    def _delay(self) -> float:
+        now = self._clock()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._tokens is None:
+            return 0.0
+        if self._reset_at is not None and now >= self._reset_at:
+            # The window was reset, run at full speed until the next response tells us the new budget
+            self._tokens = None
+            return 0.0
+        self._tokens += (now - self._last_refill) * self._rate
+        self._last_refill = now
+        if self._tokens >= 1 - 1e-9:
+            return 0.0
+        if self._rate <= 0:
+            return self._reset_at - now
+        return (1 - self._tokens) / self._rate
+
+
+def _header(headers: CaseInsensitiveDict, name: str) -> float | None:
+    value = headers.get(f"X-{name}", headers.get(name))
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _retry_after_seconds(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
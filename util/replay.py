@@ -0,0 +1,320 @@
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from http import HTTPStatus
+from pathlib import Path
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+
+# Headers that describe the transfer of the recorded response and not its content
+TRANSFER_HEADERS = ('Content-Encoding', 'Content-Length', 'Transfer-Encoding', 'Connection', 'Set-Cookie')
+# Query parameters of paginated endpoints, fixtures of all pages share one key
+PAGE_PARAMS = ('page', 'per_page')
+PAGE_HEADERS = ('Link', 'X-Total', 'X-Total-Pages', 'X-Page', 'X-Per-Page', 'X-Next-Page', 'X-Prev-Page')
+
+
+class FixtureStore:
+    """
+    Recorded responses on disk, one JSON file per request.
+
+    Files are keyed by method, URL and query parameters without page and per_page, the pages of a paginated
+    endpoint are stored as <key>-p<page>.json next to each other so they can be served with a different page size.
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = Path(folder)
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def key(self, method: str, url: str) -> tuple[str, int | None]:
+        """Returns the key of a request and its page, None if it does not ask for a page."""
+        parts = urlsplit(url)
+        params = parse_qsl(parts.query)
+        page = next((int(value) for name, value in params if name == 'page'), None)
+        if page is None and any(name == 'per_page' for name, _ in params):
+            # The first page of a paginated endpoint is usually requested without a page number
+            page = 1
+        query = json.dumps(sorted((name, value) for name, value in params if name not in PAGE_PARAMS))
+        base = urlunsplit((parts.scheme, parts.netloc, parts.path, '', ''))
+        return hashlib.sha256(f"{method} {base}?{query}".encode()).hexdigest(), page
+
+    def save(self, request: requests.PreparedRequest, response: requests.Response):
+        key, page = self.key(request.method, request.url)
+        body = response.content
+        try:
+            encoded = {'body': body.decode('utf-8')}
+        except UnicodeDecodeError:
+            encoded = {'body_base64': base64.b64encode(body).decode('ascii')}
+        fixture = {
+            'method': request.method,
+            'url': request.url,
+            'page': page,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {name: value for name, value in response.headers.items() if name not in TRANSFER_HEADERS},
+            **encoded,
+        }
+        self.folder.mkdir(parents=True, exist_ok=True)
+        name = f"{key}-p{page}.json" if page is not None else f"{key}.json"
+        (self.folder / name).write_text(json.dumps(fixture, indent='\t'))
+
+    def load(self, method: str, url: str) -> list[dict]:
+        """Returns the fixture of a request, or all recorded pages of its endpoint in page order."""
+        key, _ = self.key(method, url)
+        with self._lock:
+            if key not in self._pages:
+                files = sorted(self.folder.glob(f"{key}-p*.json"),
+                               key=lambda file: int(file.stem.rsplit('-p', 1)[1]))
+                if not files and (self.folder / f"{key}.json").exists():
+                    files = [self.folder / f"{key}.json"]
+                self._pages[key] = [_decode(json.loads(file.read_text())) for file in files]
+            return self._pages[key]
+
+
+def _decode(fixture: dict) -> dict:
+    if 'body_base64' in fixture:
+        fixture['body'] = base64.b64decode(fixture.pop('body_base64'))
+    else:
+        fixture['body'] = fixture['body'].encode('utf-8')
+    return fixture
+
+
+class RecordingAdapter(HTTPAdapter):
+    """
+    Sends requests to the API like the default adapter and saves the responses as fixtures.
+
+    Responses that only make sense once are not recorded: 304 (the fixture already holds the body),
+    rate limit errors and server errors.
+    """
+
+    def __init__(self, fixtures: FixtureStore, **kwargs):
+        super().__init__(**kwargs)
+        self.fixtures = fixtures
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if (request.method in ('GET', 'HEAD') and response.status_code < 500
+                and response.status_code not in (304, 429) and 'Retry-After' not in response.headers):
+            self.fixtures.save(request, response)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Answers requests from recorded fixtures without network access.
+
+    Args:
+        fixtures: The recorded responses
+        latency: Seconds every response is delayed by
+        jitter: Maximum random seconds added to the latency
+        page_size: Serve paginated endpoints with this page size instead of the requested per_page,
+            e.g. a small size to cause many page requests
+        rate_limit: Requests allowed per rate_limit_window seconds, None for no limit. Responses carry rate limit
+            headers like GitHub (X-RateLimit-*) or GitLab (RateLimit-*), exhausted budgets are answered with 429
+        rate_limit_window: Seconds until the budget is reset
+        retry_after_every: Answer every n-th request with 429 and Retry-After, like a secondary rate limit
+        retry_after: Seconds of the Retry-After header of these responses
+        max_retries: Retry policy applied like the default adapter, e.g. to retry 429 responses
+
+    Requests without a fixture are answered with 404. Conditional requests whose If-None-Match matches the
+    ETag of the response are answered with 304 and do not count against the rate limit, like on GitHub.
+    """
+
+    def __init__(self, fixtures: FixtureStore, latency: float = 0.0, jitter: float = 0.0,
+                 page_size: int | None = None, rate_limit: int | None = None, rate_limit_window: float = 3600,
+                 retry_after_every: int | None = None, retry_after: float = 1.0,
+                 max_retries: Retry | int = 0, sleep=time.sleep):
+        super().__init__()
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.page_size = page_size
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.retry_after_every = retry_after_every
+        self.retry_after = retry_after
+        self.max_retries = max_retries if isinstance(max_retries, Retry) else Retry(max_retries, read=False)
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._used = 0
+        self._reset_at = time.time() + rate_limit_window
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        retries = self.max_retries
+        while True:
+            response = self._respond(request)
+            # Like urllib3 responses, so the retries of a request can be counted
+            response.raw = SimpleNamespace(retries=retries)
+            has_retry_after = 'Retry-After' in response.headers
+            if not retries.is_retry(request.method, response.status_code, has_retry_after):
+                return response
+            try:
+                retries = retries.increment(request.method, request.url)
+            except MaxRetryError:
+                return response
+            if has_retry_after and retries.respect_retry_after_header:
+                self._sleep(float(response.headers['Retry-After']))
+            else:
+                self._sleep(retries.get_backoff_time())
+
+    def close(self):
+        pass
+
+    def _respond(self, request: requests.PreparedRequest) -> requests.Response:
+        if self.latency or self.jitter:
+            self._sleep(self.latency + random.uniform(0, self.jitter))
+        github = urlsplit(request.url).netloc == 'api.github.com'
+        with self._lock:
+            self._requests += 1
+            throttled = self.retry_after_every and self._requests % self.retry_after_every == 0
+
+        pages = self.fixtures.load(request.method, request.url)
+        if not pages:
+            status, headers, body = 404, {'Content-Type': 'application/json'}, json.dumps(
+                {'message': f"No recorded response for {request.method} {request.url}"}).encode()
+        else:
+            status, headers, body = self._page(request.url, pages)
+        headers = CaseInsensitiveDict({name: value for name, value in headers.items()
+                                       if not _is_rate_limit_header(name)})
+
+        if status == 200 and 'ETag' in headers:
+            headers['ETag'] = f'W/"{hashlib.sha1(body).hexdigest()}"'
+            if request.headers.get('If-None-Match') == headers['ETag']:
+                status, body = 304, b''
+        if throttled:
+            status, body = 429, json.dumps({'message': 'You have exceeded a secondary rate limit'}).encode()
+            headers['Retry-After'] = str(self.retry_after)
+        elif self.rate_limit is not None:
+            with self._lock:
+                now = time.time()
+                if now >= self._reset_at:
+                    self._used = 0
+                    self._reset_at = now + self.rate_limit_window
+                exhausted = self._used >= self.rate_limit
+                if not exhausted and status != 304:
+                    self._used += 1
+                prefix = 'X-RateLimit-' if github else 'RateLimit-'
+                headers.update({
+                    f"{prefix}Limit": str(self.rate_limit),
+                    f"{prefix}Remaining": str(self.rate_limit - self._used),
+                    f"{prefix}Reset": str(int(self._reset_at)),
+                    f"{prefix}Used": str(self._used),
+                })
+                if github:
+                    headers['X-RateLimit-Resource'] = 'core'
+            if exhausted:
+                status, body = 429, json.dumps({'message': 'API rate limit exceeded'}).encode()
+                headers['Retry-After'] = str(max(int(self._reset_at - time.time()), 1))
+        return _build_response(self, request, status, headers, body)
+
+    def _page(self, url: str, pages: list[dict]) -> tuple[int, dict, bytes]:
+        """
+        Serves a fixture, paginated endpoints are re-paginated with the requested or configured page size.
+        The page metadata (total_count, Link and GitLab's X-* headers) is rewritten to match the new pages.
+        """
+        first = pages[0]
+        params = dict(parse_qsl(urlsplit(url).query))
+        if first['page'] is None or first['status'] != 200:
+            return first['status'], first['headers'], first['body']
+
+        bodies = [json.loads(page['body']) for page in pages]
+        items_key = _items_key(bodies[0])
+        if items_key is False:
+            # Not a list of items, serve the recorded page as is
+            page = next((page for page in pages if page['page'] == int(params.get('page', 1))), None)
+            return (page['status'], page['headers'], page['body']) if page else (404, {}, b'{}')
+        items = [item for body in bodies for item in (body[items_key] if items_key else body)]
+
+        recorded_per_page = int(dict(parse_qsl(urlsplit(first['url']).query)).get('per_page', 30))
+        per_page = self.page_size or int(params.get('per_page', recorded_per_page))
+        page = int(params.get('page', 1))
+        page_count = max(-(-len(items) // per_page), 1)
+        chunk = items[(page - 1) * per_page:page * per_page]
+        body = {**bodies[0], items_key: chunk} if items_key else chunk
+        if items_key and 'total_count' in body:
+            # Only the recorded items can be served, even if the recording stopped before the last page
+            body['total_count'] = len(items)
+
+        headers = {name: value for name, value in first['headers'].items() if name not in PAGE_HEADERS}
+        if 'X-Total-Pages' in first['headers']:
+            headers.update({'X-Total': str(len(items)), 'X-Total-Pages': str(page_count), 'X-Page': str(page),
+                            'X-Per-Page': str(per_page), 'X-Next-Page': str(page + 1) if page < page_count else ''})
+        links = {'next': page + 1} if page < page_count else {}
+        links['last'] = page_count
+        headers['Link'] = ', '.join(f'<{_with_page(url, number, per_page)}>; rel="{rel}"'
+                                    for rel, number in links.items())
+        return 200, headers, json.dumps(body).encode()
+
+
+def _items_key(body) -> str | None | bool:
+    """Key of the item list of a page, None if the page is the list and False if it has no single list."""
+    if isinstance(body, list):
+        return None
+    lists = [name for name, value in body.items() if isinstance(value, list)] if isinstance(body, dict) else []
+    return lists[0] if len(lists) == 1 else False
+
+
+def _with_page(url: str, page: int, per_page: int) -> str:
+    parts = urlsplit(url)
+    params = [(name, value) for name, value in parse_qsl(parts.query) if name not in PAGE_PARAMS]
+    query = urlencode(params + [('per_page', per_page), ('page', page)])
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))
+
+
+def _is_rate_limit_header(name: str) -> bool:
+    name = name.lower().removeprefix('x-')
+    return name.startswith('ratelimit-') or name == 'retry-after'
+
+
+def _build_response(adapter: BaseAdapter, request: requests.PreparedRequest, status: int,
+                    headers: CaseInsensitiveDict, body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.reason = HTTPStatus(status).phrase
+    response.headers = headers
+    response._content = body
+    response.encoding = 'utf-8'
+    response.url = request.url
+    response.request = request
+    response.connection = adapter
+    return response
+
+
+def install_transport(session: requests.Session, mode: str, folder: Path, **replay_options) -> requests.Session:
+    """
+    Mounts a recording or replaying adapter on a session created by create_session, keeping its retry policy.
+
+    Args:
+        session: The session of an ApiClient
+        mode: 'live' (unchanged), 'record' or 'replay'
+        folder: Folder of the fixtures
+        replay_options: Options of the ReplayAdapter, e.g. latency or rate_limit
+
+    Raises:
+        ValueError: On an unknown mode
+    """
+    if mode == 'live':
+        return session
+    current = session.get_adapter('https://')
+    max_retries = getattr(current, 'max_retries', 0)
+    fixtures = FixtureStore(folder)
+    if mode == 'record':
+        adapter = RecordingAdapter(fixtures, pool_connections=getattr(current, '_pool_connections', 10),
+                                   pool_maxsize=getattr(current, '_pool_maxsize', 10), max_retries=max_retries)
+    elif mode == 'replay':
+        adapter = ReplayAdapter(fixtures, max_retries=max_retries, **replay_options)
+    else:
+        raise ValueError(f"Unknown API mode {mode}")
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session